@@ -0,0 +1,209 @@
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from audit_core import with_system_prompt
+from review_executor import _sleep, is_rate_limited, retry_after
+
+# ==========================================
+# [공유 할당량] 같은 API 키를 쓰는 모든 세션·프로세스가 함께 지키는 RPM/TPM 한도 (SQLite 원장)
+# ==========================================
+# 0이면 해당 한도를 적용하지 않음
+API_QUOTA_RPM = int(os.environ.get("API_QUOTA_RPM", "15"))
+API_QUOTA_TPM = int(os.environ.get("API_QUOTA_TPM", "1000000"))
+
+_WINDOW_SECONDS = 60.0
+_SESSION_TTL = 120.0                # 이 시간 안에 요청한 세션만 몫을 나눌 사용자로 셈
+_WAITING_TTL = 5.0                  # 대기 중 표시는 이 시간 안에 다시 확인한 세션만 유효 (죽은 프로세스 제외)
+_MAX_POLL_SECONDS = 1.0
+_DEFAULT_REQUEST_TOKENS = 2000      # 원장에 실제 사용량이 아직 없을 때의 요청당 예상 토큰
+_DEFAULT_PAUSE_SECONDS = 10.0       # 429에 재시도 힌트가 없을 때 모두가 쉬는 시간
+
+
+def quota_key(api_key):
+    """원장에는 API 키 대신 해시만 기록."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+class SharedQuota:
+    """
+    API 키(quota_key)별 최근 1분 요청 원장을 SQLite에 두고, 컨테이너 안의 모든 세션·worker 프로세스가 같은 한도를 나눠 씀.
+    - acquire: 키 전체의 RPM/TPM 여유가 있고, 이 세션이 공평한 몫(한도 ÷ 활동 중인 세션 수) 안이면 바로 통과.
+      몫을 넘었더라도 기다리는 다른 세션이 없으면 남는 한도를 씁니다.
+    - 토큰은 요청 전에는 최근 평균으로 예약하고, 응답을 받으면 settle로 실제 사용량으로 고칩니다.
+    - 429를 받으면 pause로 같은 키의 모든 세션을 서버 힌트만큼 함께 쉬게 합니다.
+    확인과 기록은 BEGIN IMMEDIATE 트랜잭션 하나에서 하므로 여러 프로세스가 동시에 불러도 한도를 넘지 않습니다.
+    """
+
+    def __init__(self, directory, rpm=API_QUOTA_RPM, tpm=API_QUOTA_TPM):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "api_quota.sqlite3")
+        self.rpm = rpm
+        self.tpm = tpm
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS requests (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    at REAL NOT NULL,
+                    tokens INTEGER NOT NULL,
+                    settled INTEGER NOT NULL DEFAULT 0
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS requests_key_at ON requests (key, at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    key TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    seen REAL NOT NULL,
+                    waiting REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (key, session)
+                )""")
+            conn.execute("CREATE TABLE IF NOT EXISTS pauses (key TEXT PRIMARY KEY, until REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        # 자동 트랜잭션 대신 BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡아 확인-기록 사이에 다른 프로세스가 끼어들지 못하게 함
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            try: yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally: conn.close()
+
+    def _usage(self, conn, key, now):
+        """(키 전체 요청 수, 토큰 수, {세션: (요청 수, 토큰 수)}, 요청당 평균 토큰) - 최근 1분."""
+        conn.execute("DELETE FROM requests WHERE at < ?", (now - _WINDOW_SECONDS,))
+        conn.execute("DELETE FROM sessions WHERE seen < ?", (now - _SESSION_TTL,))
+        per_session = {row[0]: (row[1], row[2]) for row in
+                       conn.execute("SELECT session, COUNT(*), SUM(tokens) FROM requests WHERE key = ? GROUP BY session", (key,))}
+        settled = conn.execute("SELECT AVG(tokens) FROM requests WHERE key = ? AND settled = 1", (key,)).fetchone()[0]
+        return (sum(n for n, _ in per_session.values()), sum(t for _, t in per_session.values()), per_session,
+                int(settled) if settled else _DEFAULT_REQUEST_TOKENS)
+
+    def _try_acquire(self, key, session):
+        """통과하면 (원장 행 ID, 0), 아니면 (None, 기다릴 초)."""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO sessions (key, session, seen) VALUES (?, ?, ?) ON CONFLICT (key, session) DO UPDATE SET seen = excluded.seen",
+                         (key, session, now))
+            row = conn.execute("SELECT until FROM pauses WHERE key = ?", (key,)).fetchone()
+            if row and row[0] > now: return None, row[0] - now
+            requests, tokens, per_session, estimate = self._usage(conn, key, now)
+            active = conn.execute("SELECT COUNT(*) FROM sessions WHERE key = ? AND seen >= ?", (key, now - _SESSION_TTL)).fetchone()[0]
+            others_waiting = conn.execute("SELECT COUNT(*) FROM sessions WHERE key = ? AND session != ? AND waiting > 0 AND seen >= ?",
+                                          (key, session, now - _WAITING_TTL)).fetchone()[0]
+            mine_requests, mine_tokens = per_session.get(session, (0, 0))
+            fits = (not self.rpm or requests < self.rpm) and (not self.tpm or not tokens or tokens + estimate <= self.tpm)
+            within_share = (not self.rpm or mine_requests < max(1, self.rpm // active)) and \
+                           (not self.tpm or not mine_tokens or mine_tokens + estimate <= self.tpm // active)
+            if fits and (within_share or not others_waiting):
+                conn.execute("UPDATE sessions SET waiting = 0 WHERE key = ? AND session = ?", (key, session))
+                cursor = conn.execute("INSERT INTO requests (key, session, at, tokens) VALUES (?, ?, ?, ?)", (key, session, now, estimate))
+                return cursor.lastrowid, 0.0
+            conn.execute("UPDATE sessions SET waiting = ? WHERE key = ? AND session = ?", (now, key, session))
+            # 내 몫 초과면 내 가장 오래된 요청이, 키 전체 초과면 키의 가장 오래된 요청이 창 밖으로 나갈 때까지
+            query = "SELECT MIN(at) FROM requests WHERE key = ?" + ("" if not fits else " AND session = ?")
+            oldest = conn.execute(query, (key,) if not fits else (key, session)).fetchone()[0]
+            return None, (oldest + _WINDOW_SECONDS - now) if oldest else _MAX_POLL_SECONDS
+
+    def acquire(self, key, session, cancelled=None):
+        """
+        한도 안에서 요청 하나를 기록하고 원장 행 ID를 반환 (settle에 넘김). 한도를 넘으면 자리가 날 때까지 기다림.
+        기다리는 동안 cancelled()가 참이 되면 CallCancelled로 바로 빠져나옵니다.
+        """
+        while True:
+            row_id, wait = self._try_acquire(key, session)
+            if row_id is not None: return row_id
+            _sleep(min(max(wait, 0.05), _MAX_POLL_SECONDS), cancelled)
+
+    def settle(self, row_id, tokens):
+        """예약한 토큰 수를 실제 사용량(프롬프트 + 응답 토큰)으로 고침. 사용량을 모르면(0) 예약값 유지."""
+        if not tokens: return
+        with self._connect() as conn: conn.execute("UPDATE requests SET tokens = ?, settled = 1 WHERE id = ?", (tokens, row_id))
+
+    def pause(self, key, seconds):
+        """429를 받았을 때: 같은 키의 모든 세션이 seconds 동안 새 요청을 보내지 않음."""
+        until = time.time() + seconds
+        with self._connect() as conn:
+            conn.execute("INSERT INTO pauses (key, until) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET until = MAX(until, excluded.until)", (key, until))
+
+    def utilization(self, key, session=None):
+        """사이드바 표시용: 최근 1분 요청·토큰 사용량과 한도, 활동 중인 세션 수, 이 세션의 사용량, 일시 정지 남은 초."""
+        now = time.time()
+        with self._connect() as conn:
+            requests, tokens, per_session, _ = self._usage(conn, key, now)
+            active = conn.execute("SELECT COUNT(*) FROM sessions WHERE key = ? AND seen >= ?", (key, now - _SESSION_TTL)).fetchone()[0]
+            row = conn.execute("SELECT until FROM pauses WHERE key = ?", (key,)).fetchone()
+        mine_requests, mine_tokens = per_session.get(session, (0, 0))
+        return {"requests": requests, "rpm": self.rpm, "tokens": tokens, "tpm": self.tpm, "sessions": active,
+                "mine_requests": mine_requests, "mine_tokens": mine_tokens, "paused": max(0.0, row[0] - now) if row else 0.0}
+
+
+class _SettlingStream:
+    """스트림 응답을 그대로 흘려보내고, 끝까지 읽히면 usage_metadata로 원장을 정산. 읽는 도중 난 오류는 on_error에 먼저 알림."""
+
+    def __init__(self, response, settle, on_error):
+        self._response = response
+        self._settle = settle
+        self._on_error = on_error
+
+    def __iter__(self):
+        try:
+            for chunk in self._response: yield chunk
+        except Exception as e:
+            self._on_error(e)
+            raise
+        self._settle(self._response)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class QuotaModel:
+    """
+    모든 generate_content를 SharedQuota에 통과시키는 모델 래퍼 (세션 = 할당량을 나눠 받을 사용자 단위).
+    cancelled(작업 취소 확인 함수)가 있으면 할당량을 기다리는 도중에도 취소되면 CallCancelled로 멈춥니다.
+    429는 요청 시점이든 스트림을 읽는 도중이든 원장에 일시 정지로 남긴 뒤 그대로 올려 보내 기존 재시도(BackoffController)가 처리하게 합니다.
+    """
+
+    def __init__(self, model, quota, key, session, cancelled=None):
+        self._model = model
+        self.quota = quota
+        self.key = key
+        self.session = session
+        self.cancelled = cancelled
+        self.model_name = getattr(model, "model_name", "")
+        self.system_instruction = getattr(model, "system_instruction", None)
+        self.response_schema = getattr(model, "response_schema", None)
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return QuotaModel(with_system_prompt(self._model, instruction, response_schema), self.quota, self.key, self.session, self.cancelled)
+
+    def with_cancelled(self, cancelled):
+        """같은 모델·할당량에 작업의 취소 확인 함수를 붙인 래퍼 (제출 시점에 만든 모델을 작업 안에서 쓸 때)."""
+        return QuotaModel(self._model, self.quota, self.key, self.session, cancelled)
+
+    def _settle(self, row_id, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage is None: return
+        self.quota.settle(row_id, (getattr(usage, "prompt_token_count", 0) or 0) + (getattr(usage, "candidates_token_count", 0) or 0))
+
+    def _pause_if_rate_limited(self, error):
+        if is_rate_limited(error): self.quota.pause(self.key, retry_after(error) or _DEFAULT_PAUSE_SECONDS)
+
+    def generate_content(self, contents, **kwargs):
+        row_id = self.quota.acquire(self.key, self.session, self.cancelled)
+        try: response = self._model.generate_content(contents, **kwargs)
+        except Exception as e:
+            self._pause_if_rate_limited(e)
+            raise
+        if kwargs.get("stream"): return _SettlingStream(response, lambda r: self._settle(row_id, r), self._pause_if_rate_limited)
+        self._settle(row_id, response)
+        return response
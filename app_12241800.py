@@ -1,13 +1,24 @@
 import streamlit as st
 import os
-import io
-import tempfile
-import time
 import json
-import re
-import zipfile
-import google.generativeai as genai
-from pdf2image import convert_from_path
+import multiprocessing
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from review_executor import run_ordered
+from review_cache import ReviewCache
+from audit_history import AuditHistory
+from audit_journal import AuditJournal, content_hash
+from audit_metrics import Metrics, use_metrics
+from api_quota import QuotaModel, SharedQuota, quota_key
+from audit_jobs import JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED, JOB_INTERRUPTED, JOB_ACTIVE_STATES, JobQueue, JobStore
+from page_preprocess import OCR_IMAGE_MODES, OCR_IMAGE_FORMATS, OCR_IMAGE_MODE, OCR_IMAGE_FORMAT, OCR_IMAGE_QUALITY, OCR_MAX_PIXELS, OCR_CROP_MARGINS, PagePreprocessor
+from model_backend import BACKEND_KINDS, DEFAULT_BACKEND, backend_needs_api_key, backend_storage_dir, create_backend
+from audit_core import (
+    DEFAULT_MAX_WORKERS, DEFAULT_MAX_RPM, DEFAULT_PACK_TOKENS, REVIEW_CACHE_DIR, REVIEW_CACHE_MAX_MB, REVIEW_CACHE_MAX_AGE_DAYS,
+    AUDIT_HISTORY_DIR, AUDIT_JOURNAL_DIR, METRICS_DIR, AUDIT_JOB_DIR, API_QUOTA_DIR, TexReportStream, FINDING_SEVERITIES, tex_item_report, ingest_zip_files, audit_tex_files, create_rate_controller, record_backoff_stats, plan_tex_reaudit,
+    PDF_USE_TEXT_LAYER, process_pdf, split_pdf_sections, review_pdf_section, generate_report_for_pdf,
+)
 
 # ==========================================
 # [초기 설정]
@@ -54,391 +65,475 @@ st.markdown("""
 # ==========================================
 DEFAULT_API_KEY = ""
 
-if os.name == 'nt':
-    POPPLER_PATH = r"C:\Users\inter\Desktop\Review\poppler-25.12.0\Library\bin"
-else:
-    POPPLER_PATH = None
+# 업로드된 ZIP 파싱 결과를 재실행(rerun) 사이에 보관할 최대 개수
+PARSED_ZIP_CACHE_ENTRIES = 64
 
-# ==========================================
-# [프롬프트]
-# ==========================================
-PROMPT_FOR_TEX = """
-# 🏆 종합 학술 감사관 (Scholarly Auditor v8.2)
-
-## 1. 역할
-고등 수학 교육 콘텐츠의 **최종 검증자**로서, 오류를 찾아내어 **깔끔한 표(Table)**로 보고합니다.
-
-## 2. 출력 형식 (엄수)
-서술형 줄글을 절대 쓰지 마십시오. 오직 **아래의 표 형식**으로만 출력하십시오.
-오류가 없다면 표를 출력하지 말고 "✅ **발견된 오류 없음**"이라고만 쓰십시오.
-
-### [Table A: 학술 감사 보고서] (치명적 오류)
-* **기준:** 수학적 진리값, 정답, 부호, 개념 오류 (확신도 100%)
-| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 | 근거 및 의견 |
-| :--- | :--- | :--- | :--- |
-| (예: 해설 3행) | (예: 부호 오류) | **[원문]** $f(t)$ <br> $\\downarrow$ <br> **[수정]** $f(-t)$ | y축 대칭이므로 -t 대입 필요 |
-
-### [Table B: 변환 오류 클린업] (단순 수정)
-* **기준:** 띄어쓰기, 오타, 문법, 단순 편집
-| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 |
-| :--- | :--- | :--- |
-| (예: 문제 1행) | (예: 띄어쓰기) | 3 개를 $\\to$ 3개를 |
-
-### [Table C: 개선 제안] (권장 사항)
-* **기준:** 더 나은 풀이, 가독성, 교육적 제안
-| 위치 | 제안 유형 | 내용 및 의견 |
-| :--- | :--- | :--- |
-| (예: 식 (나)) | (예: 풀이 개선) | 로피탈 정리보다 미분계수 정의를 사용하는 것이 좋습니다. |
-
-## 3. 주의 사항
-1. 각 표의 헤더(Table A, B, C)는 오류가 있을 때만 출력하세요.
-2. 수식은 LaTeX 문법($$)을 유지하세요.
-"""
-
-PROMPT_FOR_PDF = """
-당신은 대한민국 고등학교 수학 교재 전문 교정자입니다.
-아래 텍스트에서 오류를 찾아 JSON으로 출력하세요.
-(기존 프롬프트 생략...)
-[
-    {{
-        "original": "문제가 있는 부분",
-        "corrected": "수정 제안",
-        "reason": "수정 이유",
-        "severity": "high/medium/low"
-    }}
-]
-"""
+# 여러 ZIP을 동시에 추출·파싱할 프로세스 수
+ZIP_INGEST_WORKERS = min(4, os.cpu_count() or 1)
 
-# ==========================================
-# [공통 유틸리티]
-# ==========================================
-_JONGSUNG_LIST = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
-_LATIN_LAST_JONG = {"A": "", "B": "", "C": "", "D": "", "E": "", "F": "", "G": "", "H": "", "I": "", "J": "", "K": "", "L": "ㄹ", "M": "ㅁ", "N": "ㄴ", "O": "", "P": "", "Q": "", "R": "ㄹ", "S": "", "T": "", "U": "", "V": "", "W": "", "X": "", "Y": "", "Z": ""}
-_DIGIT_LAST_JONG = {"0": "ㅇ", "1": "ㄹ", "2": "", "3": "ㅁ", "4": "", "5": "", "6": "ㄱ", "7": "ㄹ", "8": "ㄹ", "9": ""}
-_MATH_JOSA_PATTERN = re.compile(r'(?P<math>\${1,2}[^$]+?\${1,2})(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
-_NUM_JOSA_PATTERN = re.compile(r'(?P<num>\d[\d,]*(?:\.\d+)?)(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
-
-def _hangul_last_jong(text):
-    if not text: return ""
-    s = re.sub(r'[\s\.,;:!\?\)\]\}]+$', '', text.strip())
-    for ch in reversed(s):
-        code = ord(ch)
-        if 0xAC00 <= code <= 0xD7A3: return _JONGSUNG_LIST[(code - 0xAC00) % 28]
-    return ""
-def _number_last_jong(num_raw):
-    if not num_raw: return ""
-    s = num_raw.strip().replace(",", "").replace(" ", "").lstrip("+")
-    if s.startswith("-"): s = s[1:]
-    if "." in s: return _DIGIT_LAST_JONG.get(s.split(".")[1][-1], "") if s.split(".")[1] else ""
-    digits = re.sub(r"\D", "", s).lstrip("0") or "0"
-    if digits == "0": return "ㅇ"
-    return _DIGIT_LAST_JONG.get(digits[-1])
-def _latin_last_jong(text):
-    s = text.strip()
-    if not s: return ""
-    for ch in reversed(s):
-        if ch.isalpha(): return _LATIN_LAST_JONG.get(ch.upper(), "")
-    return ""
-def _expected_josa(josa, last_jong):
-    has = (last_jong != "")
-    if josa in ("은", "는"): return "은" if has else "는"
-    if josa in ("이", "가"): return "이" if has else "가"
-    if josa in ("을", "를"): return "을" if has else "를"
-    if josa in ("과", "와"): return "과" if has else "와"
-    if josa in ("으로", "로"): return "로" if (not has or last_jong == "ㄹ") else "으로"
-    return josa
-def _last_jong_from_math(math): return "" 
-def get_line_number(full_text, index): return full_text.count('\n', 0, index) + 1
-
-def rule_check_josa(section_text):
-    errors = []
-    for m in _MATH_JOSA_PATTERN.finditer(section_text):
-        math = m.group("math")
-        ws = m.group("ws") or ""
-        josa = m.group("josa")
-        last_jong = _last_jong_from_math(math) 
-        math_content = math.strip("$")
-        last_char = math_content[-1] if math_content else ""
-        if re.match(r'\d', last_char): derived_jong = _number_last_jong(last_char)
-        elif re.match(r'[A-Za-z]', last_char): derived_jong = _latin_last_jong(last_char)
-        else: derived_jong = "" 
-        exp = _expected_josa(josa, derived_jong)
-        original = f"{math}{ws}{josa}"
-        corrected = f"{math}{exp}"
-        line_num = get_line_number(section_text, m.start())
-        if josa != exp and derived_jong != "":
-            errors.append({"location": f"{line_num}행", "original": original, "corrected": corrected, "reason": "조사 오류(수식)", "severity": "medium"})
-    for m in _NUM_JOSA_PATTERN.finditer(section_text):
-        num = m.group("num")
-        ws = m.group("ws") or ""
-        josa = m.group("josa")
-        if m.start() > 0 and section_text[m.start() - 1] == "$": continue
-        last_jong = _number_last_jong(num)
-        exp = _expected_josa(josa, last_jong)
-        original = f"{num}{ws}{josa}"
-        corrected = f"{num}{exp}"
-        line_num = get_line_number(section_text, m.start())
-        if josa != exp or ws:
-            errors.append({"location": f"{line_num}행", "original": original, "corrected": corrected, "reason": "조사 오류(숫자)", "severity": "medium"})
-    return errors
-
-def _dedup_errors(errors):
-    seen = set(); out = []
-    for e in errors:
-        key = (e.get("original",""), e.get("corrected",""), e.get("reason",""))
-        if key in seen: continue
-        seen.add(key); out.append(e)
-    return out
+# 개발용 페이지 문항 뷰어의 페이지당 문항 수 선택지
+ITEM_VIEWER_PAGE_SIZES = [5, 10, 20, 50]
 
-# ==========================================
-# [로직 A] LaTeX ZIP 처리 (메인용)
-# ==========================================
-def extract_tex_from_zip(zip_file_bytes):
-    try:
-        with zipfile.ZipFile(zip_file_bytes) as z:
-            tex_files = [f for f in z.namelist() if f.lower().endswith('.tex')]
-            if not tex_files: return None, "ZIP 파일 내에 .tex 파일이 없습니다."
-            target_file = tex_files[0]
-            try: content = z.read(target_file).decode('utf-8')
-            except UnicodeDecodeError: content = z.read(target_file).decode('cp949')
-            return content, None
-    except Exception as e: return None, f"ZIP 처리 오류: {str(e)}"
-
-# [메인 페이지용 구형 파서 - 유지]
-def parse_tex_content(tex_content):
-    pattern = r'\\begin\{document\}([\s\S]*?)\\end\{document\}'
-    match = re.search(pattern, tex_content)
-    body = match.group(1).strip() if match else tex_content
-    body = re.sub(r'\\maketitle', '', body)
-    body = re.sub(r'\\newpage', '', body)
-    body = re.sub(r'\\clearpage', '', body)
-    start_pattern = re.compile(r'\\section\*?\{')
-    matches = list(start_pattern.finditer(body))
-    if not matches: return [body]
-    chunks = []
-    for i in range(len(matches)):
-        start_idx = matches[i].start()
-        end_idx = matches[i+1].start() if i + 1 < len(matches) else len(body)
-        chunks.append(body[start_idx:end_idx])
-    final_items = []
-    current_item_text = ""
-    explanation_keywords = ["해법", "해설", "풀이", "정답", "Solution", "성질", "개념", "정리", "분석", "접근", "Note", "Tip", "Guide", "공식"]
-    ignore_keywords = ["Day", "일차"] 
-    for chunk in chunks:
-        brace_open_index = chunk.find('{')
-        title_content = ""
-        if brace_open_index != -1:
-            brace_count = 1
-            for k, char in enumerate(chunk[brace_open_index+1:], 1):
-                if char == '{': brace_count += 1
-                elif char == '}': brace_count -= 1
-                if brace_count == 0:
-                    title_content = chunk[brace_open_index+1 : brace_open_index+k]
-                    break
-        is_ignore = any(kw in title_content for kw in ignore_keywords)
-        is_explicit_explanation = any(kw in title_content for kw in explanation_keywords)
-        has_korean_text = bool(re.search(r'[가-힣]', title_content))
-        is_explanation = is_explicit_explanation or (has_korean_text and not is_ignore)
-        if is_ignore:
-            if current_item_text.strip(): final_items.append(current_item_text.strip())
-            current_item_text = ""
-            continue
-        if is_explanation:
-            if current_item_text: current_item_text += "\n" + chunk
-            else:
-                if final_items: final_items[-1] += "\n" + chunk
-                else: current_item_text = chunk
-        else:
-            if current_item_text.strip(): final_items.append(current_item_text.strip())
-            current_item_text = chunk
-    if current_item_text.strip(): final_items.append(current_item_text.strip())
-    return final_items
+# 대기·실행 중인 작업의 진행 상황을 다시 읽어 그리는 간격(초)
+JOB_POLL_SECONDS = 1.0
+
+# 사이드바의 공유 할당량 사용률을 다시 읽어 그리는 간격(초)
+QUOTA_POLL_SECONDS = 2.0
 
 # ==========================================
-# [NEW] 개발용 파서 (문항 번호 기준 엄격 분리)
+# [화면 전환 관리]
 # ==========================================
-def parse_tex_content_dev(tex_content):
+if 'current_page' not in st.session_state:
+    st.session_state.current_page = 'main'
+
+def navigate_to(page):
+    st.session_state.current_page = page
+
+def render_concurrency_settings():
+    if 'max_workers' not in st.session_state: st.session_state.max_workers = DEFAULT_MAX_WORKERS
+    if 'max_rpm' not in st.session_state: st.session_state.max_rpm = DEFAULT_MAX_RPM
+    if 'pack_tokens' not in st.session_state: st.session_state.pack_tokens = DEFAULT_PACK_TOKENS
+    st.number_input("동시 요청 수", min_value=1, max_value=16, step=1, key="max_workers")
+    st.number_input("분당 요청 한도 (RPM, 0=무제한)", min_value=0, max_value=2000, step=1, key="max_rpm")
+    st.number_input("문항 묶음 요청 토큰 한도 (0=묶지 않음)", min_value=0, max_value=100000, step=500, key="pack_tokens",
+                    help="짧은 문항 여러 개를 한 요청으로 보내 왕복 횟수와 반복되는 프롬프트 토큰을 줄입니다.")
+
+_BACKEND_LABELS = {"gemini": "Gemini (실제 API)", "stub": "스텁 (오프라인, 오류 없음 응답)", "record": "Gemini + 카세트 녹화", "replay": "카세트 재생 (오프라인)"}
+
+def render_backend_settings():
+    if 'model_backend' not in st.session_state: st.session_state.model_backend = DEFAULT_BACKEND if DEFAULT_BACKEND in BACKEND_KINDS else "gemini"
+    st.selectbox("모델 백엔드", BACKEND_KINDS, format_func=_BACKEND_LABELS.get, key="model_backend")
+    render_quota_status()
+
+@st.cache_resource
+def get_shared_quota():
+    return SharedQuota(API_QUOTA_DIR)
+
+def render_quota_status():
+    """같은 API 키를 쓰는 모든 세션의 최근 1분 사용량과 한도 (QUOTA_POLL_SECONDS마다 이 부분만 갱신)."""
+    if not backend_needs_api_key(st.session_state.model_backend) or not st.session_state.get('api_key'): return
+    key, owner = quota_key(st.session_state.api_key), current_owner()
+
+    @st.fragment(run_every=QUOTA_POLL_SECONDS)
+    def _status():
+        usage = get_shared_quota().utilization(key, owner)
+        st.caption(f"🔑 공유 할당량 (최근 1분, 사용자 {usage['sessions']}명 · 내 요청 {usage['mine_requests']}회)")
+        if usage['rpm']: st.progress(min(1.0, usage['requests'] / usage['rpm']), text=f"요청 {usage['requests']}/{usage['rpm']} RPM")
+        if usage['tpm']: st.progress(min(1.0, usage['tokens'] / usage['tpm']), text=f"토큰 {usage['tokens']:,}/{usage['tpm']:,} TPM")
+        if usage['paused']: st.caption(f"⏸️ 할당량 초과(429)로 {usage['paused']:.0f}초 동안 모든 요청 일시 정지")
+    _status()
+
+def current_backend():
+    return st.session_state.get('model_backend', DEFAULT_BACKEND)
+
+def create_page_model():
     """
-    [개발용] TeX 내용을 줄 단위로 읽어 (문항 + 모든 해설) 세트로 분리.
-    오직 '문항 번호'가 나올 때만 세트를 끊습니다.
+    사이드바에서 고른 백엔드로 모델 생성. API 키가 필요한 백엔드인데 키가 없으면 중단.
+    실제 API를 부르는 백엔드는 같은 키를 쓰는 모든 세션과 한도를 나눠 쓰도록 공유 할당량을 거치게 합니다.
     """
-    # 1. 문서 본문 추출
-    pattern = r'\\begin\{document\}([\s\S]*?)\\end\{document\}'
-    match = re.search(pattern, tex_content)
-    body = match.group(1).strip() if match else tex_content
-
-    # 2. 불필요한 LaTeX 명령어 제거
-    body = re.sub(r'\\maketitle', '', body)
-    body = re.sub(r'\\newpage', '', body)
-    body = re.sub(r'\\clearpage', '', body)
-    
-    # 3. 줄 단위로 처리
-    lines = [line.strip() for line in body.split('\n') if line.strip()]
-    
-    items = []
-    current_item_lines = []
-    current_item_label = "서문/공통" 
-    
-    # [정규식 정의]
-    # 1. 순수 숫자 (예: "28", "29.")
-    regex_pure_num = re.compile(r'^\d+(\.\s*)?$')
-    # 2. 섹션 내의 숫자 (예: \section*{28}, \section*{110 \\ 29})
-    # 주의: \section*{해법} 같은 건 잡히면 안 됨. 오직 숫자, 공백, 줄바꿈(\\)만 허용
-    regex_section_num = re.compile(r'^\\section\*?\{\s*(\d+(\s*\\\\)?\s*)+\}$')
-    
-    ignore_keywords = ["Day", "일차"] 
+    kind = current_backend()
+    if backend_needs_api_key(kind) and not st.session_state.api_key: st.error("API Key를 입력해주세요."); st.stop()
+    model = create_backend(kind, st.session_state.api_key)
+    if not backend_needs_api_key(kind): return model
+    return QuotaModel(model, get_shared_quota(), quota_key(st.session_state.api_key), current_owner())
+
+def job_model(model, ctx):
+    """작업 안에서 쓸 모델: 공유 할당량 대기도 작업 취소에 바로 깨어나게 하고, 작업 큐의 요청 자리를 거치게 함."""
+    if isinstance(model, QuotaModel): model = model.with_cancelled(lambda: ctx.cancelled)
+    return ctx.guard(model)
+
+@st.cache_resource
+def get_review_cache():
+    return ReviewCache(REVIEW_CACHE_DIR, REVIEW_CACHE_MAX_MB * 1024 * 1024, REVIEW_CACHE_MAX_AGE_DAYS)
+
+def render_cache_settings():
+    st.checkbox("캐시 사용 안 함 (항상 새로 요청)", key="bypass_cache")
+    stats = get_review_cache().stats()
+    st.caption(f"🗄️ 캐시: {stats['entries']}개 ({stats['bytes'] / 1024 / 1024:.1f}MB) · 적중 {stats['hits']} / 미스 {stats['misses']}")
+
+def active_review_cache():
+    """사이드바에서 '캐시 사용 안 함'을 선택했으면 None (조회·저장 모두 생략)."""
+    return None if st.session_state.get('bypass_cache') else get_review_cache()
+
+@st.cache_resource
+def get_audit_history(kind):
+    return AuditHistory(backend_storage_dir(kind, AUDIT_HISTORY_DIR))
+
+def open_journal(page, file_hashes):
+    """현재 백엔드의 저널 (스텁·재생 실행의 완료분은 실제 API 실행에서 이어서 하기로 쓰이지 않음)."""
+    return AuditJournal(backend_storage_dir(current_backend(), AUDIT_JOURNAL_DIR), page, file_hashes)
+
+@st.cache_resource
+def get_ingest_pool():
+    # 서버의 스레드 상태를 복제하지 않도록 spawn으로 띄운 풀을 세션 간에 재사용
+    return ProcessPoolExecutor(max_workers=ZIP_INGEST_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+def load_zip_items(zip_blobs, zip_hashes, dev=False):
+    """
+    업로드 내용(바이트) 해시 기준으로 추출·파싱 결과를 세션에 메모이즈하고, 처음 보는 ZIP만 프로세스 풀에서 동시에 파싱.
+    위젯 조작으로 스크립트가 다시 실행돼도 새로 추가된 파일만 파싱합니다. 반환값: 업로드 순서대로 [(문항 목록, 오류, 경고)]
+    """
+    parsed = st.session_state.setdefault('parsed_zips', {})
+    keys = [(h, dev) for h in zip_hashes]
+    missing = {key: blob for key, blob in zip(keys, zip_blobs) if key not in parsed}
+    if missing:
+        with use_metrics(upload_metrics()):
+            for key, result in zip(missing, ingest_zip_files(missing.values(), dev, pool=get_ingest_pool())): parsed[key] = result
+        for stale in list(parsed)[:max(0, len(parsed) - max(PARSED_ZIP_CACHE_ENTRIES, len(keys)))]: del parsed[stale]
+    return [parsed[key] for key in keys]
+
+def render_item_viewer(items, idx):
+    """
+    문항 뷰어: 라벨 검색·페이지 나누기·바로 가기를 지원하고 현재 페이지의 문항만 렌더링.
+    편집기(text_area)는 '편집' 토글을 켠 문항에만 만듭니다.
+    """
+    search_key, size_key, page_key, jump_key = f"viewer_search_{idx}", f"viewer_size_{idx}", f"viewer_page_{idx}", f"viewer_jump_{idx}"
+    labels = [item.get('label', f"{j+1}") for j, item in enumerate(items)]
+    if size_key not in st.session_state: st.session_state[size_key] = ITEM_VIEWER_PAGE_SIZES[1]
+
+    def _jump():
+        target = st.session_state[jump_key]
+        if target is None: return
+        st.session_state[search_key] = ""
+        st.session_state[page_key] = target // st.session_state[size_key] + 1
+
+    c1, c2, c3 = st.columns([3, 1, 2])
+    with c1: query = st.text_input("🔎 라벨 검색", key=search_key, placeholder="예: 28")
+    with c2: page_size = st.selectbox("페이지당 문항", ITEM_VIEWER_PAGE_SIZES, key=size_key)
+    with c3: st.selectbox("📍 문항으로 이동", list(range(len(items))), index=None, format_func=lambda j: labels[j],
+                          key=jump_key, on_change=_jump, placeholder="문항 선택")
+
+    query = query.strip().lower()
+    matched = [j for j, label in enumerate(labels) if query in label.lower()] if query else list(range(len(items)))
+    total_pages = max(1, -(-len(matched) // page_size))
+    if st.session_state.get(page_key, 1) > total_pages: st.session_state[page_key] = total_pages
+    page = st.number_input(f"페이지 (총 {total_pages})", min_value=1, max_value=total_pages, step=1, key=page_key)
+    visible = matched[(page - 1) * page_size : page * page_size]
+    if not visible:
+        st.caption("검색 결과가 없습니다.")
+        return
+    st.caption(f"{len(matched)}개 중 {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(visible)}번째 표시")
+
+    for j in visible:
+        item_text = items[j].get('content', '')
+        with st.expander(labels[j], expanded=True):
+            if items[j].get('source'): st.caption(f"📄 {items[j]['source']}")
+            # 각 문항마다 탭 생성
+            tab1, tab2 = st.tabs(["🦁LaTeX", "📝메모장st"])
+            with tab1:
+                st.code(item_text, language='latex')
+            with tab2:
+                if st.toggle("편집", key=f"Dev_Edit_On_{idx}_{j}"):
+                    st.text_area(f"Dev_Edit_{idx}_{j}", value=item_text, height=300, label_visibility="collapsed")
+        st.divider()
 
-    for line in lines:
-        is_ignore = any(kw in line for kw in ignore_keywords)
-        if is_ignore: continue
+def render_resume_option(journal, key):
+    """같은 업로드로 중단된 작업이 있으면 '이어서 하기'를 제안. 이어서 할지 여부를 반환."""
+    if not len(journal): return False
+    st.info(f"💾 같은 파일로 중단된 작업이 있습니다. 완료된 항목 {len(journal)}개가 저장되어 있습니다.")
+    return st.checkbox("이어서 하기 (완료된 항목은 건너뜀)", value=True, key=key)
+
+def journaling_callback(journal, all_files_data, report_stream, item_done=None):
+    """문항이 끝날 때마다 저널에 먼저 기록한 뒤 보고서 스트림과 작업 저장소(item_done)에 넘기는 result_callback."""
+    def _on_item_done(f_idx, j, result):
+        journal.append(all_files_data[f_idx]['hash'], j, result)
+        report_stream.put(f_idx, j, result)
+        if item_done: item_done(f_idx, j, result)
+    return _on_item_done
+
+_SEVERITY_BADGES = {"high": "🔴 높음", "medium": "🟡 보통", "low": "🟢 낮음"}
+
+def format_severity_counts(counts):
+    return " · ".join(f"{_SEVERITY_BADGES[level]} {counts[level]}" for level in FINDING_SEVERITIES)
+
+def finish_journal(journal, results_by_file):
+    """API 오류 없이 끝났으면 저널 삭제 (오류가 남았으면 다음에 그 문항만 이어서 할 수 있도록 보존)."""
+    if not any("api_error" in r for results in results_by_file.values() for r in results): journal.clear()
+
+_IMAGE_MODE_LABELS = {"rgb": "컬러", "gray": "흑백", "binary": "이진화"}
+
+def render_preprocess_settings():
+    """OCR 업로드 이미지 전처리 설정. 끄면 None (원본 이미지를 그대로 전송)."""
+    with st.expander("🖼️ OCR 이미지 전처리"):
+        if not st.checkbox("업로드 전 이미지 줄이기", value=True, key="ocr_preprocess"): return None
+        crop = st.checkbox("여백 자르기", value=OCR_CROP_MARGINS, key="ocr_crop")
+        mode = st.selectbox("색상", OCR_IMAGE_MODES, index=OCR_IMAGE_MODES.index(OCR_IMAGE_MODE), format_func=_IMAGE_MODE_LABELS.get, key="ocr_mode")
+        image_format = st.selectbox("형식", OCR_IMAGE_FORMATS, index=OCR_IMAGE_FORMATS.index(OCR_IMAGE_FORMAT.upper()), key="ocr_format")
+        quality = st.slider("품질 (JPEG/WebP)", 30, 100, OCR_IMAGE_QUALITY, key="ocr_quality", disabled=image_format == "PNG")
+        megapixels = st.number_input("최대 화소 (백만)", min_value=0.5, max_value=20.0, value=OCR_MAX_PIXELS / 1e6, step=0.5, key="ocr_megapixels")
+    return PagePreprocessor(mode, image_format, quality, int(megapixels * 1e6), crop)
+
+def render_preprocess_report(summary, report):
+    if not summary['pages']: return
+    st.caption(f"🖼️ 업로드 {summary['upload_bytes'] / 1024 / 1024:.1f}MB (원본 픽셀 {summary['raw_bytes'] / 1024 / 1024:.1f}MB 대비 "
+               f"{summary['saved_ratio']:.0%} 절감) · 페이지당 전처리 {summary['seconds_per_page'] * 1000:.0f}ms")
+    with st.expander("페이지별 전처리 결과"):
+        st.dataframe([{"페이지": r['page'], "원본 크기": f"{r['original_size'][0]}×{r['original_size'][1]}", "전송 크기": f"{r['final_size'][0]}×{r['final_size'][1]}",
+                       "업로드(KB)": round(r['upload_bytes'] / 1024, 1), "처리(ms)": round(r['seconds'] * 1000)} for r in report])
+
+def begin_upload_metrics(uploaded_files):
+    """업로드 목록이 바뀌면 이 세션의 업로드 계측을 새로 시작 (ZIP 추출·파싱 시간은 다음 작업의 계측으로 넘어감)."""
+    upload_key = tuple((f.name, f.size) for f in uploaded_files)
+    if st.session_state.get('metrics_upload') != upload_key:
+        st.session_state.upload_metrics = Metrics()
+        st.session_state.metrics_upload = upload_key
+
+def upload_metrics():
+    if 'upload_metrics' not in st.session_state: st.session_state.upload_metrics = Metrics()
+    return st.session_state.upload_metrics
+
+def job_metrics_summary(job):
+    """실행 중인 작업은 그 작업 계측기의 현재 값, 끝난 작업은 저장된 계측 파일 (없으면 None)."""
+    summary = get_job_queue().metrics(job['id'])
+    if summary is not None: return summary
+    metrics_path = job['artifacts'].get('metrics_path')
+    if not metrics_path or not os.path.exists(metrics_path): return None
+    with open(metrics_path, encoding="utf-8") as f: return json.load(f)
+
+def render_metrics_summary(box, summary):
+    with box.container():
+        st.markdown("#### 📈 작업 계측")
+        for kind, req in summary['requests'].items():
+            st.caption(f"**{kind}** {req['count']}회 (오류 {req['errors']}) · p50 {req['p50']:.2f}s · p95 {req['p95']:.2f}s · "
+                       f"토큰 {req['prompt_tokens']:,} → {req['response_tokens']:,}")
+        stages = sorted(((name, stat) for name, stat in summary['stages'].items() if not name.startswith("rule:")), key=lambda kv: -kv[1]['seconds'])
+        if stages: st.caption("⏱️ " + " · ".join(f"{name} {stat['seconds']:.1f}s" for name, stat in stages))
+        counters = summary['counters']
+        scan = summary['stages'].get('rule_scan')
+        if scan:
+            rules = [(name[len("rule:"):], stat) for name, stat in summary['stages'].items() if name.startswith("rule:")]
+            st.caption(f"🧹 규칙 검사 {scan['calls']:,}문항 {scan['seconds']:.2f}s · " +
+                       " · ".join(f"{name} {stat['calls']:,}매치/{counters.get('rule_errors:' + name, 0):,}오류 {stat['seconds']:.2f}s" for name, stat in rules))
+        if counters: st.caption("🗄️ 캐시 적중 {} / 미스 {}".format(counters.get('cache_hit', 0), counters.get('cache_miss', 0)))
+        if counters.get('context_cache_errors'): st.caption(f"⚠️ 컨텍스트 캐시 생성 실패 {counters['context_cache_errors']}회 (시스템 지시로 대체)")
+        if counters.get('backoff:calls'):
+            st.caption("🚦 재시도 {} · 429 {} · 일시 오류 {} · 서킷 개방 {} (정지 {:.0f}s){}".format(
+                counters.get('backoff:retries', 0), counters.get('backoff:rate_limited', 0), counters.get('backoff:transient', 0),
+                counters.get('backoff:breaker_opens', 0), counters.get('backoff:paused_seconds', 0), " · ⛔ 중단됨" if counters.get('backoff:tripped') else ""))
+        if summary['slowest_requests']:
+            slowest = summary['slowest_requests'][0]
+            st.caption(f"🐢 가장 느린 요청: {slowest['label'] or slowest['kind']} ({slowest['seconds']:.1f}s)")
+
+@st.cache_resource
+def get_job_queue():
+    return JobQueue(JobStore(AUDIT_JOB_DIR))
+
+def current_owner():
+    """작업 대기열에서 사용자를 구분하는 ID. URL(query parameter)에 두어 새로고침해도 같은 사용자로 봅니다."""
+    if 'owner' not in st.query_params: st.query_params['owner'] = uuid.uuid4().hex[:12]
+    return st.query_params['owner']
+
+def page_job(page):
+    """URL에 기록된 이 화면의 마지막 작업 (없거나 이미 지워졌으면 None)."""
+    job_id = st.query_params.get(f"{page}_job")
+    return get_job_queue().store.get(job_id) if job_id else None
+
+def page_job_active(page):
+    job = page_job(page)
+    return job is not None and job['status'] in JOB_ACTIVE_STATES
+
+def with_job_metrics(page, run, max_rpm, uploaded=None):
+    """
+    작업 함수를 감싸 작업별 계측기(ctx.metrics)에 업로드 때 기록된 추출·파싱 시간(uploaded)을 옮겨 두고,
+    끝나면 작업별 계측 파일(JSON)을 저장해 산출물로 기록합니다. 동시에 실행되는 다른 작업의 요청은 섞이지 않습니다.
+    """
+    def _run(ctx):
+        if uploaded is not None: ctx.metrics.inherit_stages(uploaded, ("zip_extract", "parse"))
+        try: run(ctx)
+        finally:
+            path = ctx.metrics.write(os.path.join(METRICS_DIR, f"{page}_{time.strftime('%Y%m%d_%H%M%S')}_{ctx.job_id[:8]}.json"), page=page,
+                                     job=ctx.job_id, concurrent_jobs=ctx.concurrent_jobs, max_workers=ctx.max_workers, max_rpm=max_rpm)
+            ctx.set_artifact("metrics_path", path)
+    return _run
+
+def submit_job(page, title, files, run):
+    """
+    작업을 대기열에 넣고 작업 ID를 URL에 기록 (새로고침하거나 다른 화면에 다녀와도 진행 상황을 다시 볼 수 있음).
+    run(ctx)는 worker 스레드에서 실행되므로 st.*를 부르지 않고 ctx로만 진행·결과를 남겨야 합니다.
+    """
+    job_id = get_job_queue().submit(page, current_owner(), title, files, with_job_metrics(page, run, st.session_state.max_rpm, upload_metrics()),
+                                    st.session_state.max_workers)
+    st.query_params[f"{page}_job"] = job_id
+    return job_id
 
-        # --- 문항 시작 판별 로직 ---
-        is_question_start = False
-        new_label = ""
+_JOB_STATUS_LABELS = {JOB_QUEUED: "⏳ 대기 중", JOB_RUNNING: "⚙️ 실행 중", JOB_DONE: "✅ 완료", JOB_FAILED: "❌ 실패",
+                      JOB_CANCELLED: "⏹️ 취소됨", JOB_INTERRUPTED: "⚠️ 중단됨 (서버 재시작 - 같은 파일로 다시 시작하면 이어서 할 수 있습니다)"}
 
-        if regex_pure_num.match(line):
-            is_question_start = True
-            new_label = line.replace('.', '').strip()
-            
-        elif regex_section_num.match(line):
-            # 섹션 내부 텍스트 추출
-            inner_text = re.sub(r'\\section\*?\{', '', line).rstrip('}')
-            # 텍스트가 정말 숫자로만(또는 \\ 포함) 되어 있는지 확인
-            # (이미 regex_section_num이 거르긴 했지만 안전장치)
-            if re.fullmatch(r'[\d\s\\]+', inner_text):
-                is_question_start = True
-                # "110 \\ 29" 같은 경우 마지막 숫자 "29"를 라벨로 사용
-                new_label = inner_text.split(r'\\')[-1].strip()
-
-        # --- 분기 처리 ---
-        if is_question_start:
-            # 기존에 모으던 내용이 있으면 저장 (이전 문항 세트 완료)
-            if current_item_lines:
-                items.append({
-                    "label": f"{current_item_label}번 문항",
-                    "content": "\n".join(current_item_lines)
-                })
-                current_item_lines = []
-            
-            # 새 문항 시작
-            current_item_label = new_label
-            current_item_lines.append(line)
-        else:
-            # 문항 번호가 아니면 (해설, 개념, 지문 등) 무조건 현재 세트에 추가
-            current_item_lines.append(line)
-
-    # 마지막 문항 저장
-    if current_item_lines:
-        items.append({
-            "label": f"문항 {current_item_label}",
-            "content": "\n".join(current_item_lines)
-        })
-
-    # 후처리: 내용이 너무 짧은 항목 제거 (쓰레기 데이터)
-    valid_items = []
-    for item in items:
-        if len(item['content']) > 5:
-            valid_items.append(item)
-            
-    return valid_items
-
-# ==========================================
-# [공통] 리뷰 및 리포트 생성
-# ==========================================
-def review_tex_section(model, section_text, section_num):
-    rule_errors = rule_check_josa(section_text)
-    prompt = PROMPT_FOR_TEX + "\n\n---------------------------------------------------------\n[검토할 텍스트]\n" + section_text + "\n---------------------------------------------------------"
-    try:
-        response = model.generate_content(prompt)
-        return {"section": section_num, "rule_errors": rule_errors, "ai_report_text": response.text}
-    except Exception as e:
-        return {"section": section_num, "rule_errors": rule_errors, "api_error": str(e)}
-
-def generate_report_for_tex(results_grouped_by_file):
-    lines = ["# 🏆 종합 학술 감사 보고서\n"]
-    for filename, results in results_grouped_by_file.items():
-        lines.append(f"\n# 📁 파일: {filename}")
-        lines.append("---")
-        for res in results:
-            lines.append(f"\n## 📄 {res.get('label', '문항 세트 ' + str(res['section']))}")
-            if res.get('rule_errors'):
-                lines.append("### 🐍 [Python 규칙 감지] (참고용)")
-                lines.append("| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 |")
-                lines.append("| :--- | :--- | :--- |")
-                for err in res['rule_errors']:
-                    lines.append(f"| {err['location']} | {err['reason']} | {err['original']} $\\to$ {err['corrected']} |")
-                lines.append("\n")
-            if 'api_error' in res: 
-                lines.append(f"⚠️ **API Error:** {res['api_error']}")
-            else: 
-                lines.append(res['ai_report_text'])
-            lines.append("\n---")
-    return "\n".join(lines)
+def render_job(page, render_body, done_message):
+    """
+    이 화면의 작업 상태·진행률과 render_body(job)를 그림. 대기·실행 중에는 JOB_POLL_SECONDS마다 이 부분만 다시 읽어 그리고,
+    작업이 끝나면 화면 전체를 한 번 다시 실행해 폴링을 멈춥니다 (작업 자체는 화면과 무관하게 worker에서 진행).
+    """
+    job = page_job(page)
+    if job is None: return
+    queue = get_job_queue()
+    polling = job['status'] in JOB_ACTIVE_STATES
+
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def _view():
+        job = queue.store.get(st.query_params.get(f"{page}_job"))
+        if job is None: return
+        if polling and job['status'] not in JOB_ACTIVE_STATES: st.rerun()
+        st.divider()
+        line = f"**{_JOB_STATUS_LABELS[job['status']]}** · {job['title']}"
+        position = queue.queue_position(job['id']) if job['status'] == JOB_QUEUED else 0
+        if position: line += f" (대기 순서 {position}번째)"
+        st.markdown(line)
+        if job['status'] == JOB_RUNNING and job['total']:
+            st.progress(job['done'] / job['total'], text=f"{job['stage'] or ''} ({job['done']}/{job['total']})")
+        if job['status'] in JOB_ACTIVE_STATES and st.button("⏹️ 작업 취소", key=f"{page}_cancel"): queue.cancel(job['id'])
+        if job['error']: st.error(job['error'])
+        if job['status'] == JOB_DONE: st.success(done_message)
+        render_body(job)
+        with st.expander("📈 작업 계측"):
+            summary = job_metrics_summary(job)
+            if summary is not None: render_metrics_summary(st.empty(), summary)
+            metrics_path = job['artifacts'].get('metrics_path')
+            if metrics_path and os.path.exists(metrics_path):
+                with open(metrics_path, "rb") as f:
+                    st.download_button("📥 계측 파일 (JSON)", f, file_name=os.path.basename(metrics_path), key=f"{page}_metrics_download")
+
+    # 사이드바 요약: 본문과 같은 주기로 이 작업의 현재 계측만 다시 그림 (fragment 안에서는 st.sidebar를 못 쓰므로 따로 둠)
+    @st.fragment(run_every=JOB_POLL_SECONDS if polling else None)
+    def _sidebar_summary():
+        job = queue.store.get(st.query_params.get(f"{page}_job"))
+        summary = job_metrics_summary(job) if job is not None else None
+        if summary is not None: render_metrics_summary(st.empty(), summary)
+    _view()
+    with st.sidebar:
+        st.divider()
+        _sidebar_summary()
 
+def tex_job_files(all_files_data, removed_by_file=None):
+    """작업 화면에 보여줄 파일 목록 (문항 라벨과 이전 실행 대비 삭제된 문항 포함)."""
+    return [{"filename": data['filename'], "count": len(data['items']), "removed": (removed_by_file or {}).get(data['filename']),
+             "labels": [item.get('label', f"문항 {j+1}") if isinstance(item, dict) else f"문항 세트 {j+1}" for j, item in enumerate(data['items'])]}
+            for data in all_files_data]
 
-# ==========================================
-# [로직 B] 2512 PDF 처리
-# ==========================================
-def process_pdf(model, pdf_path, progress_callback=None):
-    try:
-        if POPPLER_PATH: pages = convert_from_path(pdf_path, dpi=300, poppler_path=POPPLER_PATH)
-        else: pages = convert_from_path(pdf_path, dpi=300)
-    except Exception as e: return None, f"오류: PDF 변환 실패 ({e})"
-    full_text = ""
-    prompt = "이미지 내용을 Markdown으로 변환(OCR)하세요. 수식은 LaTeX($$)사용, 한글 보존."
-    total_pages = len(pages)
-    for i, page in enumerate(pages):
-        if progress_callback: progress_callback(i + 1, total_pages, "변환")
+def submit_tex_job(page, all_files_data, journal, carried, changes=None, removed_by_file=None, history=None):
+    """
+    TeX 감사를 백그라운드 작업으로 제출. 모델·캐시·한도 설정은 제출 시점 값으로 고정됩니다.
+    보고서는 작업 파일로 결과가 도착하는 대로 기록하고, history가 있으면 끝난 뒤 파일별 결과를 저장합니다 (개정판 비교용).
+    """
+    model, cache = create_page_model(), active_review_cache()
+    max_rpm, pack_tokens = st.session_state.max_rpm, st.session_state.pack_tokens
+
+    def _run(ctx):
+        report_stream = TexReportStream([(data['filename'], len(data['items'])) for data in all_files_data], ctx.path(".md"), removed_by_file)
+        ctx.set_artifact("report_path", report_stream.path)
+        try: results_by_file = audit_tex_files(job_model(model, ctx), all_files_data, ctx.max_workers, max_rpm,
+                                               lambda done, total, filename: ctx.progress(done, total, f"📂 {filename} 검토 중..."),
+                                               cache, pack_tokens, carried, changes, journaling_callback(journal, all_files_data, report_stream, ctx.item_done),
+                                               cancelled=lambda: ctx.cancelled)
+        finally: report_stream.close()
+        if ctx.cancelled: return
+        if history is not None:
+            for file_data in all_files_data: history.save(file_data['filename'], file_data['items'], results_by_file[file_data['filename']])
+        finish_journal(journal, results_by_file)
+    return submit_job(page, f"TeX 감사 ({len(all_files_data)}개 파일)", tex_job_files(all_files_data, removed_by_file), _run)
+
+def tex_job_results_view(page, title, download_name):
+    """
+    TeX 작업 결과 화면(render_job의 render_body): 파일마다 끝난 문항 수와 심각도별 누적 개수를 보여주고,
+    문항 결과는 선택했거나 '전체 보기'를 켠 경우에만 작업 저장소에서 읽어 렌더링. 다운로드는 보고서 파일에서 바로 제공합니다.
+    """
+    def _body(job):
+        store = get_job_queue().store
+        st.subheader(title)
+        summaries = store.file_summaries(job['id'])
+        for f_idx, file in enumerate(job['files']):
+            summary = summaries.get(f_idx) or dict.fromkeys(("done", "api_error") + FINDING_SEVERITIES, 0)
+            mark = "✅" if summary['done'] == file['count'] else "⏳"
+            line = f"{mark} **📁 {file['filename']}** ({summary['done']}/{file['count']}개 문항) · {format_severity_counts(summary)}"
+            if summary['api_error']: line += f" · ⚠️ API 오류 {summary['api_error']}"
+            st.markdown(line)
+            with st.expander(f"📄 {file['filename']} 문항별 결과"):
+                if file['removed']: st.caption(f"🗑️ 이전 실행 대비 삭제된 문항: {', '.join(file['removed'])}")
+                if st.toggle("전체 문항 보기", key=f"{page}_all_{f_idx}"):
+                    for _, result in store.results(job['id'], f_idx): st.markdown(tex_item_report(result))
+                else:
+                    pick = st.selectbox("문항 선택", store.done_items(job['id'], f_idx), index=None, format_func=lambda j, labels=file['labels']: labels[j],
+                                        key=f"{page}_pick_{f_idx}", placeholder="문항을 선택하면 결과를 표시합니다")
+                    if pick is not None: st.markdown(tex_item_report(store.result(job['id'], f_idx, pick)))
+        report_path = job['artifacts'].get('report_path')
+        if report_path and os.path.exists(report_path):
+            with open(report_path, "rb") as f:
+                st.download_button("📥 리포트 다운로드", f, file_name=download_name, key=f"{page}_download")
+    return _body
+
+def submit_pdf_job(file_name, pdf_bytes, pdf_hash, journal, do_convert, do_review, use_text_layer, preprocessor):
+    """PDF 변환·검토를 백그라운드 작업으로 제출. 변환 결과와 검토 보고서는 작업 산출물로 남깁니다."""
+    model, cache = create_page_model(), active_review_cache()
+    max_rpm = st.session_state.max_rpm
+
+    def _run(ctx):
+        guarded = job_model(model, ctx)
+        limiter = create_rate_controller(max_rpm, ctx.max_workers, lambda: ctx.cancelled)
+        # 저널 키: OCR 페이지는 "ocr:페이지 번호", 검토 섹션은 "review:섹션 내용 해시"
+        saved = {item: result for (_, item), result in journal.entries().items()}
+        pdf_path = ctx.path(".pdf")
+        with open(pdf_path, "wb") as f: f.write(pdf_bytes)
         try:
-            response = model.generate_content([prompt, page])
-            full_text += f"\n\n--- Page {i+1} ---\n\n" + response.text
-            time.sleep(2)
-        except Exception as e: full_text += f"\n\n--- Page {i+1} (Error: {e}) ---\n\n"
-    return full_text, None
-
-def split_pdf_sections(content):
-    sections = re.split(r'\n(?=---\s*Page|\n---\n|\d+\.\s)', content)
-    return [s.strip() for s in sections if s.strip()]
-
-def review_pdf_section(model, section_text, section_num):
-    rule_errors = rule_check_josa(section_text)
-    prompt = PROMPT_FOR_PDF.format(section_text=section_text)
-    try:
-        response = model.generate_content(prompt)
-        json_str = response.text.strip().replace('```json', '').replace('```', '')
-        llm_errors = json.loads(json_str)
-        merged = _dedup_errors(rule_errors + (llm_errors or []))
-        return {"section": section_num, "errors": merged}
-    except json.JSONDecodeError: return {"section": section_num, "errors": rule_errors, "parse_error": response.text}
-    except Exception as e: return {"section": section_num, "errors": rule_errors, "api_error": str(e)}
-
-def generate_report_for_pdf(results):
-    report_lines = ["# 📝 검토 보고서 (2512)\n"]
-    total_errors = 0
-    for result in results:
-        section_num = result["section"]
-        errors = result.get("errors", [])
-        if "parse_error" in result or "api_error" in result:
-            report_lines.append(f"\n## 섹션 {section_num}\n⚠️ 오류 발생")
-        if errors:
-            report_lines.append(f"\n## 섹션 {section_num}\n")
-            for err in errors:
-                total_errors += 1
-                icon = "🔴" if err.get("severity") == "high" else "🟡"
-                report_lines.append(f"### {icon} 오류 {total_errors}")
-                report_lines.append(f"- **원문**: {err.get('original', 'N/A')}")
-                report_lines.append(f"- **수정**: {err.get('corrected', 'N/A')}")
-                report_lines.append(f"- **이유**: {err.get('reason', 'N/A')}\n")
-    return '\n'.join(report_lines)
-
-# ==========================================
-# [화면 전환 관리]
-# ==========================================
-if 'current_page' not in st.session_state:
-    st.session_state.current_page = 'main'
-
-def navigate_to(page):
-    st.session_state.current_page = page
+            converted_text = None
+            if do_convert:
+                done_pages = {int(item[4:]): result["text"] for item, result in saved.items() if item.startswith("ocr:")}
+                converted_text, error = process_pdf(guarded, pdf_path, lambda current, total, stage: ctx.progress(current, total, f"[{stage}] 처리 중..."),
+                                                    cache, limiter, done_pages, lambda page_no, text: journal.append(pdf_hash, f"ocr:{page_no}", {"text": text}),
+                                                    use_text_layer, preprocessor)
+                if error: raise RuntimeError(error)
+                counters = ctx.metrics.summary()['counters']
+                ctx.set_artifact("pages", {name: counters.get(name, 0) for name in ("text_layer_pages", "ocr_pages")})
+                if preprocessor is not None: ctx.set_artifact("preprocess", {"summary": preprocessor.summary(), "report": preprocessor.report})
+                ctx.set_artifact("converted_text", converted_text)
+
+            if do_review and converted_text:
+                sections = split_pdf_sections(converted_text)
+                section_keys = [f"review:{content_hash(section.encode('utf-8'))}" for section in sections]
+                all_results = [dict(saved[key], section=i + 1) if key in saved else None for i, key in enumerate(section_keys)]
+                for i, res in enumerate(all_results):
+                    if res is not None: ctx.item_done(0, i, res)
+                pending = [(i, section) for i, section in enumerate(sections) if all_results[i] is None]
+
+                def _review(task):
+                    return review_pdf_section(guarded, task[1], task[0] + 1, cache, limiter)
+
+                def _on_result(done, total, k, res):
+                    i = pending[k][0]
+                    all_results[i] = res
+                    if "parse_error" not in res: journal.append(pdf_hash, section_keys[i], res)
+                    ctx.item_done(0, i, res)
+                    ctx.progress(done, total, "[검토] 처리 중...")
+
+                ctx.set_artifact("sections", len(sections))
+                run_ordered(
+                    _review, pending, max_workers=ctx.max_workers,
+                    on_error=lambda task, e: {"section": task[0] + 1, "errors": [], "api_error": str(e)},
+                    on_result=_on_result)
+                if ctx.cancelled: return
+                if not any("api_error" in r or "parse_error" in r for r in all_results): journal.clear()
+                ctx.set_artifact("report", generate_report_for_pdf(all_results))
+        finally:
+            record_backoff_stats(limiter)
+            if os.path.exists(pdf_path): os.remove(pdf_path)
+    return submit_job('2512', f"PDF 변환·검토 ({file_name})", [{"filename": file_name, "count": 0, "labels": []}], _run)
+
+def pdf_job_results_view(job):
+    """PDF 작업 결과 화면(render_job의 render_body): 섹션 검토의 누적 개수, 끝난 단계의 변환 결과·보고서."""
+    artifacts = job['artifacts']
+    if 'converted_text' in artifacts:
+        st.subheader("📄 1단계: PDF → Markdown 변환")
+        pages = artifacts.get('pages', {})
+        st.caption(f"📑 텍스트 레이어 {pages.get('text_layer_pages', 0)}페이지 · OCR {pages.get('ocr_pages', 0)}페이지")
+        if 'preprocess' in artifacts: render_preprocess_report(artifacts['preprocess']['summary'], artifacts['preprocess']['report'])
+        st.text_area("변환 결과", artifacts['converted_text'], height=300)
+        st.download_button("📥 변환 결과 다운로드", artifacts['converted_text'], file_name="converted.md", key="2512_converted_download")
+    if 'sections' in artifacts:
+        st.subheader("📋 2단계: Markdown 검토")
+        summary = get_job_queue().store.file_summaries(job['id']).get(0) or dict.fromkeys(("done",) + FINDING_SEVERITIES, 0)
+        st.markdown(f"📊 {summary['done']}/{artifacts['sections']}개 섹션 검토 · {format_severity_counts(summary)}")
+    if 'report' in artifacts:
+        st.text_area("검토 보고서", artifacts['report'], height=300)
+        st.download_button("📥 검토 보고서 다운로드", artifacts['report'], file_name="report_2512.md", key="2512_report_download")
 
 # ==========================================
 # [화면 1] 메인 페이지 (운영용)
@@ -470,22 +565,27 @@ def main_page():
         if 'api_key' not in st.session_state: st.session_state.api_key = DEFAULT_API_KEY
         api_input = st.text_input("Google API Key", value=st.session_state.api_key, type="password")
         st.session_state.api_key = api_input
+        render_backend_settings()
+        render_concurrency_settings()
+        render_cache_settings()
     
     uploaded_zips = st.file_uploader("ZIP 파일 업로드 (.zip)", type=["zip"], accept_multiple_files=True)
     all_files_data = []
 
     if uploaded_zips:
+        begin_upload_metrics(uploaded_zips)
         with st.status("파일 분석 및 추출 중...", expanded=True) as status:
-            for i, uploaded_zip in enumerate(uploaded_zips):
-                status.write(f"📂 분석 중: {uploaded_zip.name}")
-                tex_content, error = extract_tex_from_zip(uploaded_zip)
+            status.write(f"📂 분석 중: {len(uploaded_zips)}개 파일")
+            zip_blobs = [uploaded_zip.getvalue() for uploaded_zip in uploaded_zips]
+            zip_hashes = [content_hash(zip_bytes) for zip_bytes in zip_blobs]
+            # 메인 페이지는 기존 파서 사용 (통합 텍스트 출력)
+            for i, (uploaded_zip, (items, error, warnings)) in enumerate(zip(uploaded_zips, load_zip_items(zip_blobs, zip_hashes))):
                 if error:
                     st.error(f"{uploaded_zip.name}: {error}")
                     continue
-                # 메인 페이지는 기존 파서 사용 (통합 텍스트 출력)
-                items = parse_tex_content(tex_content)
+                for warning in warnings: st.warning(f"{uploaded_zip.name}: {warning}")
                 full_text = "\n\n" + ("="*30) + "\n\n".join(items)
-                all_files_data.append({"filename": uploaded_zip.name, "items": items, "full_text": full_text, "index": i})
+                all_files_data.append({"filename": uploaded_zip.name, "items": items, "full_text": full_text, "index": i, "hash": zip_hashes[i]})
             status.update(label="모든 파일 준비 완료!", state="complete", expanded=False)
 
         if all_files_data:
@@ -504,42 +604,13 @@ def main_page():
                 with tab2: st.text_area(f"Editor_{idx}", value=full_text, height=600, label_visibility="collapsed")
             
             st.divider()
-            if st.button("🚀 전체 파일 AI 학술 감사 시작", type="primary"):
-                if not st.session_state.api_key: st.error("API Key를 입력해주세요."); st.stop()
-                genai.configure(api_key=st.session_state.api_key)
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                total_tasks = sum(len(f['items']) for f in all_files_data)
-                current_task_idx = 0
-                results_by_file = {}
-
-                for file_data in all_files_data:
-                    filename = file_data['filename']
-                    items = file_data['items']
-                    file_results = []
-                    status_text.text(f"📂 {filename} 검토 중...")
-                    for j, item_text in enumerate(items):
-                        current_task_idx += 1
-                        progress_bar.progress(current_task_idx / total_tasks)
-                        max_retries = 3; retry_delay = 5
-                        for attempt in range(max_retries):
-                            result = review_tex_section(model, item_text, j + 1)
-                            if "api_error" in result and "429" in str(result["api_error"]):
-                                if attempt < max_retries - 1:
-                                    time.sleep(retry_delay); retry_delay *= 2
-                                    continue
-                            file_results.append(result)
-                            break
-                        time.sleep(2) 
-                    results_by_file[filename] = file_results
-                
-                report = generate_report_for_tex(results_by_file)
-                st.divider()
-                st.subheader("📋 통합 감사 결과 보고서")
-                st.markdown(report)
-                st.download_button("📥 리포트 다운로드", report, file_name="integrated_auditor_report.md")
-                st.success("모든 파일의 검토가 완료되었습니다!")
+            journal = open_journal('main', [data['hash'] for data in all_files_data])
+            resume = render_resume_option(journal, "main_resume")
+            if st.button("🚀 전체 파일 AI 학술 감사 시작", type="primary", disabled=page_job_active('main')):
+                if not resume: journal.clear()
+                submit_tex_job('main', all_files_data, journal, journal.carried(all_files_data))
+
+    render_job('main', tex_job_results_view('main', "📋 통합 감사 결과 보고서", "integrated_auditor_report.md"), "모든 파일의 검토가 완료되었습니다!")
 
 # ==========================================
 # [화면 3] 개발용 페이지 (Dev Mode)
@@ -559,21 +630,28 @@ def page_dev():
         if 'api_key' not in st.session_state: st.session_state.api_key = DEFAULT_API_KEY
         api_input = st.text_input("Google API Key", value=st.session_state.api_key, type="password")
         st.session_state.api_key = api_input
+        render_backend_settings()
+        render_concurrency_settings()
+        render_cache_settings()
+        st.checkbox("🔁 이전 실행과 비교 (추가·변경된 문항만 검토)", key="dev_incremental",
+                    help="같은 파일 이름으로 마지막에 감사한 결과와 문항 라벨·내용을 비교해, 바뀌지 않은 문항은 이전 결과를 그대로 씁니다.")
     
     uploaded_zips = st.file_uploader("ZIP 파일 업로드", type=["zip"], accept_multiple_files=True, key="dev_uploader")
     all_files_data = []
 
     if uploaded_zips:
+        begin_upload_metrics(uploaded_zips)
         with st.status("파일 분석 및 추출 중...", expanded=True) as status:
-            for i, uploaded_zip in enumerate(uploaded_zips):
-                status.write(f"📂 분석 중: {uploaded_zip.name}")
-                tex_content, error = extract_tex_from_zip(uploaded_zip)
+            status.write(f"📂 분석 중: {len(uploaded_zips)}개 파일")
+            zip_blobs = [uploaded_zip.getvalue() for uploaded_zip in uploaded_zips]
+            zip_hashes = [content_hash(zip_bytes) for zip_bytes in zip_blobs]
+            # [Dev] 개선된 파서 사용 -> items는 [{'label': '문항 28', 'content': '...', 'source': 'chapters/ch1.tex:12'}, ...] 형태의 딕셔너리 리스트
+            for i, (uploaded_zip, (items, error, warnings)) in enumerate(zip(uploaded_zips, load_zip_items(zip_blobs, zip_hashes, dev=True))):
                 if error:
                     st.error(f"{uploaded_zip.name}: {error}")
                     continue
-                # [Dev] 개선된 파서 사용 -> items는 [{'label': '문항 28', 'content': '...'}, ...] 형태의 딕셔너리 리스트
-                items = parse_tex_content_dev(tex_content)
-                all_files_data.append({"filename": uploaded_zip.name, "items": items, "index": i})
+                for warning in warnings: st.warning(f"{uploaded_zip.name}: {warning}")
+                all_files_data.append({"filename": uploaded_zip.name, "items": items, "index": i, "hash": zip_hashes[i]})
             status.update(label="모든 파일 준비 완료!", state="complete", expanded=False)
 
         if all_files_data:
@@ -588,65 +666,25 @@ def page_dev():
                 
                 st.caption(f"✅ '{selected_data['filename']}' 내용 (총 {len(items)}개 문항 세트)")
 
-                # [중요] 문항별 개별 박스 생성 (반복문)
-                for j, item_data in enumerate(items):
-                    item_label = item_data.get('label', f"{j+1}")
-                    item_text = item_data.get('content', '')
-                    
-                    with st.expander(f"{item_label}", expanded=True):
-                        # 각 문항마다 탭 생성
-                        tab1, tab2 = st.tabs(["🦁LaTeX", "📝메모장st"])
-                        with tab1:
-                            st.code(item_text, language='latex')
-                        with tab2:
-                            st.text_area(f"Dev_Edit_{idx}_{j}", value=item_text, height=300, label_visibility="collapsed")
-                    
-                    st.divider()
+                # [중요] 문항별 개별 박스는 현재 페이지분만 생성
+                render_item_viewer(items, idx)
 
             st.divider()
-            if st.button("🚀 (Dev) AI 감사 시작", type="primary"):
-                if not st.session_state.api_key: st.error("API Key를 입력해주세요."); st.stop()
-                genai.configure(api_key=st.session_state.api_key)
-                model = genai.GenerativeModel('gemini-1.5-flash')
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                total_tasks = sum(len(f['items']) for f in all_files_data)
-                current_task_idx = 0
-                results_by_file = {}
-
-                for file_data in all_files_data:
-                    filename = file_data['filename']
-                    items = file_data['items']
-                    file_results = []
-                    status_text.text(f"📂 {filename} 검토 중...")
-                    for j, item_data in enumerate(items):
-                        item_text = item_data.get('content', '')
-                        item_label = item_data.get('label', f"문항 {j+1}")
-                        
-                        current_task_idx += 1
-                        progress_bar.progress(current_task_idx / total_tasks)
-                        max_retries = 3; retry_delay = 5
-                        for attempt in range(max_retries):
-                            # label도 넘겨주면 좋겠지만 review 함수 시그니처 유지 위해
-                            result = review_tex_section(model, item_text, j + 1)
-                            # 결과에 라벨 추가
-                            result['label'] = item_label 
-                            
-                            if "api_error" in result and "429" in str(result["api_error"]):
-                                if attempt < max_retries - 1:
-                                    time.sleep(retry_delay); retry_delay *= 2
-                                    continue
-                            file_results.append(result)
-                            break
-                        time.sleep(2) 
-                    results_by_file[filename] = file_results
-                
-                report = generate_report_for_tex(results_by_file)
-                st.divider()
-                st.subheader("📋 통합 감사 결과 보고서 (Dev)")
-                st.markdown(report)
-                st.download_button("📥 리포트 다운로드", report, file_name="dev_report.md")
-                st.success("테스트 완료!")
+            journal = open_journal('dev', [data['hash'] for data in all_files_data])
+            resume = render_resume_option(journal, "dev_resume")
+            if st.button("🚀 (Dev) AI 감사 시작", type="primary", disabled=page_job_active('dev')):
+                history = get_audit_history(current_backend())
+                carried, changes, removed_by_file = {}, {}, None
+                if st.session_state.get('dev_incremental'):
+                    carried, changes, removed_by_file = plan_tex_reaudit(all_files_data, history)
+                    reused = sum(len(file_carried) for file_carried in carried.values())
+                    total_items = sum(len(data['items']) for data in all_files_data)
+                    st.info(f"🔁 이전 결과 재사용 {reused}개 / 새로 검토 {total_items - reused}개")
+                if not resume: journal.clear()
+                for f_idx, file_carried in journal.carried(all_files_data).items(): carried.setdefault(f_idx, {}).update(file_carried)
+                submit_tex_job('dev', all_files_data, journal, carried, changes, removed_by_file, history)
+
+    render_job('dev', tex_job_results_view('dev', "📋 통합 감사 결과 보고서 (Dev)", "dev_report.md"), "테스트 완료!")
 
 # ==========================================
 # [화면 2] 2512 페이지 (Legacy PDF)
@@ -663,56 +701,26 @@ def page_2512():
         if 'api_key' not in st.session_state: st.session_state.api_key = DEFAULT_API_KEY
         api_input = st.text_input("Google API Key", value=st.session_state.api_key, type="password")
         st.session_state.api_key = api_input
+        render_backend_settings()
+        render_concurrency_settings()
+        render_cache_settings()
         st.divider()
         do_convert = st.checkbox("1단계: PDF → Markdown 변환", value=True)
         do_review = st.checkbox("2단계: Markdown 검토", value=True)
+        use_text_layer = st.checkbox("PDF 텍스트 레이어 우선 사용 (이미지/깨진 페이지만 OCR)", value=PDF_USE_TEXT_LAYER)
+        preprocessor = render_preprocess_settings()
 
     uploaded_file = st.file_uploader("PDF 파일을 드래그하거나 선택하세요", type=["pdf"])
 
     if uploaded_file is not None:
-        if st.button("🚀 시작하기", type="primary"):
-            if not st.session_state.api_key: st.error("❌ API 키를 입력해주세요."); st.stop()
-            
-            genai.configure(api_key=st.session_state.api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-            
-            def update_progress(current, total, stage):
-                progress_bar.progress(current / total)
-                status_text.text(f"[{stage}] {current}/{total} 처리 중...")
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                tmp_file.write(uploaded_file.getvalue())
-                tmp_path = tmp_file.name
-            
-            try:
-                converted_text = None
-                if do_convert:
-                    st.subheader("📄 1단계: PDF → Markdown 변환")
-                    converted_text, error = process_pdf(model, tmp_path, update_progress)
-                    if error: st.error(error); st.stop()
-                    st.text_area("변환 결과", converted_text, height=300)
-                    st.download_button("📥 변환 결과 다운로드", converted_text, file_name="converted.md")
-
-                if do_review and converted_text:
-                    st.subheader("📋 2단계: Markdown 검토")
-                    sections = split_pdf_sections(converted_text)
-                    all_results = []
-                    total = len(sections)
-                    for i, section in enumerate(sections):
-                        update_progress(i+1, total, "검토")
-                        res = review_pdf_section(model, section, i+1)
-                        all_results.append(res)
-                        time.sleep(2)
-                    
-                    report = generate_report_for_pdf(all_results)
-                    st.text_area("검토 보고서", report, height=300)
-                    st.download_button("📥 검토 보고서 다운로드", report, file_name="report_2512.md")
-                    st.success("완료!")
-            finally:
-                if os.path.exists(tmp_path): os.remove(tmp_path)
+        pdf_hash = content_hash(uploaded_file.getvalue())
+        journal = open_journal('2512', [pdf_hash])
+        resume = render_resume_option(journal, "2512_resume")
+        if st.button("🚀 시작하기", type="primary", disabled=page_job_active('2512')):
+            if not resume: journal.clear()
+            submit_pdf_job(uploaded_file.name, uploaded_file.getvalue(), pdf_hash, journal, do_convert, do_review, use_text_layer, preprocessor)
+
+    render_job('2512', pdf_job_results_view, "완료!")
 
 # ==========================================
 # [앱 실행 진입점]
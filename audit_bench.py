@@ -0,0 +1,232 @@
+"""
+[벤치마크] 합성 교재(TeX/ZIP, OCR Markdown)와 스텁(또는 카세트 재생) 모델로 파서·규칙·보고서·전체 감사 파이프라인 성능을 측정.
+
+사용 예:
+    python audit_bench.py --out bench.json
+    python audit_bench.py --items 500 --files 4 --repeat 5 --latency 0.05 --rate-429 0.1 --workers 8
+    python audit_bench.py --backend replay --cassette-dir ./cassettes   # 녹화된 실제 응답으로 전체 감사 재생
+
+결과 JSON은 단계별 최소/평균 시간, 처리량(문항/초, MB/초), 최대 메모리(tracemalloc 기준)를 담으며
+(tracemalloc은 worker 프로세스를 보지 못하므로 프로세스 풀 단계의 peak_memory_mb는 null)
+실행끼리 비교할 수 있도록 환경 정보와 입력 크기를 함께 기록합니다.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from audit_core import (
+    DEFAULT_MODEL_NAME, extract_tex_from_zip, ingest_zip_files, parse_tex_content, parse_tex_content_dev, rule_check_josa, rule_check_josa_batch, split_pdf_sections,
+    audit_tex_files, generate_report_for_tex,
+)
+from audit_metrics import Metrics, use_metrics
+from model_backend import RecordReplayBackend, StubBackend
+
+# ==========================================
+# [합성 교재] 문항/해설/수식/조사 오류가 섞인 TeX 생성
+# ==========================================
+_SENTENCES = [
+    "함수 $f(x)$는 실수 전체의 집합에서 연속이다.",
+    "두 점 $A$, $B$를 지나는 직선의 기울기를 구하시오.",
+    "수열 $\\{a_n\\}$은 첫째항이 3인 등차수열이다.",
+    "곡선 $y=x^2$과 직선 $y=2x$로 둘러싸인 부분의 넓이는 $\\frac{4}{3}$이다.",
+    "확률변수 $X$가 이항분포를 따를 때 평균은 10이다.",
+    "다음 조건을 만족시키는 자연수 $n$의 개수를 구하시오.",
+    "삼각형 $ABC$에서 $\\overline{AB}=5$, $\\overline{BC}=7$이다.",
+    "$\\lim_{x \\to 0} \\frac{\\sin x}{x}$의 값은 1이다.",
+]
+# 규칙 엔진이 잡아야 하는 조사 오류 (숫자/수식 뒤 조사 불일치)
+_JOSA_ERRORS = ["따라서 정답은 3를 만족한다.", "구하는 값은 $x$을 대입하면 된다.", "넓이는 10은 아니다."]
+_EXPLANATION_TITLES = ["해설", "풀이", "정답 및 해설"]
+
+
+def generate_workbook_tex(n_items, seed=0, error_rate=0.2):
+    """n_items개 문항(각각 \\section*{번호} + 본문 + 해설 섹션)을 가진 합성 교재 TeX."""
+    rng = random.Random(seed)
+    lines = ["\\documentclass{article}", "\\usepackage{kotex}", "\\title{합성 교재}", "\\begin{document}", "\\maketitle"]
+    for n in range(1, n_items + 1):
+        if n % 20 == 1: lines += [f"\\section*{{Day {n // 20 + 1}}}", ""]
+        lines += [f"\\section*{{{n}}}", ""]
+        lines += [rng.choice(_SENTENCES) for _ in range(rng.randint(2, 6))]
+        if rng.random() < error_rate: lines.append(rng.choice(_JOSA_ERRORS))
+        lines += ["\\begin{enumerate}"] + [f"  \\item ${rng.randint(1, 99)}$" for _ in range(5)] + ["\\end{enumerate}", ""]
+        lines += [f"\\section*{{{rng.choice(_EXPLANATION_TITLES)}}}", ""]
+        lines += [rng.choice(_SENTENCES) for _ in range(rng.randint(2, 8))]
+        if n % 10 == 0: lines.append("\\newpage")
+        lines.append("")
+    lines.append("\\end{document}")
+    return "\n".join(lines)
+
+
+def generate_workbook_zip(n_items, seed=0):
+    """합성 TeX와 더미 이미지를 담은 ZIP 바이트."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("main.tex", generate_workbook_tex(n_items, seed))
+        z.writestr("images/figure1.png", bytes(random.Random(seed).getrandbits(8) for _ in range(4096)))
+    return buffer.getvalue()
+
+
+def generate_pdf_markdown(n_pages, seed=0):
+    """process_pdf가 만드는 것과 같은 형식(페이지 구분자 + 번호 문항)의 합성 OCR 결과."""
+    rng = random.Random(seed)
+    parts = []
+    for page in range(1, n_pages + 1):
+        parts.append(f"\n\n--- Page {page} ---\n")
+        for k in range(rng.randint(2, 4)):
+            parts.append(f"{(page - 1) * 4 + k + 1}. " + " ".join(rng.choice(_SENTENCES) for _ in range(rng.randint(2, 5))))
+            if rng.random() < 0.2: parts.append(rng.choice(_JOSA_ERRORS))
+    return "\n".join(parts)
+
+
+# ==========================================
+# [측정]
+# ==========================================
+def measure(fn, repeat=3, units=None, unit_name="items", nbytes=None, trace_memory=True):
+    """
+    fn()을 repeat번 실행한 시간과 (별도 1회 실행의) 최대 메모리를 측정. 마지막 반환값도 함께 돌려줌.
+    trace_memory=False면 메모리를 재지 않음 (다른 프로세스에서 일하는 단계: tracemalloc은 현재 프로세스만 봄).
+    """
+    timings = []
+    value = None
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - t0)
+    peak = None
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally: tracemalloc.stop()
+    best = min(timings)
+    stats = {"seconds_min": best, "seconds_mean": sum(timings) / len(timings), "runs": len(timings),
+             "peak_memory_mb": peak / 1024 / 1024 if peak is not None else None}
+    if units is not None:
+        stats[unit_name] = units
+        stats[f"{unit_name}_per_second"] = units / best if best else None
+    if nbytes is not None: stats["mb_per_second"] = nbytes / 1024 / 1024 / best if best else None
+    return stats, value
+
+
+def rule_breakdown(texts):
+    """
+    일괄 검사 1회분의 전체 스캔 시간과 규칙별 매치 수·스캔 시간·찾은 오류 수 (RuleEngine이 METRICS에 남긴 기록을 따로 모음).
+    반환값: ({"documents", "seconds"}, {규칙 이름: {"matches", "seconds", "errors"}})
+    """
+    with use_metrics(Metrics()) as metrics: rule_check_josa_batch(texts)
+    summary = metrics.summary()
+    scan = summary["stages"].get("rule_scan", {"calls": 0, "seconds": 0.0})
+    rules = {name[len("rule:"):]: {"matches": stat["calls"], "seconds": stat["seconds"], "errors": summary["counters"].get("rule_errors:" + name[len("rule:"):], 0)}
+             for name, stat in summary["stages"].items() if name.startswith("rule:")}
+    return {"documents": scan["calls"], "seconds": scan["seconds"]}, rules
+
+
+def run_benchmarks(args):
+    tex_files = [generate_workbook_tex(args.items, seed=k) for k in range(args.files)]
+    zips = [generate_workbook_zip(args.items, seed=k) for k in range(args.files)]
+    pdf_text = generate_pdf_markdown(args.pdf_pages, seed=args.files)
+    tex_bytes = sum(len(t.encode("utf-8")) for t in tex_files)
+    results = {}
+
+    def _log(name):
+        stats = results[name]
+        rate = next((f"{v:,.0f} {k.replace('_per_second', '')}/s" for k, v in stats.items() if k.endswith("_per_second") and v), "")
+        peak = f"{stats['peak_memory_mb']:.1f} MB" if stats['peak_memory_mb'] is not None else "- (worker 프로세스)"
+        print(f"{name:<24} {stats['seconds_min'] * 1000:10.1f} ms  {rate:<24} peak {peak}", file=sys.stderr, flush=True)
+
+    results["extract_tex_from_zip"], _ = measure(lambda: [extract_tex_from_zip(io.BytesIO(z)) for z in zips], args.repeat, len(zips), "files", sum(map(len, zips)))
+    _log("extract_tex_from_zip")
+    # 풀은 한 번만 띄워 데운 뒤 모든 반복에서 재사용 (프로세스 시작 시간은 측정에서 제외; 앱도 풀을 세션 간에 재사용함)
+    with ProcessPoolExecutor(max_workers=min(len(zips), os.cpu_count() or 1)) as pool:
+        ingest_zip_files(zips, dev=True, pool=pool)
+        results["ingest_zip_files"], _ = measure(lambda: ingest_zip_files(zips, dev=True, pool=pool), args.repeat, len(zips), "files", sum(map(len, zips)),
+                                                 trace_memory=False)
+    _log("ingest_zip_files")
+    results["parse_tex_content"], legacy_items = measure(lambda: [parse_tex_content(t) for t in tex_files], args.repeat, nbytes=tex_bytes)
+    results["parse_tex_content"]["items"] = sum(map(len, legacy_items))
+    _log("parse_tex_content")
+    results["parse_tex_content_dev"], dev_items = measure(lambda: [parse_tex_content_dev(t) for t in tex_files], args.repeat, nbytes=tex_bytes)
+    results["parse_tex_content_dev"]["items"] = sum(map(len, dev_items))
+    _log("parse_tex_content_dev")
+    texts = [item["content"] for items in dev_items for item in items]
+    results["rule_check_josa"], found = measure(lambda: [rule_check_josa(t) for t in texts], args.repeat, len(texts))
+    results["rule_check_josa"]["errors_found"] = sum(map(len, found))
+    _log("rule_check_josa")
+    results["rule_check_josa_batch"], _ = measure(lambda: rule_check_josa_batch(texts), args.repeat, len(texts))
+    results["rule_check_josa_batch"]["scan"], results["rule_check_josa_batch"]["rules"] = rule_breakdown(texts)
+    _log("rule_check_josa_batch")
+    results["split_pdf_sections"], sections = measure(lambda: split_pdf_sections(pdf_text), args.repeat, args.pdf_pages, "pages", len(pdf_text.encode("utf-8")))
+    results["split_pdf_sections"]["sections"] = len(sections)
+    _log("split_pdf_sections")
+
+    all_files_data = [{"filename": f"bench_{k}.zip", "items": items} for k, items in enumerate(dev_items)]
+    total_items = sum(map(len, dev_items))
+    models = []
+
+    def _audit():
+        if args.backend == "replay": model = RecordReplayBackend(args.cassette_dir, "replay", speed=args.replay_speed, model_name=args.model)
+        else: model = StubBackend(args.latency, args.rate_429, seed=len(models))
+        models.append(model)
+        return audit_tex_files(model, all_files_data, args.workers, args.max_rpm, pack_tokens=args.pack_tokens)
+
+    # 전체 감사는 지연 시간이 지배하므로 반복 횟수를 줄임
+    results["audit_end_to_end"], audited = measure(_audit, max(1, min(args.repeat, 2)), total_items)
+    results["audit_end_to_end"].update({
+        "backend": args.backend,
+        "model_calls_per_run": getattr(models[-1], "calls", None), "rate_limited_per_run": getattr(models[-1], "rate_limited", None),
+        "request_chars_per_run": getattr(models[-1], "sent_chars", None), "prompt_resends_per_run": getattr(models[-1], "prefix_resends", None),
+        "api_errors": sum(1 for file_results in audited.values() for r in file_results if "api_error" in r),
+    })
+    _log("audit_end_to_end")
+    results["generate_report_for_tex"], report = measure(lambda: generate_report_for_tex(audited), args.repeat, total_items)
+    results["generate_report_for_tex"]["report_chars"] = len(report)
+    _log("generate_report_for_tex")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "args": vars(args), "tex_bytes": tex_bytes, "items": total_items,
+        },
+        "results": results,
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="합성 교재와 스텁 모델로 감사 파이프라인 성능을 측정하고 JSON으로 저장합니다.")
+    parser.add_argument("--items", type=int, default=200, help="파일당 문항 수 (기본: 200)")
+    parser.add_argument("--files", type=int, default=3, help="합성 ZIP/TeX 파일 수 (기본: 3)")
+    parser.add_argument("--pdf-pages", type=int, default=100, help="합성 OCR 결과의 페이지 수 (기본: 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 측정 횟수 (기본: 3)")
+    parser.add_argument("--backend", choices=("stub", "replay"), default="stub", help="전체 감사에 쓸 모델: stub(기본) 또는 replay(카세트)")
+    parser.add_argument("--cassette-dir", default="cassettes", help="replay 카세트 폴더 (기본: cassettes)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help=f"replay 카세트를 녹화한 모델 이름 (기본: {DEFAULT_MODEL_NAME})")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="replay 시 녹화된 지연 배율, 0=최고 속도 (기본: 0)")
+    parser.add_argument("--latency", type=float, default=0.0, help="스텁 모델의 요청당 지연(초) (기본: 0)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="스텁 모델이 429를 낼 확률 0~1 (기본: 0)")
+    parser.add_argument("--workers", type=int, default=8, help="전체 감사의 동시 요청 수 (기본: 8)")
+    parser.add_argument("--max-rpm", type=int, default=0, help="전체 감사의 분당 요청 수, 0=무제한 (기본: 0)")
+    parser.add_argument("--pack-tokens", type=int, default=0, help="짧은 문항 묶음 요청의 토큰 한도, 0=묶지 않음")
+    parser.add_argument("--out", default="bench.json", help="결과 JSON 경로 (기본: bench.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_benchmarks(args)
+    with open(args.out, "w", encoding="utf-8") as f: json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📝 {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
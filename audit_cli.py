@@ -0,0 +1,224 @@
+"""
+[배치 감사 CLI] 브라우저 없이 디렉터리/글롭 단위로 ZIP(LaTeX)과 PDF를 감사하고 파일별 보고서를 저장.
+
+사용 예:
+    python audit_cli.py ./workbooks --out ./reports --max-rpm 15
+    python audit_cli.py "2025-2/*.zip" scan.pdf --format md,json --workers 8
+
+종료 코드:
+    0  모든 파일/문항 검토 성공
+    1  일부 파일 처리 실패 또는 API/파싱 오류가 있는 문항 존재
+    2  잘못된 인자, 입력 파일 없음, API 키 없음
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from audit_core import (
+    DEFAULT_MAX_WORKERS, DEFAULT_MAX_RPM, PDF_RENDER_PROCESSES, DEFAULT_MODEL_NAME, DEFAULT_PACK_TOKENS, REVIEW_CACHE_DIR, REVIEW_CACHE_MAX_MB, REVIEW_CACHE_MAX_AGE_DAYS,
+    AUDIT_HISTORY_DIR, API_QUOTA_DIR, ingest_zip_items, audit_tex_files, audit_tex_files_incremental, generate_report_for_tex,
+    create_rate_controller, record_backoff_stats, process_pdf, split_pdf_sections, review_pdf_section, generate_report_for_pdf,
+)
+from review_cache import ReviewCache
+from api_quota import QuotaModel, SharedQuota, quota_key
+from audit_history import AuditHistory
+from audit_metrics import METRICS
+from page_preprocess import OCR_IMAGE_MODES, OCR_IMAGE_FORMATS, OCR_IMAGE_MODE, OCR_IMAGE_FORMAT, OCR_IMAGE_QUALITY, OCR_MAX_PIXELS, PagePreprocessor
+from model_backend import BACKEND_KINDS, CASSETTE_DIR, DEFAULT_BACKEND, backend_needs_api_key, backend_storage_dir, create_backend
+from review_executor import run_ordered
+
+EXIT_OK = 0
+EXIT_ITEM_ERRORS = 1
+EXIT_USAGE = 2
+
+SUPPORTED_EXTENSIONS = (".zip", ".pdf")
+
+
+def collect_inputs(patterns):
+    """디렉터리(하위 폴더 포함), 글롭, 파일 경로를 받아 중복 없이 정렬된 .zip/.pdf 목록을 반환."""
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                found.extend(os.path.join(root, f) for f in files if f.lower().endswith(SUPPORTED_EXTENSIONS))
+        else:
+            found.extend(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p) and p.lower().endswith(SUPPORTED_EXTENSIONS))
+    return sorted(set(os.path.abspath(p) for p in found))
+
+
+def parse_zip_file(path, legacy=False):
+    """프로세스 풀에서 실행: ZIP 하나를 추출·파싱(\\input/\\include 포함)하여 (경로, 문항 목록, 오류, 경고)를 반환."""
+    with open(path, "rb") as f: zip_bytes = f.read()
+    items, error, warnings = ingest_zip_items(zip_bytes, dev=not legacy)
+    return path, items, error, warnings
+
+
+def _report_basename(path, out_dir, input_root):
+    """입력들의 공통 상위 폴더 기준 상대 경로 + 확장자로 보고서 이름을 만듦 (a/wb.zip, b/wb.zip, wb.pdf가 서로 덮어쓰지 않도록)."""
+    return os.path.join(out_dir, os.path.relpath(path, input_root) + ".report")
+
+
+def _write_reports(base, markdown, payload, formats):
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    written = []
+    if "md" in formats:
+        with open(base + ".md", "w", encoding="utf-8") as f: f.write(markdown)
+        written.append(base + ".md")
+    if "json" in formats:
+        with open(base + ".json", "w", encoding="utf-8") as f: json.dump(payload, f, ensure_ascii=False, indent=2)
+        written.append(base + ".json")
+    return written
+
+
+def _log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def audit_zip_files(model, zip_paths, args, cache):
+    """ZIP들을 프로세스 풀에서 파싱한 뒤 모든 문항을 한 번에 동시 검토하고 파일별 보고서를 저장. 실패한 파일/문항 수를 반환."""
+    failures = 0
+    all_files_data = []
+    # 파싱은 자식 프로세스에서 일어나므로 풀 전체의 벽시계 시간을 기록
+    with METRICS.stage("parse"), ProcessPoolExecutor(max_workers=args.parse_workers) as pool:
+        for path, items, error, warnings in pool.map(parse_zip_file, zip_paths, [args.legacy_parser] * len(zip_paths)):
+            if error:
+                _log(f"❌ {path}: {error}")
+                failures += 1
+                continue
+            for warning in warnings: _log(f"⚠️ {path}: {warning}")
+            _log(f"📂 {os.path.basename(path)}: {len(items)}개 문항")
+            all_files_data.append({"filename": os.path.basename(path), "path": path, "items": items})
+    if not all_files_data: return failures
+
+    def _progress(done, total, filename):
+        _log(f"[검토] {done}/{total} ({os.path.basename(filename)})")
+
+    # 같은 이름의 파일이 여러 폴더에 있어도 결과가 섞이지 않도록 경로 기준으로 묶음
+    keyed = [dict(data, filename=data["path"]) for data in all_files_data]
+    history = AuditHistory(backend_storage_dir(args.backend, AUDIT_HISTORY_DIR))
+    removed_by_path = {}
+    if args.incremental: results_by_path, removed_by_path = audit_tex_files_incremental(model, keyed, history, args.workers, args.max_rpm, _progress, cache, args.pack_tokens)
+    else: results_by_path = audit_tex_files(model, keyed, args.workers, args.max_rpm, _progress, cache, args.pack_tokens)
+    for data in all_files_data:
+        results = results_by_path[data["path"]]
+        history.save(data["path"], data["items"], results)
+        failures += sum(1 for r in results if "api_error" in r)
+        markdown = generate_report_for_tex({data["filename"]: results}, {data["filename"]: removed_by_path.get(data["path"], [])})
+        payload = {"file": data["path"], "type": "tex", "results": results}
+        for written in _write_reports(_report_basename(data["path"], args.out, args.input_root), markdown, payload, args.formats):
+            _log(f"📝 {written}")
+    return failures
+
+
+def audit_pdf_file(model, pdf_path, args, cache):
+    """PDF 하나를 OCR 후 섹션별로 동시 검토하고 보고서를 저장. 실패한 섹션 수(변환 실패 시 1)를 반환."""
+    limiter = create_rate_controller(args.max_rpm, args.workers)
+    name = os.path.basename(pdf_path)
+
+    def _progress(current, total, stage):
+        _log(f"[{stage}] {current}/{total} ({name})")
+
+    preprocessor = None if args.no_preprocess else PagePreprocessor(args.ocr_mode, args.ocr_format, args.ocr_quality, args.ocr_max_pixels, not args.no_crop)
+    converted_text, error = process_pdf(model, pdf_path, _progress, cache, limiter, use_text_layer=not args.no_text_layer, preprocessor=preprocessor,
+                                        render_processes=args.render_processes)
+    if preprocessor is not None and preprocessor.report:
+        summary = preprocessor.summary()
+        _log(f"🖼️ 업로드 {summary['upload_bytes'] / 1024 / 1024:.1f}MB / 원본 픽셀 {summary['raw_bytes'] / 1024 / 1024:.1f}MB "
+             f"({summary['saved_ratio']:.0%} 절감, 페이지당 {summary['seconds_per_page'] * 1000:.0f}ms)")
+    if error:
+        _log(f"❌ {pdf_path}: {error}")
+        return 1
+    sections = split_pdf_sections(converted_text)
+    results = run_ordered(
+        lambda task: review_pdf_section(model, task[1], task[0] + 1, cache, limiter), list(enumerate(sections)),
+        max_workers=args.workers,
+        on_error=lambda task, e: {"section": task[0] + 1, "errors": [], "api_error": str(e)},
+        on_result=lambda done, total, i, res: _progress(done, total, "검토"))
+    record_backoff_stats(limiter)
+    markdown = generate_report_for_pdf(results)
+    payload = {"file": pdf_path, "type": "pdf", "converted_text": converted_text, "results": results}
+    for written in _write_reports(_report_basename(pdf_path, args.out, args.input_root), markdown, payload, args.formats):
+        _log(f"📝 {written}")
+    return sum(1 for r in results if "api_error" in r or "parse_error" in r)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="ZIP(LaTeX)/PDF 교재를 일괄 감사하고 파일별 Markdown/JSON 보고서를 저장합니다.",
+        epilog="종료 코드: 0=성공, 1=일부 파일/문항 오류, 2=인자·입력·API 키 오류",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="디렉터리, 글롭 패턴 또는 .zip/.pdf 파일 경로")
+    parser.add_argument("--out", default="reports", help="보고서 저장 폴더, 입력 폴더 구조대로 <파일명>.report.md/.json 저장 (기본: reports)")
+    parser.add_argument("--format", dest="formats", default="md,json", help="보고서 형식: md, json 또는 md,json (기본)")
+    parser.add_argument("--max-rpm", type=int, default=DEFAULT_MAX_RPM, help=f"분당 최대 요청 수, 0=무제한 (기본: {DEFAULT_MAX_RPM})")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help=f"동시 검토 요청 수 (기본: {DEFAULT_MAX_WORKERS})")
+    parser.add_argument("--pack-tokens", type=int, default=DEFAULT_PACK_TOKENS, help="짧은 문항을 한 요청으로 묶을 때의 요청당 토큰 한도, 0=묶지 않음")
+    parser.add_argument("--parse-workers", type=int, default=None, help="ZIP 파싱 프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help=f"Gemini 모델 이름 (기본: {DEFAULT_MODEL_NAME})")
+    parser.add_argument("--backend", choices=BACKEND_KINDS, default=DEFAULT_BACKEND if DEFAULT_BACKEND in BACKEND_KINDS else "gemini",
+                        help="모델 백엔드: gemini, stub(오프라인 스텁), record(응답을 카세트로 녹화), replay(카세트로 오프라인 재생)")
+    parser.add_argument("--cassette-dir", default=CASSETTE_DIR, help=f"record/replay 카세트 폴더 (기본: {CASSETTE_DIR})")
+    parser.add_argument("--replay-speed", type=float, default=0.0, help="replay 시 녹화된 지연 시간 배율, 0=최고 속도 (기본: 0)")
+    parser.add_argument("--api-key", default=os.environ.get("GOOGLE_API_KEY", ""), help="Google API Key (기본: 환경 변수 GOOGLE_API_KEY)")
+    parser.add_argument("--legacy-parser", action="store_true", help="메인 페이지용 구형 파서(parse_tex_content) 사용")
+    parser.add_argument("--incremental", action="store_true", help="같은 경로의 이전 실행과 비교하여 추가·변경된 문항만 검토")
+    parser.add_argument("--render-processes", type=int, default=PDF_RENDER_PROCESSES, help=f"PDF 페이지를 동시에 렌더링할 poppler 프로세스 수 (기본: {PDF_RENDER_PROCESSES})")
+    parser.add_argument("--no-text-layer", action="store_true", help="PDF 텍스트 레이어를 쓰지 않고 모든 페이지를 OCR")
+    parser.add_argument("--no-preprocess", action="store_true", help="OCR 이미지를 전처리 없이 원본 그대로 전송")
+    parser.add_argument("--ocr-mode", choices=OCR_IMAGE_MODES, default=OCR_IMAGE_MODE, help=f"OCR 이미지 색상 (기본: {OCR_IMAGE_MODE})")
+    parser.add_argument("--ocr-format", type=str.upper, choices=OCR_IMAGE_FORMATS, default=OCR_IMAGE_FORMAT.upper(), help=f"OCR 이미지 형식 (기본: {OCR_IMAGE_FORMAT})")
+    parser.add_argument("--ocr-quality", type=int, default=OCR_IMAGE_QUALITY, help=f"JPEG/WebP 품질 1~100 (기본: {OCR_IMAGE_QUALITY})")
+    parser.add_argument("--ocr-max-pixels", type=int, default=OCR_MAX_PIXELS, help=f"OCR 이미지 최대 화소 수, 0=제한 없음 (기본: {OCR_MAX_PIXELS})")
+    parser.add_argument("--no-crop", action="store_true", help="OCR 이미지 여백을 자르지 않음")
+    parser.add_argument("--no-cache", action="store_true", help="LLM 결과 캐시를 사용하지 않음")
+    parser.add_argument("--shared-quota", action="store_true",
+                        help=f"같은 API 키를 쓰는 웹 앱 세션·다른 CLI와 RPM/TPM 한도를 나눠 씀 (원장: {API_QUOTA_DIR})")
+    parser.add_argument("--metrics", default=None, help="단계별 시간·요청 지연·토큰 사용량 JSON 경로 (기본: <out>/metrics.json)")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.formats = {f.strip() for f in args.formats.split(",") if f.strip()}
+    if not args.formats or not args.formats <= {"md", "json"}: parser.error("--format은 md, json 중에서 선택하세요.")
+    if args.max_rpm < 0 or args.workers < 1: parser.error("--max-rpm은 0 이상, --workers는 1 이상이어야 합니다.")
+
+    paths = collect_inputs(args.inputs)
+    if not paths:
+        _log("입력 파일(.zip/.pdf)이 없습니다.")
+        return EXIT_USAGE
+    args.input_root = os.path.commonpath([os.path.dirname(p) for p in paths])
+    if backend_needs_api_key(args.backend) and not args.api_key:
+        _log("API Key가 없습니다. --api-key 또는 GOOGLE_API_KEY를 지정하세요.")
+        return EXIT_USAGE
+
+    os.makedirs(args.out, exist_ok=True)
+    model = create_backend(args.backend, args.api_key, args.model, args.cassette_dir, args.replay_speed)
+    if args.shared_quota and backend_needs_api_key(args.backend): model = QuotaModel(model, SharedQuota(API_QUOTA_DIR), quota_key(args.api_key), f"cli-{os.getpid()}")
+    cache = None if args.no_cache else ReviewCache(REVIEW_CACHE_DIR, REVIEW_CACHE_MAX_MB * 1024 * 1024, REVIEW_CACHE_MAX_AGE_DAYS)
+
+    METRICS.reset()
+    failures = 0
+    zip_paths = [p for p in paths if p.lower().endswith(".zip")]
+    if zip_paths: failures += audit_zip_files(model, zip_paths, args, cache)
+    for pdf_path in (p for p in paths if p.lower().endswith(".pdf")):
+        failures += audit_pdf_file(model, pdf_path, args, cache)
+
+    if cache is not None:
+        stats = cache.stats()
+        _log(f"🗄️ 캐시 적중 {stats['hits']} / 미스 {stats['misses']}")
+    counters = METRICS.summary()["counters"]
+    if counters.get("backoff:retries"):
+        _log(f"🚦 재시도 {counters['backoff:retries']} · 429 {counters.get('backoff:rate_limited', 0)} · 서킷 개방 {counters.get('backoff:breaker_opens', 0)}")
+    metrics_path = METRICS.write(args.metrics or os.path.join(args.out, "metrics.json"), inputs=paths, model=args.model, workers=args.workers, max_rpm=args.max_rpm)
+    _log(f"📈 {metrics_path}")
+    _log("✅ 완료" if not failures else f"⚠️ 오류 {failures}건")
+    return EXIT_OK if not failures else EXIT_ITEM_ERRORS
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,959 @@
+import os
+import tempfile
+import time
+import re
+import subprocess
+import io
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+from review_executor import BackoffController, CallCancelled, TokenBucket, run_ordered
+from audit_metrics import METRICS
+from audit_history import CHANGE_UNCHANGED, CHANGE_MOVED, CHANGE_CHANGED, CHANGE_ADDED, plan_incremental
+from tex_index import TexIndex
+from tex_ingest import ingest_zip
+from json_stream import JsonArrayStream, parse_json_array
+from rule_engine import RuleEngine
+
+# ==========================================
+# [상수 및 환경 설정]
+# ==========================================
+if os.name == 'nt':
+    POPPLER_PATH = r"C:\Users\inter\Desktop\Review\poppler-25.12.0\Library\bin"
+else:
+    POPPLER_PATH = None
+
+# PDF 렌더링 설정: window 페이지씩 나눠 poppler 프로세스 여러 개로 동시에 임시 폴더에 렌더링하고 OCR과 병행
+PDF_RENDER_DPI = 300
+PDF_RENDER_WINDOW = 2
+PDF_RENDER_PROCESSES = int(os.environ.get("PDF_RENDER_PROCESSES", str(min(4, os.cpu_count() or 1))))
+PDF_RENDER_FORMAT = os.environ.get("PDF_RENDER_FORMAT", "ppm")   # ppm: 무압축이라 쓰기/읽기가 가장 빠름
+
+# PDF 텍스트 레이어(pdftotext)를 먼저 쓰고, 품질 검사에 실패한 페이지만 렌더링·OCR
+PDF_USE_TEXT_LAYER = os.environ.get("PDF_USE_TEXT_LAYER", "1") != "0"
+PDF_TEXT_MIN_CHARS = 40          # 공백 제외 글자 수가 이보다 적으면 이미지 페이지로 간주
+PDF_TEXT_MAX_BAD_RATIO = 0.005   # 깨진 글리프(�, 사용자 정의 영역, 제어 문자) 비율 한도
+PDF_TEXT_MIN_WORD_RATIO = 0.6    # 글자(한글·영문·숫자) 비율 하한 - 수식이 기호로 깨진 페이지 감지
+
+# 사용할 Gemini 모델
+DEFAULT_MODEL_NAME = 'gemini-1.5-flash'
+
+# 동시 검토 설정 기본값 (사이드바에서 변경 가능)
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_MAX_RPM = 15
+
+# 여러 문항을 한 요청으로 묶을 때의 요청당 토큰 한도 (0이면 묶지 않음)
+DEFAULT_PACK_TOKENS = 0
+
+# LLM 결과 캐시 (SQLite) 위치 및 한도
+REVIEW_CACHE_DIR = os.environ.get("REVIEW_CACHE_DIR", os.path.join(tempfile.gettempdir(), "review_cache"))
+REVIEW_CACHE_MAX_MB = int(os.environ.get("REVIEW_CACHE_MAX_MB", "256"))
+REVIEW_CACHE_MAX_AGE_DAYS = int(os.environ.get("REVIEW_CACHE_MAX_AGE_DAYS", "30"))
+
+# 개정판 비교용 이전 실행 기록 위치
+AUDIT_HISTORY_DIR = os.environ.get("AUDIT_HISTORY_DIR", os.path.join(tempfile.gettempdir(), "audit_history"))
+
+# 중단된 감사를 이어서 하기 위한 체크포인트 저널 위치 (컨테이너 재시작 후에도 남도록 영구 볼륨 지정 권장)
+AUDIT_JOURNAL_DIR = os.environ.get("AUDIT_JOURNAL_DIR", os.path.join(tempfile.gettempdir(), "audit_journal"))
+
+# 작업별 계측 결과(JSON) 저장 위치
+METRICS_DIR = os.environ.get("AUDIT_METRICS_DIR", os.path.join(tempfile.gettempdir(), "audit_metrics"))
+
+# 백그라운드 감사 작업의 상태·문항별 결과(SQLite)와 보고서 파일 위치
+AUDIT_JOB_DIR = os.environ.get("AUDIT_JOB_DIR", os.path.join(tempfile.gettempdir(), "audit_jobs"))
+
+# 같은 API 키를 쓰는 세션·프로세스가 함께 쓰는 할당량 원장(SQLite) 위치 (모든 worker가 같은 경로를 보도록 지정)
+API_QUOTA_DIR = os.environ.get("API_QUOTA_DIR", os.path.join(tempfile.gettempdir(), "api_quota"))
+
+# ==========================================
+# [프롬프트]
+# ==========================================
+PROMPT_FOR_TEX = """
+# 🏆 종합 학술 감사관 (Scholarly Auditor v8.2)
+
+## 1. 역할
+고등 수학 교육 콘텐츠의 **최종 검증자**로서, 오류를 찾아내어 **깔끔한 표(Table)**로 보고합니다.
+
+## 2. 출력 형식 (엄수)
+서술형 줄글을 절대 쓰지 마십시오. 발견한 오류를 **JSON 배열**로만 출력하고, 오류가 없다면 빈 배열 `[]`만 출력하십시오.
+배열의 원소 하나가 지적 사항 하나이며, `category`는 아래 세 가지 중 하나입니다.
+
+### critical: 학술 감사 (치명적 오류)
+* **기준:** 수학적 진리값, 정답, 부호, 개념 오류 (확신도 100%)
+* 예: {"location": "해설 3행", "category": "critical", "issue": "부호 오류", "original": "$f(t)$", "corrected": "$f(-t)$", "reason": "y축 대칭이므로 -t 대입 필요", "severity": "high"}
+
+### cleanup: 변환 오류 클린업 (단순 수정)
+* **기준:** 띄어쓰기, 오타, 문법, 단순 편집
+* 예: {"location": "문제 1행", "category": "cleanup", "issue": "띄어쓰기", "original": "3 개를", "corrected": "3개를", "reason": "", "severity": "low"}
+
+### suggestion: 개선 제안 (권장 사항)
+* **기준:** 더 나은 풀이, 가독성, 교육적 제안
+* 예: {"location": "식 (나)", "category": "suggestion", "issue": "풀이 개선", "original": "", "corrected": "", "reason": "로피탈 정리보다 미분계수 정의를 사용하는 것이 좋습니다.", "severity": "low"}
+
+## 3. 주의 사항
+1. critical, cleanup, suggestion 순서로 출력하세요.
+2. 수식은 LaTeX 문법($$)을 유지하세요.
+"""
+
+# 고정 프롬프트는 작업마다 한 번 시스템 지시로 등록하고, 요청에는 검토할 텍스트만 보냅니다.
+# 여러 문항을 한 요청으로 보낼 때 PROMPT_FOR_TEX 뒤에 붙는 안내
+PROMPT_FOR_TEX_PACKED = """
+## 4. 여러 문항 동시 검토
+아래에는 여러 문항이 `[[ITEM 번호]]`와 `[[/ITEM 번호]]` 사이에 들어 있습니다.
+각 문항을 서로 독립적으로 검토하고, 문항마다 `{"item": 문항 번호, "findings": [지적 사항 배열]}` 원소 하나를
+문항 번호 순서대로 하나의 JSON 배열에 출력하십시오. 오류가 없는 문항도 빠뜨리지 말고 `"findings": []`로 출력하십시오.
+"""
+
+PROMPT_FOR_PDF = """
+당신은 대한민국 고등학교 수학 교재 전문 교정자입니다.
+사용자가 보내는 텍스트에서 오류를 찾아 JSON 배열로 출력하세요. 오류가 없다면 빈 배열 `[]`만 출력하세요.
+(기존 프롬프트 생략...)
+[
+    {
+        "original": "문제가 있는 부분",
+        "corrected": "수정 제안",
+        "reason": "수정 이유",
+        "severity": "high/medium/low"
+    }
+]
+"""
+
+# 응답 스키마 (response_mime_type=application/json과 함께 등록): 모델이 위 형식의 JSON 배열만 내도록 강제
+FINDING_CATEGORIES = ("critical", "cleanup", "suggestion")
+FINDING_SEVERITIES = ("high", "medium", "low")
+_FINDING_PROPERTIES = {
+    "location": {"type": "string"},
+    "category": {"type": "string", "enum": list(FINDING_CATEGORIES)},
+    "issue": {"type": "string"},
+    "original": {"type": "string"},
+    "corrected": {"type": "string"},
+    "reason": {"type": "string"},
+    "severity": {"type": "string", "enum": list(FINDING_SEVERITIES)},
+}
+TEX_FINDINGS_SCHEMA = {"type": "array", "items": {"type": "object", "properties": _FINDING_PROPERTIES,
+                                                  "required": ["location", "category", "original", "corrected", "reason"]}}
+TEX_PACKED_FINDINGS_SCHEMA = {"type": "array", "items": {"type": "object", "properties": {"item": {"type": "integer"}, "findings": TEX_FINDINGS_SCHEMA},
+                                                         "required": ["item", "findings"]}}
+PDF_FINDINGS_SCHEMA = {"type": "array", "items": {"type": "object",
+                                                  "properties": {k: _FINDING_PROPERTIES[k] for k in ("original", "corrected", "reason", "severity")},
+                                                  "required": ["original", "corrected", "reason", "severity"]}}
+
+# ==========================================
+# [공통 유틸리티]
+# ==========================================
+_LATIN_LAST_JONG = {"A": "", "B": "", "C": "", "D": "", "E": "", "F": "", "G": "", "H": "", "I": "", "J": "", "K": "", "L": "ㄹ", "M": "ㅁ", "N": "ㄴ", "O": "", "P": "", "Q": "", "R": "ㄹ", "S": "", "T": "", "U": "", "V": "", "W": "", "X": "", "Y": "", "Z": ""}
+_DIGIT_LAST_JONG = {"0": "ㅇ", "1": "ㄹ", "2": "", "3": "ㅁ", "4": "", "5": "", "6": "ㄱ", "7": "ㄹ", "8": "ㄹ", "9": ""}
+_MATH_JOSA_PATTERN = re.compile(r'(?P<math>\${1,2}[^$]+?\${1,2})(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
+_NUM_JOSA_PATTERN = re.compile(r'(?P<num>\d[\d,]*(?:\.\d+)?)(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
+
+def _number_last_jong(num_raw):
+    if not num_raw: return ""
+    s = num_raw.strip().replace(",", "").replace(" ", "").lstrip("+")
+    if s.startswith("-"): s = s[1:]
+    if "." in s: return _DIGIT_LAST_JONG.get(s.split(".")[1][-1], "") if s.split(".")[1] else ""
+    digits = re.sub(r"\D", "", s).lstrip("0") or "0"
+    if digits == "0": return "ㅇ"
+    return _DIGIT_LAST_JONG.get(digits[-1])
+def _latin_last_jong(text):
+    s = text.strip()
+    if not s: return ""
+    for ch in reversed(s):
+        if ch.isalpha(): return _LATIN_LAST_JONG.get(ch.upper(), "")
+    return ""
+def _expected_josa(josa, last_jong):
+    has = (last_jong != "")
+    if josa in ("은", "는"): return "은" if has else "는"
+    if josa in ("이", "가"): return "이" if has else "가"
+    if josa in ("을", "를"): return "을" if has else "를"
+    if josa in ("과", "와"): return "과" if has else "와"
+    if josa in ("으로", "로"): return "로" if (not has or last_jong == "ㄹ") else "으로"
+    return josa
+
+# 교정 규칙 등록: 규칙마다 따로 스캔해 겹치는 매치도 모두 잡습니다. 전체·규칙별 시간과 오류 수는 현재 작업의 METRICS에 기록
+RULES = RuleEngine(METRICS)
+
+@RULES.rule("josa_math", _MATH_JOSA_PATTERN)
+def _rule_josa_math(m):
+    math = m.group("math")
+    ws = m.group("ws") or ""
+    josa = m.group("josa")
+    math_content = math.strip("$")
+    last_char = math_content[-1] if math_content else ""
+    if re.match(r'\d', last_char): derived_jong = _number_last_jong(last_char)
+    elif re.match(r'[A-Za-z]', last_char): derived_jong = _latin_last_jong(last_char)
+    else: derived_jong = "" 
+    exp = _expected_josa(josa, derived_jong)
+    if josa != exp and derived_jong != "":
+        return {"original": f"{math}{ws}{josa}", "corrected": f"{math}{exp}", "reason": "조사 오류(수식)", "severity": "medium"}
+    return None
+
+@RULES.rule("josa_number", _NUM_JOSA_PATTERN)
+def _rule_josa_number(m):
+    num = m.group("num")
+    ws = m.group("ws") or ""
+    josa = m.group("josa")
+    if m.start() > 0 and m.string[m.start() - 1] == "$": return None
+    exp = _expected_josa(josa, _number_last_jong(num))
+    if josa != exp or ws:
+        return {"original": f"{num}{ws}{josa}", "corrected": f"{num}{exp}", "reason": "조사 오류(숫자)", "severity": "medium"}
+    return None
+
+@METRICS.timed("rule_check")
+def rule_check_josa(section_text):
+    return RULES.check(section_text)
+
+@METRICS.timed("rule_check")
+def rule_check_josa_batch(section_texts):
+    """여러 파일의 모든 문항을 한 번에 검사. 입력 순서대로 오류 목록의 리스트를 반환."""
+    return RULES.check_batch(section_texts)
+
+def create_rate_controller(max_rpm=DEFAULT_MAX_RPM, max_workers=DEFAULT_MAX_WORKERS, cancelled=None):
+    """한 작업의 모든 API 호출이 공유하는 제어기 (RPM 제한 + 429 백오프/AIMD/서킷 브레이커). cancelled()가 참이면 남은 호출은 바로 CallCancelled."""
+    return BackoffController(TokenBucket(max_rpm), max_workers, cancelled=cancelled)
+
+def record_backoff_stats(limiter):
+    """제어기의 재시도·429·서킷 브레이커 통계를 현재 작업의 METRICS 카운터 "backoff:<이름>"으로 옮김 (작업이 끝날 때 한 번)."""
+    stats = limiter.stats()
+    for name in ("calls", "retries", "rate_limited", "transient", "breaker_opens"):
+        if stats[name]: METRICS.count(f"backoff:{name}", stats[name])
+    if stats["paused_seconds"]: METRICS.count("backoff:paused_seconds", round(stats["paused_seconds"], 1))
+    if stats["tripped"]: METRICS.count("backoff:tripped")
+
+class _PromptPrefixedModel:
+    """with_system_instruction을 지원하지 않는 모델용: 예전처럼 요청마다 고정 프롬프트를 앞에 붙임."""
+
+    def __init__(self, model, instruction):
+        self._model = model
+        self.system_instruction = instruction
+        self.model_name = getattr(model, 'model_name', '')
+
+    def generate_content(self, contents, **kwargs):
+        if isinstance(contents, str): return self._model.generate_content(self.system_instruction + "\n\n" + contents, **kwargs)
+        return self._model.generate_content([self.system_instruction] + list(contents), **kwargs)
+
+def with_system_prompt(model, instruction, response_schema=None):
+    """
+    고정 프롬프트(instruction)를 시스템 지시(또는 컨텍스트 캐시)로, response_schema가 있으면 JSON 응답 스키마와 함께 등록한 모델을 반환.
+    백엔드는 (지시, 스키마)마다 한 번만 등록해 두고 재사용하므로 작업(= 모델 객체)당 한 번만 만들어집니다.
+    """
+    if getattr(model, 'system_instruction', None) == instruction and getattr(model, 'response_schema', None) == response_schema: return model
+    if hasattr(model, 'with_system_instruction'): return model.with_system_instruction(instruction, response_schema)
+    return _PromptPrefixedModel(model, instruction)
+
+def _generate(model, contents, limiter=None, kind="review", label=None):
+    """API 호출 한 번(재시도는 각각)의 지연 시간과 토큰 사용량을 METRICS에 요청 종류(kind)별로 기록."""
+    def _call():
+        t0 = time.perf_counter()
+        try: response = model.generate_content(contents)
+        except Exception as e:
+            METRICS.record_request(kind, time.perf_counter() - t0, label=label, error=str(e))
+            raise
+        METRICS.record_request(kind, time.perf_counter() - t0, response, label)
+        return response.text
+    if limiter is None: return _call()
+    return limiter.call(_call)
+
+def _cached_generate(model, cache, prompt_template, payload, contents, limiter=None, kind="review", label=None):
+    """
+    cache가 있으면 (모델, 프롬프트 템플릿, 입력) 해시로 조회하고, 없을 때만 API를 호출해 저장.
+    limiter(BackoffController 또는 TokenBucket)는 실제 API를 호출할 때만 거치므로 캐시 적중은 바로 반환됩니다.
+    """
+    if cache is None: return _generate(model, contents, limiter, kind, label)
+    key = cache.make_key(getattr(model, 'model_name', ''), prompt_template, payload)
+    text = cache.get(key)
+    if text is None:
+        METRICS.count("cache_miss")
+        text = _generate(model, contents, limiter, kind, label)
+        cache.put(key, text)
+    else: METRICS.count("cache_hit")
+    return text
+
+def _chunk_text(chunk):
+    # 스트림의 마지막 조각처럼 텍스트 파트가 없는 조각은 .text가 ValueError를 냄
+    try: return chunk.text or ""
+    except ValueError: return ""
+
+def _empty_reply_reason(response):
+    """빈 응답의 이유 (안전 필터 차단 사유 또는 finish_reason). 알 수 없으면 빈 문자열."""
+    block = getattr(getattr(response, 'prompt_feedback', None), 'block_reason', None)
+    if block: return f"block_reason={getattr(block, 'name', block)}"
+    try: finish = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError): return ""
+    return f"finish_reason={getattr(finish, 'name', finish)}" if finish else ""
+
+def _stream_findings(model, contents, limiter=None, kind="review", label=None):
+    """
+    stream=True로 요청해 JSON 배열 원소(지적 사항)를 완성되는 대로 모음.
+    반환값: (지적 사항 목록, 응답 전체 텍스트, JsonArrayStream). 파서의 done이 False면 잘린 응답입니다.
+    응답을 일부라도 받은 뒤 끊기면 재시도하지 않고 그때까지 완성된 지적 사항만 씁니다.
+    텍스트가 하나도 오지 않은 응답(안전 필터 차단 등)은 '오류 없음'이 아니므로 ValueError로 올립니다 (결과는 api_error).
+    """
+    def _call():
+        parser, findings, pieces = JsonArrayStream(), [], []
+        response = None
+        t0 = time.perf_counter()
+        try:
+            response = model.generate_content(contents, stream=True)
+            for chunk in response:
+                piece = _chunk_text(chunk)
+                pieces.append(piece)
+                findings.extend(parser.feed(piece))
+        except Exception as e:
+            METRICS.record_request(kind, time.perf_counter() - t0, label=label, error=str(e))
+            if not "".join(pieces).strip(): raise
+            METRICS.count("stream_interrupted")
+        else:
+            if not "".join(pieces).strip():
+                error = f"모델 응답이 비어 있습니다 ({_empty_reply_reason(response) or '사유 없음'})"
+                METRICS.record_request(kind, time.perf_counter() - t0, label=label, error=error)
+                METRICS.count("empty_responses")
+                raise ValueError(error)
+            METRICS.record_request(kind, time.perf_counter() - t0, response, label)
+        if parser.started and not parser.done: METRICS.count("truncated_responses")
+        return findings, "".join(pieces), parser
+    if limiter is None: return _call()
+    return limiter.call(_call)
+
+def _cached_findings(model, cache, prompt_template, payload, contents, limiter=None, kind="review", label=None):
+    """
+    _cached_generate의 스트리밍·JSON 버전. 반환값: (지적 사항 목록, 응답 텍스트, JsonArrayStream)
+    끝까지 받은(배열이 닫힌) 응답만 캐시에 저장하고, 캐시 적중도 같은 파서로 읽습니다.
+    """
+    key = cache.make_key(getattr(model, 'model_name', ''), prompt_template, payload) if cache is not None else None
+    text = cache.get(key) if cache is not None else None
+    if text is not None:
+        METRICS.count("cache_hit")
+        findings, parser = parse_json_array(text)
+        return findings, text, parser
+    if cache is not None: METRICS.count("cache_miss")
+    findings, text, parser = _stream_findings(model, contents, limiter, kind, label)
+    if cache is not None and parser.done: cache.put(key, text)
+    return findings, text, parser
+
+def _dedup_errors(errors):
+    seen = set(); out = []
+    for e in errors:
+        key = (e.get("original",""), e.get("corrected",""), e.get("reason",""))
+        if key in seen: continue
+        seen.add(key); out.append(e)
+    return out
+
+# ==========================================
+# [로직 A] LaTeX ZIP 처리 (메인용)
+# ==========================================
+@METRICS.timed("zip_extract")
+def extract_tex_from_zip(zip_file_bytes):
+    """루트 .tex에 \\input/\\include된 파일을 펼친 전체 문서를 반환. 반환값: (내용, 오류 메시지)"""
+    ingested, error = ingest_zip(zip_file_bytes)
+    if error: return None, error
+    return ingested.text, None
+
+def ingest_zip_items(zip_bytes, dev=False):
+    """
+    ZIP 하나를 수집·파싱 (프로세스 풀에서 실행 가능). 반환값: (문항 목록, 오류 메시지, 경고 목록)
+    dev 문항에는 합친 문서 기준 'line'과 함께 원래 파일 위치 'source'("chapter1.tex:12")를 붙입니다.
+    """
+    with METRICS.stage("zip_extract"): ingested, error = ingest_zip(io.BytesIO(zip_bytes))
+    if error: return None, error, []
+    if not dev: return parse_tex_content(ingested.text), None, ingested.warnings
+    items = parse_tex_content_dev(ingested.text)
+    for item in items:
+        name, line = ingested.source_map.locate_line(item.get("line", 1))
+        if name is not None: item["source"] = f"{name}:{line}"
+    return items, None, ingested.warnings
+
+def ingest_zip_files(zip_blobs, dev=False, max_workers=None, pool=None):
+    """
+    여러 ZIP을 프로세스 풀에서 동시에 수집·파싱하여 입력 순서대로 [(문항 목록, 오류, 경고)]를 반환.
+    pool(ProcessPoolExecutor)을 주면 재사용하고, 없으면 이번 호출용 풀을 만듭니다. 파일이 하나면 현재 프로세스에서 처리합니다.
+    """
+    zip_blobs = list(zip_blobs)
+    if len(zip_blobs) <= 1 or max_workers == 1: return [ingest_zip_items(blob, dev) for blob in zip_blobs]
+    with METRICS.stage("parse"):
+        if pool is not None: return list(pool.map(ingest_zip_items, zip_blobs, [dev] * len(zip_blobs)))
+        with ProcessPoolExecutor(max_workers=max_workers) as own_pool:
+            return list(own_pool.map(ingest_zip_items, zip_blobs, [dev] * len(zip_blobs)))
+
+# [메인 페이지용 구형 파서 - 유지]
+@METRICS.timed("parse")
+def parse_tex_content(tex_content):
+    index = TexIndex(tex_content)
+    chunks = index.section_spans()
+    if not chunks: return [index.clean(index.body_start, index.body_end)]
+    # 문항 세트 = [이어 붙인 청크 오프셋 목록, 정리 후 뒤에 덧붙인 해설 청크 오프셋 목록]
+    final_items = []
+    current_item = []
+    explanation_keywords = ["해법", "해설", "풀이", "정답", "Solution", "성질", "개념", "정리", "분석", "접근", "Note", "Tip", "Guide", "공식"]
+    ignore_keywords = ["Day", "일차"] 
+    for chunk in chunks:
+        title_content = index.section_title(*chunk)
+        is_ignore = any(kw in title_content for kw in ignore_keywords)
+        is_explicit_explanation = any(kw in title_content for kw in explanation_keywords)
+        has_korean_text = bool(re.search(r'[가-힣]', title_content))
+        is_explanation = is_explicit_explanation or (has_korean_text and not is_ignore)
+        if is_ignore:
+            if current_item: final_items.append((current_item, []))
+            current_item = []
+            continue
+        if is_explanation:
+            if current_item: current_item.append(chunk)
+            else:
+                if final_items: final_items[-1][1].append(chunk)
+                else: current_item = [chunk]
+        else:
+            if current_item: final_items.append((current_item, []))
+            current_item = [chunk]
+    if current_item: final_items.append((current_item, []))
+    # 텍스트는 마지막에 한 번만 잘라서 만듦
+    return ["\n".join(index.clean(*c) for c in base).strip() + "".join("\n" + index.clean(*c) for c in extra) for base, extra in final_items]
+
+# ==========================================
+# [NEW] 개발용 파서 (문항 번호 기준 엄격 분리)
+# ==========================================
+@METRICS.timed("parse")
+def parse_tex_content_dev(tex_content):
+    """
+    [개발용] TeX 내용을 줄 단위로 읽어 (문항 + 모든 해설) 세트로 분리.
+    오직 '문항 번호'가 나올 때만 세트를 끊습니다.
+    """
+    # 1. 문서 본문/줄 위치 인덱싱 (불필요한 LaTeX 명령어는 줄을 꺼낼 때 제거)
+    index = TexIndex(tex_content)
+    
+    # 2. 줄 단위로 처리 (빈 줄 제외, 각 줄의 원문 위치 유지)
+    lines = []
+    for start, end in index.body_lines():
+        line = index.clean(start, end).strip()
+        if line: lines.append((start, line))
+    
+    items = []
+    current_item_lines = []
+    current_item_label = "서문/공통" 
+    current_item_line = 1
+    
+    # [정규식 정의]
+    # 1. 순수 숫자 (예: "28", "29.")
+    regex_pure_num = re.compile(r'^\d+(\.\s*)?$')
+    # 2. 섹션 내의 숫자 (예: \section*{28}, \section*{110 \\ 29})
+    # 주의: \section*{해법} 같은 건 잡히면 안 됨. 오직 숫자, 공백, 줄바꿈(\\)만 허용
+    regex_section_num = re.compile(r'^\\section\*?\{\s*(\d+(\s*\\\\)?\s*)+\}$')
+    
+    ignore_keywords = ["Day", "일차"] 
+
+    for line_start, line in lines:
+        is_ignore = any(kw in line for kw in ignore_keywords)
+        if is_ignore: continue
+
+        # --- 문항 시작 판별 로직 ---
+        is_question_start = False
+        new_label = ""
+
+        if regex_pure_num.match(line):
+            is_question_start = True
+            new_label = line.replace('.', '').strip()
+            
+        elif regex_section_num.match(line):
+            # 섹션 내부 텍스트 추출
+            inner_text = re.sub(r'\\section\*?\{', '', line).rstrip('}')
+            # 텍스트가 정말 숫자로만(또는 \\ 포함) 되어 있는지 확인
+            # (이미 regex_section_num이 거르긴 했지만 안전장치)
+            if re.fullmatch(r'[\d\s\\]+', inner_text):
+                is_question_start = True
+                # "110 \\ 29" 같은 경우 마지막 숫자 "29"를 라벨로 사용
+                new_label = inner_text.split(r'\\')[-1].strip()
+
+        # --- 분기 처리 ---
+        if is_question_start:
+            # 기존에 모으던 내용이 있으면 저장 (이전 문항 세트 완료)
+            if current_item_lines:
+                items.append({
+                    "label": f"{current_item_label}번 문항",
+                    "content": "\n".join(current_item_lines),
+                    "line": current_item_line
+                })
+                current_item_lines = []
+            
+            # 새 문항 시작
+            current_item_label = new_label
+            current_item_line = index.line_of(line_start)
+            current_item_lines.append(line)
+        else:
+            # 문항 번호가 아니면 (해설, 개념, 지문 등) 무조건 현재 세트에 추가
+            if not current_item_lines: current_item_line = index.line_of(line_start)
+            current_item_lines.append(line)
+
+    # 마지막 문항 저장
+    if current_item_lines:
+        items.append({
+            "label": f"문항 {current_item_label}",
+            "content": "\n".join(current_item_lines),
+            "line": current_item_line
+        })
+
+    # 후처리: 내용이 너무 짧은 항목 제거 (쓰레기 데이터)
+    valid_items = []
+    for item in items:
+        if len(item['content']) > 5:
+            valid_items.append(item)
+            
+    return valid_items
+
+# ==========================================
+# [공통] 리뷰 및 리포트 생성
+# ==========================================
+def _tex_review_result(section_num, rule_errors, findings, text, parser):
+    """
+    JSON 지적 사항으로 결과를 만듦. JSON 배열이 없는 응답은 검토가 끝난 것으로 보지 않고 api_error로 남겨
+    (저널·실행 기록에 남지 않아 다음 실행에서 다시 검토) 원문만 ai_report_text로 함께 보여 줍니다.
+    """
+    if not parser.started:
+        return {"section": section_num, "rule_errors": rule_errors, "api_error": "모델 응답에 JSON 지적 사항 배열이 없습니다.", "ai_report_text": text}
+    result = {"section": section_num, "rule_errors": rule_errors, "findings": _dedup_errors(findings)}
+    if not parser.done: result["truncated"] = True
+    return result
+
+def review_tex_section(model, section_text, section_num, cache=None, limiter=None, rule_errors=None):
+    """문항 하나를 검토. rule_errors를 주면(미리 일괄 검사한 결과) 규칙 검사를 다시 하지 않습니다."""
+    if rule_errors is None: rule_errors = rule_check_josa(section_text)
+    try:
+        findings, text, parser = _cached_findings(with_system_prompt(model, PROMPT_FOR_TEX, TEX_FINDINGS_SCHEMA), cache, PROMPT_FOR_TEX, section_text, section_text,
+                                                  limiter, label=f"문항 {section_num}")
+        return _tex_review_result(section_num, rule_errors, findings, text, parser)
+    except Exception as e:
+        return {"section": section_num, "rule_errors": rule_errors, "api_error": str(e)}
+
+def estimate_tokens(text):
+    """대략적인 토큰 수 (한글 1자 ≈ 1토큰, 영문 3~4자 ≈ 1토큰으로 보수적으로 추정)."""
+    return len(text.encode('utf-8')) // 3 + 1
+
+def pack_sections(section_texts, token_budget):
+    """
+    입력 순서를 유지하면서 요청당 token_budget(프롬프트 포함) 안에 들어가는 만큼 문항을 묶어 인덱스 목록으로 반환.
+    한도보다 큰 문항은 단독 묶음이 되며, token_budget이 0 이하면 모두 단독입니다.
+    """
+    available = token_budget - estimate_tokens(PROMPT_FOR_TEX + PROMPT_FOR_TEX_PACKED)
+    if token_budget <= 0 or available <= 0: return [[i] for i in range(len(section_texts))]
+    packs, current, used = [], [], 0
+    for i, text in enumerate(section_texts):
+        cost = estimate_tokens(text) + 12  # [[ITEM n]] 구분자 몫
+        if current and used + cost > available:
+            packs.append(current); current, used = [], 0
+        current.append(i); used += cost
+    if current: packs.append(current)
+    return packs
+
+def split_packed_findings(entries, count):
+    """
+    묶음 응답의 문항별 원소 {"item", "findings"}를 {번호: [지적 사항]}로 모음.
+    원소가 완성된(닫힌) 문항만 검토가 끝난 것이므로, 모델이 빠뜨렸거나 응답이 잘려 없는 번호는 결과에 들어가지 않습니다.
+    """
+    parts = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("findings"), list): continue
+        try: n = int(entry.get("item"))
+        except (TypeError, ValueError): continue
+        if not 1 <= n <= count: continue
+        parts.setdefault(n, []).extend(finding for finding in entry["findings"] if isinstance(finding, dict))
+    return parts
+
+def review_tex_pack(model, sections, cache=None, limiter=None, rule_errors=None):
+    """
+    sections: [(section_num, section_text), ...]를 한 요청으로 검토하여 입력 순서대로 결과 목록을 반환.
+    rule_errors: sections와 같은 순서의 미리 검사한 규칙 오류 목록 (없으면 여기서 검사).
+    응답에 원소가 없는 문항(모델이 건너뛰었거나 응답이 잘렸거나 JSON이 아닌 경우)만 단일 요청으로 다시 검토합니다.
+    묶음 요청 자체가 실패하면(재시도를 다 쓴 429, 서킷 브레이커, 빈 응답 등) 부하를 문항 수만큼 늘리지 않도록
+    모든 문항을 그 오류의 api_error로 끝내고, 취소(CallCancelled)는 그대로 올려 보냅니다.
+    """
+    if rule_errors is None: rule_errors = [rule_check_josa(text) for _, text in sections]
+
+    def _single(k):
+        section_num, section_text = sections[k]
+        return review_tex_section(model, section_text, section_num, cache, limiter, rule_errors[k])
+
+    if len(sections) == 1: return [_single(0)]
+    payload = "".join(f"\n[[ITEM {k}]]\n{text}\n[[/ITEM {k}]]\n" for k, (_, text) in enumerate(sections, 1))
+    instruction = PROMPT_FOR_TEX + PROMPT_FOR_TEX_PACKED
+    label = f"문항 {sections[0][0]}-{sections[-1][0]} 묶음"
+    try: entries, _, _ = _cached_findings(with_system_prompt(model, instruction, TEX_PACKED_FINDINGS_SCHEMA), cache, instruction, payload, payload, limiter, label=label)
+    except CallCancelled: raise
+    except Exception as e:
+        METRICS.count("pack_failures")
+        return [{"section": section_num, "rule_errors": rule_errors[k], "api_error": str(e)} for k, (section_num, _) in enumerate(sections)]
+    parts = split_packed_findings(entries, len(sections))
+    results = []
+    for k, (section_num, _) in enumerate(sections):
+        if k + 1 not in parts:
+            METRICS.count("pack_fallbacks")
+            results.append(_single(k))
+            continue
+        results.append({"section": section_num, "rule_errors": rule_errors[k], "findings": _dedup_errors(parts[k + 1])})
+    return results
+
+def audit_tex_files(model, all_files_data, max_workers=DEFAULT_MAX_WORKERS, max_rpm=DEFAULT_MAX_RPM, progress_callback=None, cache=None, pack_tokens=DEFAULT_PACK_TOKENS, carried=None, changes=None, result_callback=None, cancelled=None):
+    """
+    모든 파일의 문항을 동시에(max_workers) 검토하고, 분당 요청 수(max_rpm)를 넘지 않도록 제한.
+    items가 문자열이면 메인 페이지, {'label', 'content'} 딕셔너리면 개발용 페이지 형식으로 처리합니다.
+    pack_tokens > 0이면 짧은 문항들을 요청당 토큰 한도 안에서 한 요청으로 묶어 보냅니다.
+    carried {파일 인덱스: {문항 인덱스: 결과}}에 있는 문항은 다시 검토하지 않고 그 결과를 그대로 씁니다 ('carried_over' 표시).
+    changes {파일 인덱스: {문항 인덱스: 변경 상태}}가 있으면 각 결과의 'change'로 기록합니다.
+    result_callback(파일 인덱스, 문항 인덱스, 결과)는 문항이 끝날 때마다(완료 순서대로) 호출됩니다.
+    cancelled()가 참이 되면 아직 보내지 않은 문항은 요청 자리를 기다리지 않고 바로 api_error로 끝납니다.
+    반환값은 {파일명: [문항 순서대로의 결과]} 입니다.
+    """
+    carried = carried or {}
+    changes = changes or {}
+    per_file = [[None] * len(file_data['items']) for file_data in all_files_data]
+    tasks = []
+    for f_idx, file_data in enumerate(all_files_data):
+        for j, item in enumerate(file_data['items']):
+            if j in carried.get(f_idx, {}): continue
+            if isinstance(item, dict): tasks.append((f_idx, j, item.get('content', ''), item.get('label', f"문항 {j+1}")))
+            else: tasks.append((f_idx, j, item, None))
+
+    def _finish(f_idx, j, result):
+        if j in changes.get(f_idx, {}): result['change'] = changes[f_idx][j]
+        per_file[f_idx][j] = result
+        if result_callback: result_callback(f_idx, j, result)
+
+    for f_idx, file_carried in sorted(carried.items()):
+        for j, result in sorted(file_carried.items()):
+            result['carried_over'] = True
+            _finish(f_idx, j, result)
+
+    limiter = create_rate_controller(max_rpm, max_workers, cancelled)
+    packs = pack_sections([task[2] for task in tasks], pack_tokens)
+    rule_errors = rule_check_josa_batch([task[2] for task in tasks])   # 모든 파일의 문항을 요청 전에 한 번에 규칙 검사
+
+    def _review(pack):
+        if cancelled is not None and cancelled(): raise CallCancelled("작업이 취소되었습니다.")
+        packed = [tasks[i] for i in pack]
+        results = review_tex_pack(model, [(j + 1, item_text) for _, j, item_text, _ in packed], cache, limiter, [rule_errors[i] for i in pack])
+        for (_, _, _, item_label), result in zip(packed, results):
+            if item_label is not None: result['label'] = item_label
+        return results
+
+    def _on_error(pack, e):
+        results = []
+        for i in pack:
+            f_idx, j, item_text, item_label = tasks[i]
+            result = {"section": j + 1, "rule_errors": rule_errors[i], "api_error": str(e)}
+            if item_label is not None: result['label'] = item_label
+            results.append(result)
+        return results
+
+    done_items = [0]
+    def _on_result(done, total, i, results):
+        for k, result in zip(packs[i], results): _finish(tasks[k][0], tasks[k][1], result)
+        done_items[0] += len(results)
+        if progress_callback: progress_callback(done_items[0], len(tasks), all_files_data[tasks[packs[i][-1]][0]]['filename'])
+
+    try: run_ordered(_review, packs, max_workers=max_workers, on_error=_on_error, on_result=_on_result)
+    finally: record_backoff_stats(limiter)
+    results_by_file = {}
+    for file_data, file_results in zip(all_files_data, per_file): results_by_file[file_data['filename']] = file_results
+    return results_by_file
+
+def plan_tex_reaudit(all_files_data, history):
+    """
+    파일 이름별 이전 실행 기록(history)과 비교한 재감사 계획.
+    반환값은 audit_tex_files에 넘길 (carried, changes)와 {파일명: [사라진 문항 라벨]} 입니다.
+    """
+    plans = [plan_incremental(file_data['items'], history.load(file_data['filename'])) for file_data in all_files_data]
+    carried = {f_idx: plan[0] for f_idx, plan in enumerate(plans)}
+    changes = {f_idx: plan[1] for f_idx, plan in enumerate(plans)}
+    removed_by_file = {file_data['filename']: plan[2] for file_data, plan in zip(all_files_data, plans)}
+    return carried, changes, removed_by_file
+
+def audit_tex_files_incremental(model, all_files_data, history, max_workers=DEFAULT_MAX_WORKERS, max_rpm=DEFAULT_MAX_RPM, progress_callback=None, cache=None, pack_tokens=DEFAULT_PACK_TOKENS, result_callback=None):
+    """
+    이전 실행과 비교하여 추가·변경된 문항만 검토하고 나머지는 이전 결과를 재사용.
+    각 결과에는 'change' 상태가, 재사용된 결과에는 'carried_over'가 붙습니다.
+    반환값은 (results_by_file, {파일명: [사라진 문항 라벨]}) 입니다.
+    """
+    carried, changes, removed_by_file = plan_tex_reaudit(all_files_data, history)
+    results_by_file = audit_tex_files(model, all_files_data, max_workers, max_rpm, progress_callback, cache, pack_tokens, carried, changes, result_callback)
+    return results_by_file, removed_by_file
+
+_CHANGE_MARKERS = {
+    CHANGE_UNCHANGED: "♻️ *이전 실행 결과 재사용 (내용 변경 없음)*",
+    CHANGE_MOVED: "♻️ *이전 실행 결과 재사용 (문항 번호만 변경)*",
+    CHANGE_CHANGED: "✏️ *변경된 문항 — 새로 검토*",
+    CHANGE_ADDED: "🆕 *새 문항 — 새로 검토*",
+}
+_TEX_REPORT_TITLE = "# 🏆 종합 학술 감사 보고서\n"
+
+# category별 표: (제목, 헤더 줄, 정렬 줄, 칸 값 함수 -> 행)
+_FINDING_TABLES = {
+    "critical": ("### [Table A: 학술 감사 보고서] (치명적 오류)", "| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 | 근거 및 의견 |", "| :--- | :--- | :--- | :--- |",
+                 lambda c: f"| {c('location')} | {c('issue')} | **[원문]** {c('original')} <br> $\\downarrow$ <br> **[수정]** {c('corrected')} | {c('reason')} |"),
+    "cleanup": ("### [Table B: 변환 오류 클린업] (단순 수정)", "| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 |", "| :--- | :--- | :--- |",
+                lambda c: f"| {c('location')} | {c('issue')} | {c('original')} $\\to$ {c('corrected')} |"),
+    "suggestion": ("### [Table C: 개선 제안] (권장 사항)", "| 위치 | 제안 유형 | 내용 및 의견 |", "| :--- | :--- | :--- |",
+                   lambda c: f"| {c('location')} | {c('issue')} | {c('reason')} |"),
+}
+
+def _finding_table_lines(findings, truncated=False):
+    """JSON 지적 사항을 예전 보고서와 같은 Table A/B/C 형식으로 (알 수 없는 category는 Table B로)."""
+    if not findings: return [] if truncated else ["✅ **발견된 오류 없음**"]
+    lines = []
+    for category, (title, header, align, row) in _FINDING_TABLES.items():
+        rows = [f for f in findings if (f.get("category") if f.get("category") in _FINDING_TABLES else "cleanup") == category]
+        if not rows: continue
+        lines += [title, header, align]
+        for f in rows:
+            lines.append(row(lambda key, f=f: str(f.get(key) or "").replace("|", "\\|").replace("\n", " <br> ")))
+        lines.append("")
+    return lines
+
+def _tex_report_file_lines(filename, removed=None):
+    lines = [f"\n# 📁 파일: {filename}", "---"]
+    if removed: lines.append(f"🗑️ *이전 실행 대비 삭제된 문항: {', '.join(removed)}*")
+    return lines
+
+def _tex_report_item_lines(res):
+    lines = [f"\n## 📄 {res.get('label', '문항 세트 ' + str(res['section']))}"]
+    if res.get('change') in _CHANGE_MARKERS: lines.append(_CHANGE_MARKERS[res['change']])
+    if res.get('rule_errors'):
+        lines.append("### 🐍 [Python 규칙 감지] (참고용)")
+        lines.append("| 위치 | 오류 내용 | 원문 $\\to$ 수정 제안 |")
+        lines.append("| :--- | :--- | :--- |")
+        for err in res['rule_errors']:
+            lines.append(f"| {err['location']} | {err['reason']} | {err['original']} $\\to$ {err['corrected']} |")
+        lines.append("\n")
+    if 'api_error' in res: 
+        lines.append(f"⚠️ **API Error:** {res['api_error']}")
+        if res.get('ai_report_text'): lines.append(res['ai_report_text'])
+    elif 'findings' in res:
+        if res.get('truncated'): lines.append("✂️ *응답이 중간에 끊겨 일부 결과만 표시합니다.*")
+        lines.extend(_finding_table_lines(res['findings'], res.get('truncated')))
+    else: 
+        lines.append(res['ai_report_text'])
+    lines.append("\n---")
+    return lines
+
+def tex_item_report(res):
+    """문항 결과 하나의 보고서 Markdown (generate_report_for_tex의 문항 부분과 동일)."""
+    return "\n".join(_tex_report_item_lines(res))
+
+# category만 있고 severity가 빠진 지적 사항의 심각도
+_CATEGORY_SEVERITY = {"critical": "high", "cleanup": "low", "suggestion": "low"}
+
+def severity_counts(res):
+    """결과 하나의 지적 사항(규칙 감지 포함) 수를 심각도(high/medium/low)별로 셈. 예전 Markdown 결과는 셀 수 없어 0."""
+    counts = dict.fromkeys(FINDING_SEVERITIES, 0)
+    for finding in res.get('rule_errors', []) + res.get('findings', []) + res.get('errors', []):
+        severity = finding.get('severity') or _CATEGORY_SEVERITY.get(finding.get('category'), 'low')
+        counts[severity if severity in counts else 'low'] += 1
+    return counts
+
+@METRICS.timed("report")
+def generate_report_for_tex(results_grouped_by_file, removed_by_file=None):
+    lines = [_TEX_REPORT_TITLE]
+    for filename, results in results_grouped_by_file.items():
+        lines.extend(_tex_report_file_lines(filename, (removed_by_file or {}).get(filename)))
+        for res in results:
+            lines.extend(_tex_report_item_lines(res))
+    return "\n".join(lines)
+
+class TexReportStream:
+    """
+    generate_report_for_tex와 같은 보고서를 결과가 도착하는 대로 파일에 기록 (화면은 작업 저장소에서, 다운로드는 이 파일에서 읽음).
+    결과는 완료 순서대로 put() 해도 되며, 앞선 문항이 모두 도착한 구간만 순서대로 씁니다.
+    """
+
+    def __init__(self, files, path, removed_by_file=None):
+        self.files = [(filename, count) for filename, count in files]
+        self.path = path
+        self.removed_by_file = removed_by_file or {}
+        self._pending = {}
+        self._cursor = [0, 0]
+        self._headed = False    # 지금 파일의 머리말을 썼는지
+        self._f = open(path, "wb")
+        self._write([_TEX_REPORT_TITLE], first=True)
+        self._flush()
+
+    def _write(self, lines, first=False):
+        self._f.write(("" if first else "\n").encode("utf-8") + "\n".join(lines).encode("utf-8"))
+
+    @METRICS.timed("report")
+    def put(self, f_idx, j, result):
+        self._pending[(f_idx, j)] = result
+        self._flush()
+
+    def _flush(self):
+        f_idx, j = self._cursor
+        while f_idx < len(self.files):
+            filename, count = self.files[f_idx]
+            if not self._headed:
+                if count and (f_idx, 0) not in self._pending: break
+                self._write(_tex_report_file_lines(filename, self.removed_by_file.get(filename)))
+                self._headed = True
+            if j >= count:
+                f_idx, j, self._headed = f_idx + 1, 0, False
+                continue
+            result = self._pending.pop((f_idx, j), None)
+            if result is None: break
+            self._write(_tex_report_item_lines(result))
+            j += 1
+        self._cursor = [f_idx, j]
+        self._f.flush()
+
+    def close(self):
+        if not self._f.closed: self._f.close()
+
+# ==========================================
+# [로직 B] 2512 PDF 처리
+# ==========================================
+def _poppler_tool(name):
+    if POPPLER_PATH: return os.path.join(POPPLER_PATH, name + (".exe" if os.name == 'nt' else ""))
+    return name
+
+@METRICS.timed("text_layer")
+def extract_pdf_text_pages(pdf_path, timeout=120):
+    """pdftotext로 페이지별 텍스트 레이어를 추출 (페이지 구분은 \\f). 도구가 없거나 실패하면 None."""
+    try:
+        out = subprocess.run([_poppler_tool("pdftotext"), "-layout", "-enc", "UTF-8", pdf_path, "-"],
+                             capture_output=True, timeout=timeout, check=True).stdout
+    except (OSError, subprocess.SubprocessError): return None
+    pages = out.decode("utf-8", errors="replace").split("\f")
+    if pages and not pages[-1].strip(): pages.pop()
+    return pages
+
+_BAD_GLYPH_PATTERN = re.compile(r'[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0e-\x1f]|\(cid:\d+\)')
+_WORD_CHAR_PATTERN = re.compile(r'[가-힣A-Za-z0-9]')
+_LONE_JAMO_PATTERN = re.compile(r'[\u3131-\u318e]')
+
+def text_layer_problem(text):
+    """텍스트 레이어를 그대로 써도 되면 None, 아니면 OCR이 필요한 이유."""
+    chars = re.sub(r'\s', '', text)
+    if len(chars) < PDF_TEXT_MIN_CHARS: return "텍스트 없음"
+    if len(_BAD_GLYPH_PATTERN.findall(chars)) > len(chars) * PDF_TEXT_MAX_BAD_RATIO: return "깨진 글리프"
+    if len(_LONE_JAMO_PATTERN.findall(chars)) > len(chars) * PDF_TEXT_MAX_BAD_RATIO: return "분해된 한글"
+    if len(_WORD_CHAR_PATTERN.findall(chars)) < len(chars) * PDF_TEXT_MIN_WORD_RATIO: return "기호 비율 과다 (수식 깨짐)"
+    return None
+
+@METRICS.timed("rasterize")
+def _convert_pages(pdf_path, first_page, last_page, output_folder):
+    """first_page~last_page를 pdftoppm 프로세스 하나로 output_folder에 렌더링하고 파일 경로 목록(페이지 순)을 반환."""
+    return convert_from_path(pdf_path, dpi=PDF_RENDER_DPI, first_page=first_page, last_page=last_page, poppler_path=POPPLER_PATH,
+                             output_folder=output_folder, output_file=f"p{first_page:05d}", paths_only=True, fmt=PDF_RENDER_FORMAT)
+
+def _page_windows(page_numbers, window):
+    """오름차순 페이지 번호를 연속 구간별로, 최대 window 페이지씩 (첫 페이지, 마지막 페이지)로 묶음."""
+    windows = []
+    for page_no in page_numbers:
+        if windows and windows[-1][1] == page_no - 1 and windows[-1][1] - windows[-1][0] + 1 < window: windows[-1][1] = page_no
+        else: windows.append([page_no, page_no])
+    return [tuple(w) for w in windows]
+
+def iter_pdf_pages(pdf_path, window=PDF_RENDER_WINDOW, pages=None, total_pages=None, processes=PDF_RENDER_PROCESSES):
+    """
+    PDF를 window 페이지씩 나눠 최대 processes개의 pdftoppm 프로세스로 동시에 임시 폴더에 렌더링하고
+    (페이지 번호, 전체 페이지 수, 이미지)를 페이지 순서대로 반환. 앞 묶음이 끝나는 즉시 넘겨주므로 OCR과 렌더링이 겹칩니다.
+    미리 렌더링하는 묶음은 processes * 2개까지라 디스크·메모리에는 몇 페이지만 남고, 넘겨준 페이지 파일은 바로 지웁니다.
+    pages(페이지 번호 목록)를 주면 그 페이지만 렌더링합니다.
+    """
+    if total_pages is None: total_pages = int(pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"])
+    windows = _page_windows(sorted(pages) if pages is not None else range(1, total_pages + 1), max(1, window))
+    if not windows: return
+    processes = max(1, processes)
+    lookahead = processes * 2
+    with tempfile.TemporaryDirectory(prefix="pdf_pages_") as output_folder:
+        pool = ThreadPoolExecutor(max_workers=processes)
+        try:
+            # 렌더링 시간이 호출한 작업의 계측기에 기록되도록 contextvars를 넘겨서 실행
+            futures = [pool.submit(contextvars.copy_context().run, _convert_pages, pdf_path, first, last, output_folder) for first, last in windows[:lookahead]]
+            for k, (first, last) in enumerate(windows):
+                paths = futures[k].result()
+                if k + lookahead < len(windows): futures.append(pool.submit(contextvars.copy_context().run, _convert_pages, pdf_path, *windows[k + lookahead], output_folder))
+                for page_no, path in zip(range(first, last + 1), paths):
+                    page = Image.open(path)
+                    page.load()
+                    try: yield page_no, total_pages, page
+                    finally:
+                        page.close()
+                        os.remove(path)
+        finally: pool.shutdown(wait=True, cancel_futures=True)
+
+def process_pdf(model, pdf_path, progress_callback=None, cache=None, limiter=None, done_pages=None, page_callback=None, use_text_layer=PDF_USE_TEXT_LAYER, preprocessor=None, render_processes=PDF_RENDER_PROCESSES):
+    """
+    OCR할 페이지는 render_processes개의 poppler 프로세스로 동시에 렌더링합니다.
+    preprocessor(PagePreprocessor)가 있으면 OCR 업로드 전에 페이지 이미지를 줄여서 보냅니다 (없으면 원본 그대로).
+    use_text_layer이면 pdftotext 텍스트 레이어를 먼저 쓰고, 품질 검사(text_layer_problem)에 실패한 페이지만 렌더링·OCR합니다.
+    done_pages {페이지 번호: 텍스트}에 있는 페이지는 OCR을 건너뛰고 그 텍스트를 씁니다 (이어서 하기).
+    page_callback(페이지 번호, 텍스트)는 OCR에 성공한 페이지마다 호출됩니다.
+    limiter가 취소되면(CallCancelled) 남은 페이지를 렌더링하지 않고 예외를 그대로 올립니다.
+    """
+    full_text = ""
+    prompt = "이미지 내용을 Markdown으로 변환(OCR)하세요. 수식은 LaTeX($$)사용, 한글 보존."
+    done_pages = dict(done_pages or {})
+    try:
+        total_pages = int(pdfinfo_from_path(pdf_path, poppler_path=POPPLER_PATH)["Pages"])
+        if use_text_layer:
+            for page_no, text in enumerate((extract_pdf_text_pages(pdf_path) or [])[:total_pages], 1):
+                if page_no in done_pages or text_layer_problem(text) is not None: continue
+                done_pages[page_no] = text.strip()
+                METRICS.count("text_layer_pages")
+        rendered = iter_pdf_pages(pdf_path, pages=[p for p in range(1, total_pages + 1) if p not in done_pages], total_pages=total_pages, processes=render_processes)
+        for page_no in range(1, total_pages + 1):
+            if progress_callback: progress_callback(page_no, total_pages, "변환")
+            if page_no in done_pages:
+                full_text += f"\n\n--- Page {page_no} ---\n\n" + done_pages[page_no]
+                continue
+            _, _, page = next(rendered)
+            METRICS.count("ocr_pages")
+            try:
+                page_bytes = f"{page.mode}:{page.size}".encode() + page.tobytes()
+                image_part = page
+                if preprocessor is not None:
+                    with METRICS.stage("preprocess"): image_part = preprocessor.process(page, page_no)
+                    page_bytes = preprocessor.settings_key().encode() + page_bytes
+                page_text = _cached_generate(model, cache, prompt, page_bytes, [prompt, image_part], limiter, "ocr", f"{page_no}페이지")
+                if page_callback: page_callback(page_no, page_text)
+                full_text += f"\n\n--- Page {page_no} ---\n\n" + page_text
+            except CallCancelled: raise
+            except Exception as e: full_text += f"\n\n--- Page {page_no} (Error: {e}) ---\n\n"
+    except CallCancelled: raise
+    except Exception as e: return None, f"오류: PDF 변환 실패 ({e})"
+    return full_text, None
+
+def split_pdf_sections(content):
+    sections = re.split(r'\n(?=---\s*Page|\n---\n|\d+\.\s)', content)
+    return [s.strip() for s in sections if s.strip()]
+
+def review_pdf_section(model, section_text, section_num, cache=None, limiter=None):
+    """
+    섹션 하나를 검토.
+    응답이 잘렸으면 그때까지 완성된 지적 사항을 쓰고 'truncated'를, JSON 배열이 아예 없으면 'parse_error'를 남깁니다.
+    """
+    rule_errors = rule_check_josa(section_text)
+    try:
+        findings, response_text, parser = _cached_findings(with_system_prompt(model, PROMPT_FOR_PDF, PDF_FINDINGS_SCHEMA), cache, PROMPT_FOR_PDF, section_text, section_text,
+                                                           limiter, label=f"섹션 {section_num}")
+    except Exception as e: return {"section": section_num, "errors": rule_errors, "api_error": str(e)}
+    if not parser.started: return {"section": section_num, "errors": rule_errors, "parse_error": response_text}
+    result = {"section": section_num, "errors": _dedup_errors(rule_errors + findings)}
+    if not parser.done: result["truncated"] = True
+    return result
+
+@METRICS.timed("report")
+def generate_report_for_pdf(results):
+    report_lines = ["# 📝 검토 보고서 (2512)\n"]
+    total_errors = 0
+    for result in results:
+        section_num = result["section"]
+        errors = result.get("errors", [])
+        if "parse_error" in result or "api_error" in result:
+            report_lines.append(f"\n## 섹션 {section_num}\n⚠️ 오류 발생")
+        elif result.get("truncated"):
+            report_lines.append(f"\n## 섹션 {section_num}\n✂️ 응답이 중간에 끊겨 일부 결과만 표시합니다.")
+        if errors:
+            report_lines.append(f"\n## 섹션 {section_num}\n")
+            for err in errors:
+                total_errors += 1
+                icon = "🔴" if err.get("severity") == "high" else "🟡"
+                report_lines.append(f"### {icon} 오류 {total_errors}")
+                report_lines.append(f"- **원문**: {err.get('original', 'N/A')}")
+                report_lines.append(f"- **수정**: {err.get('corrected', 'N/A')}")
+                report_lines.append(f"- **이유**: {err.get('reason', 'N/A')}\n")
+    return '\n'.join(report_lines)
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# ==========================================
+# [이전 실행 기록] 개정판 재감사 시 바뀐 문항만 검토하기 위한 저장소
+# ==========================================
+CHANGE_UNCHANGED = "unchanged"
+CHANGE_MOVED = "moved"        # 내용은 같고 문항 번호(라벨)만 바뀜
+CHANGE_CHANGED = "changed"
+CHANGE_ADDED = "added"
+
+
+def fingerprint(text):
+    """공백 차이는 무시한 내용 지문."""
+    return hashlib.sha256(re.sub(r'\s+', ' ', text).strip().encode("utf-8")).hexdigest()
+
+
+def _item_label(item, j):
+    return item.get('label', f"문항 {j+1}") if isinstance(item, dict) else f"문항 세트 {j+1}"
+
+
+def _item_text(item):
+    return item.get('content', '') if isinstance(item, dict) else item
+
+
+class AuditHistory:
+    """파일 이름별로 가장 최근 감사 결과(문항 라벨, 지문, 결과)를 JSON으로 보관."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def _path(self, filename):
+        return os.path.join(self.directory, hashlib.sha1(filename.encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, filename):
+        try:
+            with open(self._path(filename), encoding="utf-8") as f: return json.load(f)
+        except (OSError, ValueError): return None
+
+    def save(self, filename, items, results):
+        record = {
+            "filename": filename,
+            "saved_at": time.time(),
+            "items": [{"label": _item_label(item, j), "fingerprint": fingerprint(_item_text(item)),
+                       "result": {k: v for k, v in result.items() if k not in ("change", "carried_over")}}
+                      for j, (item, result) in enumerate(zip(items, results))],
+        }
+        path = self._path(filename)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def plan_incremental(items, previous):
+    """
+    새 문항 목록을 이전 실행 기록과 (라벨, 내용 지문)으로 맞춰 봄.
+    반환값: (carried {문항 인덱스: 재사용할 결과}, changes {문항 인덱스: 변경 상태}, removed [사라진 문항 라벨])
+    - 라벨과 지문이 모두 같으면 unchanged, 지문만 같으면 moved → 이전 결과 재사용
+    - 라벨만 같으면 changed, 둘 다 없으면 added → 다시 검토
+    - 이전 결과가 API 오류였다면 재사용하지 않습니다.
+    """
+    carried, changes = {}, {}
+    if not previous: return carried, {j: CHANGE_ADDED for j in range(len(items))}, []
+    by_key, by_fp, prev_labels = {}, {}, set()
+    for entry in previous.get("items", []):
+        prev_labels.add(entry["label"])
+        if "api_error" in entry["result"]: continue
+        by_key.setdefault((entry["label"], entry["fingerprint"]), entry)
+        by_fp.setdefault(entry["fingerprint"], entry)
+    used = set()
+    for j, item in enumerate(items):
+        label, fp = _item_label(item, j), fingerprint(_item_text(item))
+        entry = by_key.get((label, fp))
+        status = CHANGE_UNCHANGED
+        if entry is None or id(entry) in used:
+            entry = by_fp.get(fp)
+            status = CHANGE_MOVED
+        if entry is not None and id(entry) not in used:
+            used.add(id(entry))
+            result = dict(entry["result"], section=j + 1)
+            if isinstance(item, dict): result["label"] = label
+            carried[j] = result
+            changes[j] = status
+        else: changes[j] = CHANGE_CHANGED if label in prev_labels else CHANGE_ADDED
+    current_labels = {_item_label(item, j) for j, item in enumerate(items)}
+    removed = [e["label"] for e in previous.get("items", []) if id(e) not in used and e["label"] not in current_labels]
+    return carried, changes, removed
@@ -0,0 +1,423 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from audit_core import severity_counts, with_system_prompt
+from audit_metrics import Metrics, use_metrics
+from review_executor import CallCancelled
+
+# ==========================================
+# [백그라운드 작업] 감사를 작업으로 제출해 worker 스레드에서 실행하고, 상태·문항별 결과는 SQLite에 기록
+# ==========================================
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+JOB_INTERRUPTED = "interrupted"     # 서버가 재시작되어 끝내지 못한 작업 (저널로 이어서 할 수 있음)
+JOB_ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# 동시에 실행할 작업 수와, 실행 중인 작업들이 나눠 쓸 전체 동시 요청 수
+JOB_MAX_RUNNING = int(os.environ.get("AUDIT_JOB_MAX_RUNNING", "2"))
+JOB_WORKER_CAPACITY = int(os.environ.get("AUDIT_JOB_WORKER_CAPACITY", "8"))
+JOB_MAX_AGE_DAYS = int(os.environ.get("AUDIT_JOB_MAX_AGE_DAYS", "7"))
+# 작업을 맡은 프로세스가 살아 있음을 기록하는 간격. 이 간격의 3배 넘게 기록이 없으면 그 프로세스가 죽은 것으로 봄
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("AUDIT_JOB_HEARTBEAT_SECONDS", "10"))
+_SLOT_POLL_SECONDS = 0.2            # 요청 자리를 기다리는 동안 취소 여부를 다시 확인하는 간격
+
+_JSON_COLUMNS = ("files", "artifacts")
+
+
+class JobCancelled(CallCancelled):
+    """취소된 작업의 남은 API 요청을 보내지 않고 바로 끝내기 위한 예외."""
+
+
+class JobStore:
+    """
+    작업(종류, 사용자, 상태, 진행 수, 파일 목록, 산출물)과 문항별 결과를 SQLite에 보관.
+    문항 결과에는 심각도별 개수를 함께 저장해, 화면은 결과를 모두 읽지 않고도 파일별 누적 개수를 보여줄 수 있습니다.
+    작업이 만든 파일(보고서 등)은 같은 디렉터리에 작업 ID로 시작하는 이름으로 두고, 작업을 지울 때 함께 지웁니다.
+    """
+
+    def __init__(self, directory, max_age_days=JOB_MAX_AGE_DAYS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.path = os.path.join(directory, "audit_jobs.sqlite3")
+        self.max_age = max_age_days * 86400
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL,
+                    done INTEGER NOT NULL DEFAULT 0,
+                    total INTEGER NOT NULL DEFAULT 0,
+                    stage TEXT,
+                    error TEXT,
+                    files TEXT NOT NULL,
+                    artifacts TEXT NOT NULL DEFAULT '{}',
+                    worker TEXT,
+                    beat REAL
+                )""")
+            # 이전 버전에서 만든 표에는 worker(작업을 맡은 프로세스)·beat(마지막 생존 기록) 열이 없음
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (("worker", "TEXT"), ("beat", "REAL")):
+                if name not in columns: conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS items (
+                    job_id TEXT NOT NULL,
+                    file INTEGER NOT NULL,
+                    item INTEGER NOT NULL,
+                    result TEXT NOT NULL,
+                    high INTEGER NOT NULL,
+                    medium INTEGER NOT NULL,
+                    low INTEGER NOT NULL,
+                    api_error INTEGER NOT NULL,
+                    PRIMARY KEY (job_id, file, item)
+                )""")
+        self.prune()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally: conn.close()
+
+    def path_for(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def create(self, kind, owner, title, files, worker=None):
+        """files: 화면에 보여줄 파일 목록 [{"filename", "count", "labels", ...}], worker: 작업을 맡은 프로세스 ID. 새 작업 ID를 반환."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT INTO jobs (id, kind, owner, title, status, created, files, worker, beat) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, kind, owner, title, JOB_QUEUED, now, json.dumps(files, ensure_ascii=False), worker, now))
+        return job_id
+
+    def update(self, job_id, **fields):
+        """status, started, finished, done, total, stage, error, beat 갱신."""
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn: conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def set_artifact(self, job_id, name, value):
+        # 읽고-고쳐-쓰기이므로 같은 프로세스 안에서는 잠금으로 순서를 보장
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT artifacts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None: return
+            artifacts = json.loads(row[0])
+            artifacts[name] = value
+            conn.execute("UPDATE jobs SET artifacts = ? WHERE id = ?", (json.dumps(artifacts, ensure_ascii=False), job_id))
+
+    def put_result(self, job_id, f_idx, j, result):
+        counts = severity_counts(result)
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO items (job_id, file, item, result, high, medium, low, api_error) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (job_id, f_idx, j, json.dumps(result, ensure_ascii=False), counts["high"], counts["medium"], counts["low"], int("api_error" in result)))
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None: return None
+        job = dict(row)
+        for name in _JSON_COLUMNS: job[name] = json.loads(job[name])
+        return job
+
+    def file_summaries(self, job_id):
+        """{파일 번호: {"done", "high", "medium", "low", "api_error"}} - 끝난 문항 수와 심각도별 누적 개수."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT file, COUNT(*), SUM(high), SUM(medium), SUM(low), SUM(api_error) FROM items WHERE job_id = ? GROUP BY file",
+                                (job_id,)).fetchall()
+        return {row[0]: dict(zip(("done", "high", "medium", "low", "api_error"), row[1:])) for row in rows}
+
+    def done_items(self, job_id, f_idx):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT item FROM items WHERE job_id = ? AND file = ? ORDER BY item", (job_id, f_idx))]
+
+    def result(self, job_id, f_idx, j):
+        with self._connect() as conn:
+            row = conn.execute("SELECT result FROM items WHERE job_id = ? AND file = ? AND item = ?", (job_id, f_idx, j)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def results(self, job_id, f_idx):
+        """[(문항 번호, 결과)] (문항 순서)."""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT item, result FROM items WHERE job_id = ? AND file = ? ORDER BY item", (job_id, f_idx)).fetchall()
+        return [(j, json.loads(result)) for j, result in rows]
+
+    def heartbeat(self, worker):
+        """worker가 맡은 대기·실행 중 작업에 생존 시각을 기록."""
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET beat = ? WHERE worker = ? AND status IN ({', '.join('?' * len(JOB_ACTIVE_STATES))})",
+                         (time.time(), worker, *JOB_ACTIVE_STATES))
+
+    def interrupt_unfinished(self, stale_seconds=JOB_HEARTBEAT_SECONDS * 3):
+        """
+        맡은 프로세스가 stale_seconds 넘게 생존 기록을 남기지 않은 대기·실행 중 작업은 더 이상 진행되지 않으므로 중단으로 표시.
+        같은 저장소를 쓰는 다른 서버 프로세스가 살아서 실행 중인 작업은 건드리지 않습니다.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET status = ?, finished = ? WHERE status IN ({', '.join('?' * len(JOB_ACTIVE_STATES))}) "
+                         "AND (beat IS NULL OR beat < ?)", (JOB_INTERRUPTED, now, *JOB_ACTIVE_STATES, now - stale_seconds))
+
+    def prune(self):
+        """max_age_days가 지난 작업과 그 결과·파일을 삭제."""
+        with self._connect() as conn:
+            old = [row[0] for row in conn.execute("SELECT id FROM jobs WHERE created < ?", (time.time() - self.max_age,))]
+            for job_id in old:
+                conn.execute("DELETE FROM items WHERE job_id = ?", (job_id,))
+                conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        for job_id in old:
+            for path in glob.glob(self.path_for(job_id, "*")): os.remove(path)
+
+
+class _FairSlots:
+    """
+    실행 중인 모든 작업이 나눠 쓰는 동시 요청 자리 capacity개. 합계가 capacity를 넘지 않으며,
+    자리가 나면 기다리는 작업 중 지금 자리를 가장 적게 쓰는 작업(같으면 먼저 기다린 요청)에 넘겨 작업끼리 번갈아 받습니다.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self._held = {}         # 작업 ID → 쓰고 있는 자리 수
+        self._waiting = []      # [(순번, 작업 ID)]
+        self._tickets = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, job_id, cancelled):
+        with self._cond:
+            self._tickets += 1
+            me = (self._tickets, job_id)
+            self._waiting.append(me)
+            try:
+                while True:
+                    if cancelled(): raise JobCancelled("작업이 취소되었습니다.")
+                    if sum(self._held.values()) < self.capacity and \
+                            min(self._waiting, key=lambda w: (self._held.get(w[1], 0), w[0])) == me: break
+                    self._cond.wait(_SLOT_POLL_SECONDS)
+                self._held[job_id] = self._held.get(job_id, 0) + 1
+            finally:
+                self._waiting.remove(me)
+                self._cond.notify_all()
+
+    def release(self, job_id):
+        with self._cond:
+            self._held[job_id] -= 1
+            if not self._held[job_id]: del self._held[job_id]
+            self._cond.notify_all()
+
+    def in_use(self):
+        with self._cond: return sum(self._held.values())
+
+
+class _SlotStream:
+    """스트림 응답을 그대로 흘려보내고, 다 읽거나 도중에 끊기면 요청 자리를 돌려줌."""
+
+    def __init__(self, response, release):
+        self._response = response
+        self._release = release
+
+    def __iter__(self):
+        try: yield from self._response
+        finally: self._release()
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class _CancellableModel:
+    """
+    작업이 취소되면 다음 요청부터 JobCancelled를 일으키는 모델 래퍼 (이미 보낸 요청은 끝까지 받음).
+    요청마다 작업 큐의 공유 자리(_FairSlots)를 받아 응답을 다 받을 때까지 쥐고 있습니다.
+    """
+
+    def __init__(self, model, ctx):
+        self._model = model
+        self._ctx = ctx
+        self.model_name = getattr(model, "model_name", "")
+        self.system_instruction = getattr(model, "system_instruction", None)
+        self.response_schema = getattr(model, "response_schema", None)
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return _CancellableModel(with_system_prompt(self._model, instruction, response_schema), self._ctx)
+
+    def generate_content(self, contents, **kwargs):
+        release = self._ctx.acquire_slot()
+        try: response = self._model.generate_content(contents, **kwargs)
+        except BaseException:
+            release()
+            raise
+        if kwargs.get("stream"): return _SlotStream(response, release)
+        release()
+        return response
+
+
+class JobContext:
+    """작업 함수에 넘기는 손잡이: 진행·문항 결과·산출물 기록, 취소 확인, 이 작업만의 계측기(metrics)."""
+
+    def __init__(self, store, job_id, max_workers, concurrent_jobs, slots=None):
+        self.store = store
+        self.job_id = job_id
+        self._slots = slots
+        self.max_workers = max_workers              # 이 작업에 배정된 동시 요청 수
+        self.concurrent_jobs = concurrent_jobs      # 시작 시점에 함께 실행 중이던 다른 작업 수
+        self.metrics = Metrics()                    # 작업 실행 중 METRICS 기록은 모두 여기로 (다른 작업과 섞이지 않음)
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def guard(self, model):
+        return _CancellableModel(model, self)
+
+    def acquire_slot(self):
+        """공유 요청 자리 하나를 받고(취소되면 JobCancelled) 돌려줄 함수를 반환. 두 번 불러도 한 번만 돌려줍니다."""
+        if self.cancelled: raise JobCancelled("작업이 취소되었습니다.")
+        if self._slots is None: return lambda: None
+        self._slots.acquire(self.job_id, lambda: self.cancelled)
+        released = []
+
+        def _release():
+            if not released:
+                released.append(True)
+                self._slots.release(self.job_id)
+        return _release
+
+    def progress(self, done, total, stage=None):
+        self.store.update(self.job_id, done=done, total=total, stage=stage)
+
+    def item_done(self, f_idx, j, result):
+        # 취소 뒤 보내지 못한 문항의 오류 결과는 남기지 않음 (다음에 저널로 이어서 검토)
+        if self.cancelled and "api_error" in result: return
+        self.store.put_result(self.job_id, f_idx, j, result)
+
+    def set_artifact(self, name, value):
+        self.store.set_artifact(self.job_id, name, value)
+
+    def path(self, suffix):
+        """작업이 만들 파일 경로 (작업을 지울 때 함께 삭제됨)."""
+        return self.store.path_for(self.job_id, suffix)
+
+
+class JobQueue:
+    """
+    프로세스 안의 작업 큐. 작업은 worker 스레드에서 실행되므로 브라우저 새로고침·탭 닫기·위젯 조작과 무관하게 끝까지 진행됩니다.
+    - 최대 max_running개를 동시에 실행하고, 다음 작업은 실행 중인 작업이 가장 적은 사용자(owner) 중
+      가장 오래전에 차례를 받은 사용자의 가장 오래된 작업부터 고름 (한 사용자가 작업을 여러 개 넣어도 사용자별로 번갈아 실행됨)
+    - 실행 중인 작업들의 API 요청은 모두 합쳐 capacity개까지만 동시에 나가며, 자리는 작업끼리 번갈아 받음 (_FairSlots)
+    - 작업과 생존 기록(heartbeat)에 이 프로세스의 worker ID를 남겨, 다른 프로세스가 시작할 때 살아 있는 작업을 중단으로 잘못 표시하지 않게 함
+    - 작업 함수가 예외를 내면 failed, 취소되면 cancelled로 기록
+    """
+
+    def __init__(self, store, max_running=JOB_MAX_RUNNING, capacity=JOB_WORKER_CAPACITY):
+        self.store = store
+        self.max_running = max(1, max_running)
+        self.capacity = max(1, capacity)
+        self._pending = []      # [(작업 ID, 사용자, 작업 함수, 요청한 동시 요청 수)] (제출 순서)
+        self._running = {}      # 작업 ID → (사용자, JobContext)
+        self._served = {}       # 사용자 → 마지막으로 작업을 배정받은 순번
+        self._tickets = 0
+        self._cond = threading.Condition()
+        self._slots = _FairSlots(self.capacity)
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        store.interrupt_unfinished()
+        for k in range(self.max_running):
+            threading.Thread(target=self._worker, name=f"audit-job-{k}", daemon=True).start()
+        threading.Thread(target=self._heartbeat, name="audit-job-heartbeat", daemon=True).start()
+
+    def submit(self, kind, owner, title, files, run, max_workers):
+        """run(ctx)를 실행할 작업을 대기열에 넣고 작업 ID를 반환."""
+        job_id = self.store.create(kind, owner, title, files, self.worker_id)
+        with self._cond:
+            self._pending.append((job_id, owner, run, max_workers))
+            self._cond.notify()
+        return job_id
+
+    def cancel(self, job_id):
+        with self._cond:
+            for k, entry in enumerate(self._pending):
+                if entry[0] == job_id:
+                    del self._pending[k]
+                    self.store.update(job_id, status=JOB_CANCELLED, finished=time.time())
+                    return
+            if job_id in self._running: self._running[job_id][1].cancel()
+
+    def metrics(self, job_id):
+        """실행 중인 작업의 현재 계측 요약 (실행 중이 아니면 None)."""
+        with self._cond: entry = self._running.get(job_id)
+        return entry[1].metrics.summary() if entry else None
+
+    def queue_position(self, job_id):
+        """대기 중이면 다음에 실행될 순서(1부터), 아니면 0."""
+        with self._cond:
+            order = self._dispatch_order()
+            return order.index(job_id) + 1 if job_id in order else 0
+
+    def _dispatch_order(self):
+        # 실행 중인 작업 수가 적은 사용자 → 차례를 받은 지 오래된 사용자 → 먼저 제출한 작업 순으로 하나씩 배정해 본 순서
+        running, served = {}, dict(self._served)
+        for owner, _ in self._running.values(): running[owner] = running.get(owner, 0) + 1
+        order, pending, ticket = [], list(self._pending), self._tickets
+        while pending:
+            k = min(range(len(pending)), key=lambda k: (running.get(pending[k][1], 0), served.get(pending[k][1], -1), k))
+            job_id, owner = pending.pop(k)[:2]
+            order.append(job_id)
+            running[owner] = running.get(owner, 0) + 1
+            served[owner] = ticket = ticket + 1
+        return order
+
+    def _take(self):
+        with self._cond:
+            while not self._pending: self._cond.wait()
+            job_id = self._dispatch_order()[0]
+            k = next(k for k, entry in enumerate(self._pending) if entry[0] == job_id)
+            _, owner, run, max_workers = self._pending.pop(k)
+            self._tickets += 1
+            self._served[owner] = self._tickets
+            ctx = JobContext(self.store, job_id, max(1, min(max_workers, self.capacity)), len(self._running), self._slots)
+            self._running[job_id] = (owner, ctx)
+            return ctx, run
+
+    def _heartbeat(self):
+        # 내 작업의 생존 기록을 남기고, 죽은 다른 프로세스가 남긴 작업은 중단으로 정리
+        while True:
+            time.sleep(JOB_HEARTBEAT_SECONDS)
+            try:
+                self.store.heartbeat(self.worker_id)
+                self.store.interrupt_unfinished()
+            except sqlite3.Error: pass
+
+    def _worker(self):
+        while True:
+            ctx, run = self._take()
+            now = time.time()
+            self.store.update(ctx.job_id, status=JOB_RUNNING, started=now, beat=now)
+            status, error = JOB_DONE, None
+            try:
+                with use_metrics(ctx.metrics): run(ctx)
+                if ctx.cancelled: status = JOB_CANCELLED
+            except CallCancelled: status = JOB_CANCELLED
+            except Exception as e: status, error = (JOB_CANCELLED, None) if ctx.cancelled else (JOB_FAILED, str(e))
+            finally:
+                self.store.update(ctx.job_id, status=status, finished=time.time(), error=error)
+                with self._cond: del self._running[ctx.job_id]
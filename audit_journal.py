@@ -0,0 +1,80 @@
+import hashlib
+import json
+import os
+import threading
+
+# ==========================================
+# [체크포인트 저널] 완료된 문항 결과를 즉시 JSONL로 기록하여 중단 후 이어서 실행
+# ==========================================
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class AuditJournal:
+    """
+    작업(화면 종류 + 업로드 파일 해시 목록)마다 하나의 JSONL 파일.
+    각 줄은 {"file": 파일 해시, "item": 문항 인덱스(또는 "ocr:3" 같은 키), "result": 결과}이며,
+    기록할 때마다 flush/fsync하므로 브라우저 연결이 끊기거나 컨테이너가 재시작돼도 완료분은 남습니다.
+    API 오류 결과는 기록하지 않으므로 이어서 할 때 다시 시도됩니다.
+    """
+
+    def __init__(self, directory, kind, file_hashes):
+        os.makedirs(directory, exist_ok=True)
+        job_key = hashlib.sha256("\n".join([kind] + list(file_hashes)).encode("utf-8")).hexdigest()
+        self.path = os.path.join(directory, f"{kind}_{job_key[:32]}.jsonl")
+        self._lock = threading.Lock()
+        self._recorded = set(self.entries())
+        self._torn_tail = self._has_torn_tail()
+
+    def entries(self):
+        """{(파일 해시, 문항 키): 결과}. 기록 도중 끊겨 깨진 마지막 줄은 무시합니다."""
+        found = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try: entry = json.loads(line)
+                    except ValueError: continue
+                    found[(entry["file"], entry["item"])] = entry["result"]
+        except OSError: pass
+        return found
+
+    def _has_torn_tail(self):
+        """마지막 줄이 줄바꿈 없이 끊겼는지 (다음 기록이 그 줄에 이어 붙지 않도록 확인)."""
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0: return False
+                f.seek(-1, os.SEEK_END)
+                return f.read(1) != b"\n"
+        except OSError: return False
+
+    def __len__(self):
+        return len(self._recorded)
+
+    def append(self, file_hash, item_key, result):
+        if "api_error" in result: return
+        with self._lock:
+            if (file_hash, item_key) in self._recorded: return
+            with open(self.path, "a", encoding="utf-8") as f:
+                if self._torn_tail: f.write("\n")
+                f.write(json.dumps({"file": file_hash, "item": item_key, "result": result}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._recorded.add((file_hash, item_key))
+            self._torn_tail = False
+
+    def carried(self, all_files_data):
+        """audit_tex_files에 넘길 {파일 인덱스: {문항 인덱스: 결과}} (all_files_data의 각 항목에 'hash' 필요)."""
+        entries = self.entries()
+        carried = {}
+        for f_idx, file_data in enumerate(all_files_data):
+            for j in range(len(file_data['items'])):
+                result = entries.get((file_data['hash'], j))
+                if result is not None: carried.setdefault(f_idx, {})[j] = result
+        return carried
+
+    def clear(self):
+        with self._lock:
+            if os.path.exists(self.path): os.remove(self.path)
+            self._recorded = set()
+            self._torn_tail = False
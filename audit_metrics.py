@@ -0,0 +1,149 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# ==========================================
+# [계측] 단계별 소요 시간, API 요청 지연 히스토그램, 토큰 사용량
+# ==========================================
+# 히스토그램 구간 상한(초). 마지막 구간은 그 이상 전부
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+SLOWEST_KEPT = 10
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values: return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def _usage(response):
+    """Gemini 응답의 usage_metadata에서 (프롬프트 토큰, 응답 토큰). 없으면 (0, 0)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None: return 0, 0
+    return getattr(usage, "prompt_token_count", 0) or 0, getattr(usage, "candidates_token_count", 0) or 0
+
+
+class Metrics:
+    """
+    작업 하나의 계측기 (작업마다 새로 만들어 use_metrics로 연결하고, 끝나면 summary/write).
+    - stage(name) / timed(name) / add_stage(name, seconds): 단계별 호출 횟수와 누적·최대 시간
+    - record_request(kind, seconds, response, label): 요청 종류(ocr, review)별 지연 히스토그램, 토큰 수, 가장 느린 요청
+    - count(name): 캐시 적중 같은 단순 카운터
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self, keep_stages=()):
+        """모두 비움. keep_stages에 든 단계(예: 업로드 때 이미 끝난 파싱)는 남겨 둡니다."""
+        with self._lock:
+            self.started = time.time()
+            self._stages = {name: stat for name, stat in getattr(self, "_stages", {}).items() if name in keep_stages}
+            self._requests = {}
+            self._counters = {}
+            self._slowest = []
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.add_stage(name, time.perf_counter() - t0)
+
+    def add_stage(self, name, seconds, calls=1):
+        """따로 잰 시간(calls번 호출의 합)을 단계 name에 더함."""
+        with self._lock:
+            stat = self._stages.setdefault(name, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            stat["calls"] += calls; stat["seconds"] += seconds
+            stat["max_seconds"] = max(stat["max_seconds"], seconds / calls if calls else seconds)
+
+    def timed(self, name):
+        """함수 전체를 stage(name)으로 감싸는 데코레이터."""
+        def _decorator(fn):
+            @functools.wraps(fn)
+            def _wrapper(*args, **kwargs):
+                with self.stage(name): return fn(*args, **kwargs)
+            return _wrapper
+        return _decorator
+
+    def inherit_stages(self, other, names):
+        """other에 기록된 names 단계(예: 업로드 때 이미 끝난 추출·파싱)를 이 계측기로 복사."""
+        stages = other.summary()["stages"]
+        with self._lock:
+            for name in names:
+                if name in stages: self._stages[name] = stages[name]
+
+    def count(self, name, n=1):
+        with self._lock: self._counters[name] = self._counters.get(name, 0) + n
+
+    def record_request(self, kind, seconds, response=None, label=None, error=None):
+        prompt_tokens, response_tokens = _usage(response)
+        with self._lock:
+            stat = self._requests.setdefault(kind, {"latencies": [], "errors": 0, "prompt_tokens": 0, "response_tokens": 0})
+            stat["latencies"].append(seconds)
+            stat["prompt_tokens"] += prompt_tokens
+            stat["response_tokens"] += response_tokens
+            if error is not None: stat["errors"] += 1
+            self._slowest.append({"kind": kind, "label": label, "seconds": seconds, "error": error})
+            self._slowest.sort(key=lambda r: -r["seconds"])
+            del self._slowest[SLOWEST_KEPT:]
+
+    def summary(self):
+        with self._lock:
+            requests = {}
+            for kind, stat in self._requests.items():
+                latencies = sorted(stat["latencies"])
+                histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+                for v in latencies: histogram[bisect_left(LATENCY_BUCKETS, v)] += 1
+                requests[kind] = {
+                    "count": len(latencies), "errors": stat["errors"],
+                    "seconds": sum(latencies), "p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95), "max": latencies[-1] if latencies else None,
+                    "histogram": {"buckets": list(LATENCY_BUCKETS) + ["inf"], "counts": histogram},
+                    "prompt_tokens": stat["prompt_tokens"], "response_tokens": stat["response_tokens"],
+                }
+            return {
+                "started": self.started, "elapsed_seconds": time.time() - self.started,
+                "stages": {name: dict(stat) for name, stat in self._stages.items()},
+                "requests": requests, "counters": dict(self._counters), "slowest_requests": [dict(r) for r in self._slowest],
+            }
+
+    def write(self, path, **extra):
+        """요약을 JSON으로 저장 (extra는 작업 정보로 함께 기록)."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f: json.dump(dict(self.summary(), job=extra), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+_current = contextvars.ContextVar("audit_metrics", default=None)
+
+
+@contextmanager
+def use_metrics(metrics):
+    """이 블록(과 run_ordered 등이 이어받는 worker 스레드)에서 METRICS가 metrics에 기록되도록 연결."""
+    token = _current.set(metrics)
+    try: yield metrics
+    finally: _current.reset(token)
+
+
+class _CurrentMetrics:
+    """
+    호출 시점의 실행 흐름(contextvars)에 연결된 Metrics로 넘기는 대리자. 연결된 것이 없으면 프로세스 기본 계측기(CLI 등)에 기록.
+    timed로 감싼 함수도 호출될 때마다 계측기를 찾으므로 동시에 실행되는 작업들의 계측이 섞이지 않습니다.
+    """
+
+    timed = Metrics.timed
+
+    def __init__(self, default):
+        self.default = default
+
+    def __getattr__(self, name):
+        return getattr(_current.get() or self.default, name)
+
+
+METRICS = _CurrentMetrics(Metrics())
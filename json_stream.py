@@ -0,0 +1,85 @@
+import json
+import re
+
+# ==========================================
+# [JSON 스트림] 응답 조각에서 JSON 배열 원소(지적 사항)를 완성되는 대로 꺼냄
+# ==========================================
+# 원소 바깥에서는 다음 '{' 또는 배열 끝 ']'만, 문자열 안에서는 다음 '"' 또는 역슬래시만 보면 되므로 그 사이는 건너뜀
+_OUTSIDE_PATTERN = re.compile(r'[{\]]')
+_VALUE_PATTERN = re.compile(r'["{}\[\]]')
+_STRING_PATTERN = re.compile(r'["\\]')
+
+
+class JsonArrayStream:
+    """
+    최상위 JSON 배열을 조각(chunk) 단위로 받아, 객체 원소가 닫히는 즉시 dict로 돌려주는 증분 파서.
+    - 첫 '[' 앞의 코드 펜스(```json)나 설명 문장은 건너뜁니다.
+    - 잘린 응답이어도 그 전까지 완성된 원소는 모두 꺼낼 수 있습니다 (done이 False로 남음).
+    - 문법이 깨진 원소는 건너뛰고 invalid에 셉니다.
+    """
+
+    def __init__(self):
+        self.started = False    # '['를 만났는지 (False면 JSON 응답이 아님)
+        self.done = False       # 최상위 배열이 닫혔는지 (False면 잘린 응답)
+        self.invalid = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf = []
+
+    def feed(self, text):
+        """조각 하나를 넣고 이번에 완성된 원소(dict) 목록을 반환."""
+        items = []
+        pos, n = 0, len(text)
+        while pos < n and not self.done:
+            if not self.started:
+                pos = text.find("[", pos)
+                if pos < 0: break
+                self.started = True
+                pos += 1
+            elif self._depth == 0:
+                m = _OUTSIDE_PATTERN.search(text, pos)
+                if m is None: break
+                if m.group() == "]": self.done = True; break
+                self._buf = ["{"]
+                self._depth = 1
+                pos = m.end()
+            elif self._in_string:
+                if self._escape:
+                    self._buf.append(text[pos]); self._escape = False; pos += 1
+                    continue
+                m = _STRING_PATTERN.search(text, pos)
+                if m is None: self._buf.append(text[pos:]); break
+                self._buf.append(text[pos:m.end()])
+                if m.group() == "\\": self._escape = True
+                else: self._in_string = False
+                pos = m.end()
+            else:
+                m = _VALUE_PATTERN.search(text, pos)
+                if m is None: self._buf.append(text[pos:]); break
+                self._buf.append(text[pos:m.end()])
+                pos = m.end()
+                ch = m.group()
+                if ch == '"': self._in_string = True
+                elif ch in "{[": self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        item = self._decode("".join(self._buf))
+                        if item is not None: items.append(item)
+                        self._buf = []
+        return items
+
+    def _decode(self, raw):
+        try: item = json.loads(raw)
+        except ValueError: item = None
+        if not isinstance(item, dict):
+            self.invalid += 1
+            return None
+        return item
+
+
+def parse_json_array(text):
+    """완성된 응답 전체를 한 번에 파싱. 반환값: (원소 목록, 파서) - 파서의 started/done으로 형식·잘림 여부 확인."""
+    parser = JsonArrayStream()
+    return parser.feed(text), parser
@@ -0,0 +1,317 @@
+import copy
+import datetime
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+
+from audit_core import PROMPT_FOR_PDF, DEFAULT_MODEL_NAME, TEX_PACKED_FINDINGS_SCHEMA, estimate_tokens, with_system_prompt
+from audit_metrics import METRICS
+
+# ==========================================
+# [모델 백엔드] Gemini / 로컬 스텁 / 녹화·재생(카세트)
+# ==========================================
+# 모든 백엔드는 GenerativeModel과 같은 모양: model_name 속성과 generate_content(contents, stream=False) -> 응답(.text, .usage_metadata)
+# stream=True 응답은 조각(.text)을 차례로 돌려주는 반복 가능 객체이며, 다 읽은 뒤 usage_metadata가 채워집니다.
+# with_system_instruction(지시, 응답 스키마)은 고정 프롬프트(와 JSON 스키마)를 한 번 등록한 모델을 돌려주며, 이후 요청에는 본문만 실립니다.
+BACKEND_KINDS = ("gemini", "stub", "record", "replay")
+DEFAULT_BACKEND = os.environ.get("MODEL_BACKEND", "gemini")
+CASSETTE_DIR = os.environ.get("MODEL_CASSETTE_DIR", "cassettes")
+# 0보다 크면 시스템 지시를 Gemini 컨텍스트 캐시(이 TTL초 동안 유지)로 올려 요청마다 프롬프트 토큰을 다시 과금하지 않도록 시도
+MODEL_CONTEXT_CACHE_TTL = int(os.environ.get("MODEL_CONTEXT_CACHE_TTL", "0"))
+
+
+class BackendResponse:
+    def __init__(self, text, prompt_tokens=0, response_tokens=0, chunk_chars=0):
+        self.text = text
+        self.usage_metadata = _Usage(prompt_tokens, response_tokens)
+        self._chunk_chars = chunk_chars
+
+    def __iter__(self):
+        """stream=True 응답처럼 chunk_chars 글자씩 나눠 돌려줌 (0이면 한 조각)."""
+        step = self._chunk_chars or max(1, len(self.text))
+        for k in range(0, len(self.text), step): yield BackendResponse(self.text[k:k + step])
+
+
+class _RecordingStream:
+    """스트림 응답을 그대로 흘려보내면서 모은 뒤, 끝까지 읽히면 save(텍스트, usage_metadata)를 호출."""
+
+    def __init__(self, response, save):
+        self._response = response
+        self._save = save
+        self.text = ""
+        self.usage_metadata = None
+
+    def __iter__(self):
+        pieces = []
+        for chunk in self._response:
+            try: pieces.append(chunk.text or "")
+            except ValueError: pass
+            yield chunk
+        self.text = "".join(pieces)
+        self.usage_metadata = getattr(self._response, "usage_metadata", None)
+        self._save(self.text, self.usage_metadata)
+
+
+class _Usage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class CassetteMissError(LookupError):
+    """재생 모드에서 녹화되지 않은 요청."""
+
+
+def _parts(contents):
+    return contents if isinstance(contents, (list, tuple)) else [contents]
+
+
+def _schema_key(response_schema):
+    return json.dumps(response_schema, sort_keys=True, ensure_ascii=False) if response_schema is not None else ""
+
+
+class _SystemInstructions:
+    """(지시, 응답 스키마)별로 등록된 모델을 한 번만 만들어 보관 (여러 스레드가 동시에 요청해도 1회)."""
+
+    def __init__(self, bind):
+        self._bind = bind
+        self.models = {}
+        self._lock = threading.Lock()
+
+    def get(self, instruction, response_schema=None):
+        key = (instruction, _schema_key(response_schema))
+        with self._lock:
+            if key not in self.models: self.models[key] = self._bind(instruction, response_schema)
+            return self.models[key]
+
+    def instructions(self):
+        with self._lock: return {instruction for instruction, _ in self.models}
+
+
+def request_key(model_name, contents, system_instruction=None, response_schema=None):
+    """모델 이름 + 시스템 지시 + 응답 스키마 + 요청 내용(문자열, 이미지 픽셀)의 해시. 같은 요청은 같은 카세트를 가리킵니다."""
+    h = hashlib.sha256(model_name.removeprefix("models/").encode("utf-8"))
+    if system_instruction: h.update(b"\0y" + system_instruction.encode("utf-8"))
+    if response_schema is not None: h.update(b"\0j" + _schema_key(response_schema).encode("utf-8"))
+    for part in _parts(contents):
+        if isinstance(part, str): h.update(b"\0s" + part.encode("utf-8"))
+        elif isinstance(part, dict) and "data" in part: h.update(f"\0b{part.get('mime_type')}:".encode() + part["data"])
+        elif hasattr(part, "tobytes"): h.update(f"\0i{part.mode}:{part.size}".encode() + part.tobytes())
+        else: h.update(b"\0r" + repr(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+logger = logging.getLogger(__name__)
+
+# genai.configure(전역 키)를 잠깐 바꿔 공개 API(CachedContent.create)를 부르는 구간을 직렬화
+_CONFIGURE_LOCK = threading.Lock()
+
+
+class GeminiBackend:
+    """
+    genai.configure는 프로세스 전역 설정이라 여러 세션이 서로 다른 키를 쓰면 마지막 키로 덮어씀.
+    그래서 키마다 전용 클라이언트(client_options)를 만들어 이 백엔드가 만드는 모든 모델에 직접 붙입니다.
+    모델에 클라이언트를 넘기는 공개 인자가 없어 GenerativeModel._client를 씀 (requirements.txt에서 SDK 버전 고정).
+    컨텍스트 캐시는 공개 API인 CachedContent.create를 configure 잠금 안에서 이 키로 부릅니다.
+    """
+
+    def __init__(self, api_key, model_name=DEFAULT_MODEL_NAME, context_cache_ttl=MODEL_CONTEXT_CACHE_TTL):
+        import google.generativeai as genai
+        from google.ai import generativelanguage as glm
+        self._genai = genai
+        self._api_key = api_key
+        self._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        self._model = self._attach(genai.GenerativeModel(model_name))
+        self.model_name = self._model.model_name
+        self.context_cache_ttl = context_cache_ttl
+        self.system_instruction = None
+        self.response_schema = None
+        self._instructions = _SystemInstructions(self._bind)
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return self._instructions.get(instruction, response_schema)
+
+    def _bind(self, instruction, response_schema):
+        bound = copy.copy(self)
+        bound.system_instruction = instruction
+        bound.response_schema = response_schema
+        bound._model = None
+        config = {"response_mime_type": "application/json", "response_schema": response_schema} if response_schema is not None else None
+        if self.context_cache_ttl > 0:
+            try:
+                from google.generativeai import caching
+                # CachedContent.create는 전역 기본 클라이언트를 쓰므로 잠금 안에서 이 키로 configure한 뒤 부름
+                with _CONFIGURE_LOCK:
+                    self._genai.configure(api_key=self._api_key)
+                    cached = caching.CachedContent.create(model=self.model_name, system_instruction=instruction,
+                                                          ttl=datetime.timedelta(seconds=self.context_cache_ttl))
+                bound._model = self._attach(self._genai.GenerativeModel.from_cached_content(cached, generation_config=config))
+            except Exception as e:
+                # 최소 토큰 수 미달 등으로 캐시를 만들 수 없으면 시스템 지시로 대체 (원인은 로그와 계측에 남김)
+                logger.warning("컨텍스트 캐시 생성 실패, 시스템 지시로 대체: %s", e)
+                METRICS.count("context_cache_errors")
+        if bound._model is None: bound._model = self._attach(self._genai.GenerativeModel(self.model_name, system_instruction=instruction, generation_config=config))
+        return bound
+
+    def generate_content(self, contents, stream=False):
+        return self._model.generate_content(contents, stream=stream)
+
+    def _attach(self, model):
+        model._client = self._client   # 비어 있으면 generate_content가 전역 기본 클라이언트를 만들어 씀
+        return model
+
+
+class StubRateLimitError(Exception):
+    """google.api_core의 ResourceExhausted처럼 보이는 429 오류."""
+
+
+# 묶음 요청 본문의 문항 구분자 (스텁이 문항마다 빈 결과 원소를 만들 때 사용)
+_PACKED_ITEM = re.compile(r"\[\[ITEM (\d+)\]\]")
+
+
+class StubBackend:
+    """
+    네트워크 없이 결정적인 응답을 돌려주는 로컬 백엔드.
+    프롬프트 종류(JSON 스키마 등록 여부, TeX 단일/묶음, PDF)에 맞는 형식으로 '오류 없음' 응답을 만들고 (stream=True면 chunk_chars 글자씩),
+    latency초 지연과 rate_429 확률의 429 오류('retry in Ns' 힌트 포함)를 흉내 낼 수 있습니다.
+    시스템 지시는 등록 횟수(instructions_registered)를 세고, 요청 본문 글자 수(sent_chars)와
+    등록된 지시를 본문에 다시 실어 보낸 요청 수(prefix_resends)를 기록합니다.
+    """
+
+    def __init__(self, latency=0.0, rate_429=0.0, retry_hint=0.05, seed=0, model_name="stub", chunk_chars=16):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_hint = retry_hint
+        self.model_name = model_name
+        self.chunk_chars = chunk_chars
+        self.system_instruction = None
+        self.response_schema = None
+        self.calls = 0
+        self.rate_limited = 0
+        self.sent_chars = 0
+        self.prefix_resends = 0
+        self.instructions_registered = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._instructions = _SystemInstructions(self._bind)
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return self._instructions.get(instruction, response_schema)
+
+    def _bind(self, instruction, response_schema):
+        self.instructions_registered += 1
+        return _StubSession(self, instruction, response_schema)
+
+    def generate_content(self, contents, stream=False, system_instruction=None, response_schema=None):
+        texts = [part for part in _parts(contents) if isinstance(part, str)]
+        resent = any(instruction.strip() in text for instruction in self._instructions.instructions() for text in texts)
+        with self._lock:
+            self.calls += 1
+            self.sent_chars += sum(map(len, texts))
+            if resent: self.prefix_resends += 1
+            throttled = self._rng.random() < self.rate_429
+            if throttled: self.rate_limited += 1
+        if self.latency: time.sleep(self.latency)
+        if throttled: raise StubRateLimitError(f"429 Resource has been exhausted (e.g. check quota). Please retry in {self.retry_hint}s.")
+        prompt = str(_parts(contents)[0])
+        if response_schema == TEX_PACKED_FINDINGS_SCHEMA:
+            text = json.dumps([{"item": int(n), "findings": []} for n in _PACKED_ITEM.findall(prompt)])
+        elif response_schema is not None or (system_instruction or prompt).startswith(PROMPT_FOR_PDF[:40]): text = "[]"
+        else: text = "✅ 발견된 오류 없음"
+        return BackendResponse(text, estimate_tokens((system_instruction or "") + prompt), estimate_tokens(text), self.chunk_chars if stream else 0)
+
+
+class _StubSession:
+    """시스템 지시를 등록한 StubBackend 뷰: 요청 본문만 받아 지시와 함께 원래 스텁으로 넘김 (카운터 공유)."""
+
+    def __init__(self, stub, instruction, response_schema):
+        self._stub = stub
+        self.model_name = stub.model_name
+        self.system_instruction = instruction
+        self.response_schema = response_schema
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return self._stub.with_system_instruction(instruction, response_schema)
+
+    def generate_content(self, contents, stream=False):
+        return self._stub.generate_content(contents, stream, self.system_instruction, self.response_schema)
+
+
+class RecordReplayBackend:
+    """
+    요청 해시별 카세트 파일(JSON)로 응답을 녹화하거나 재생.
+    - record: inner로 실제 요청을 보내고 응답 텍스트·토큰 수·지연 시간을 저장 (이미 있으면 덮어씀, 스트림은 끝까지 읽힌 뒤 저장)
+    - replay: 카세트에서만 응답하며 없으면 CassetteMissError. speed > 0이면 녹화된 지연 × speed만큼 기다림 (0=최고 속도)
+    """
+
+    def __init__(self, cassette_dir, mode="replay", inner=None, speed=0.0, model_name=None, system_instruction=None, response_schema=None):
+        if mode not in ("record", "replay"): raise ValueError(f"알 수 없는 모드: {mode}")
+        if mode == "record" and inner is None: raise ValueError("녹화 모드에는 실제 백엔드(inner)가 필요합니다.")
+        os.makedirs(cassette_dir, exist_ok=True)
+        self.cassette_dir = cassette_dir
+        self.mode = mode
+        self.inner = inner
+        self.speed = speed
+        self.model_name = model_name or getattr(inner, "model_name", DEFAULT_MODEL_NAME)
+        self.system_instruction = system_instruction
+        self.response_schema = response_schema
+        self._instructions = _SystemInstructions(self._bind)
+
+    def with_system_instruction(self, instruction, response_schema=None):
+        return self._instructions.get(instruction, response_schema)
+
+    def _bind(self, instruction, response_schema):
+        inner = with_system_prompt(self.inner, instruction, response_schema) if self.inner is not None else None
+        return RecordReplayBackend(self.cassette_dir, self.mode, inner, self.speed, self.model_name, instruction, response_schema)
+
+    def _path(self, key):
+        return os.path.join(self.cassette_dir, key[:2], key + ".json")
+
+    def generate_content(self, contents, stream=False):
+        key = request_key(self.model_name, contents, self.system_instruction, self.response_schema)
+        path = self._path(key)
+        if self.mode == "replay":
+            try:
+                with open(path, encoding="utf-8") as f: entry = json.load(f)
+            except (OSError, ValueError): raise CassetteMissError(f"카세트에 없는 요청입니다: {key[:16]}")
+            if self.speed: time.sleep(entry.get("latency", 0.0) * self.speed)
+            return BackendResponse(entry["text"], entry.get("prompt_tokens", 0), entry.get("response_tokens", 0))
+        t0 = time.perf_counter()
+
+        def _save(text, usage):
+            entry = {
+                "model": self.model_name, "text": text, "latency": time.perf_counter() - t0, "recorded_at": time.time(),
+                "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0, "response_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+            }
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f: json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+        if stream: return _RecordingStream(self.inner.generate_content(contents, stream=True), _save)
+        response = self.inner.generate_content(contents)
+        _save(response.text, getattr(response, "usage_metadata", None))
+        return response
+
+
+def backend_needs_api_key(kind):
+    return kind in ("gemini", "record")
+
+
+def backend_storage_dir(kind, directory):
+    """저널·실행 기록 위치: 실제 API 백엔드는 directory 그대로, 스텁·재생 결과는 백엔드별 하위 폴더 (실제 검토 결과로 이어지거나 재사용되지 않도록)."""
+    return directory if backend_needs_api_key(kind) else os.path.join(directory, kind)
+
+
+def create_backend(kind=DEFAULT_BACKEND, api_key=None, model_name=DEFAULT_MODEL_NAME, cassette_dir=CASSETTE_DIR, replay_speed=0.0):
+    """kind: gemini(실제 API), stub(로컬 스텁), record(Gemini 응답을 카세트로 녹화), replay(카세트만으로 재생)."""
+    if kind == "gemini": return GeminiBackend(api_key, model_name)
+    if kind == "stub": return StubBackend()
+    if kind == "record": return RecordReplayBackend(cassette_dir, "record", GeminiBackend(api_key, model_name))
+    if kind == "replay": return RecordReplayBackend(cassette_dir, "replay", speed=replay_speed, model_name=model_name)
+    raise ValueError(f"알 수 없는 모델 백엔드: {kind} (선택: {', '.join(BACKEND_KINDS)})")
@@ -0,0 +1,89 @@
+import io
+import math
+import os
+import threading
+import time
+
+from PIL import Image, ImageOps
+
+# ==========================================
+# [OCR 이미지 전처리] 여백 자르기, 흑백/이진화, 해상도 제한, 압축 인코딩
+# ==========================================
+OCR_IMAGE_MODES = ("rgb", "gray", "binary")
+OCR_IMAGE_FORMATS = ("JPEG", "WEBP", "PNG")
+_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+OCR_IMAGE_MODE = os.environ.get("OCR_IMAGE_MODE", "gray")
+OCR_IMAGE_FORMAT = os.environ.get("OCR_IMAGE_FORMAT", "JPEG")
+OCR_IMAGE_QUALITY = int(os.environ.get("OCR_IMAGE_QUALITY", "85"))
+OCR_MAX_PIXELS = int(os.environ.get("OCR_MAX_PIXELS", "4000000"))   # 300DPI A4(약 870만 화소)의 절반 정도
+OCR_CROP_MARGINS = os.environ.get("OCR_CROP_MARGINS", "1") != "0"
+
+_CROP_INK_THRESHOLD = 40    # 흰색(255)에서 이만큼 어두우면 내용으로 봄
+_CROP_PADDING = 16          # 잘라낸 내용 둘레에 남길 여백(px)
+_BINARY_THRESHOLD = 170
+
+
+class PagePreprocessor:
+    """
+    OCR 업로드 전에 페이지 이미지를 줄여 {"mime_type", "data"} 형태로 반환 (generate_content에 그대로 전달 가능).
+    페이지마다 원본/결과 크기와 처리 시간을 report에 남깁니다 (여러 스레드에서 호출해도 안전).
+    """
+
+    def __init__(self, mode=OCR_IMAGE_MODE, image_format=OCR_IMAGE_FORMAT, quality=OCR_IMAGE_QUALITY, max_pixels=OCR_MAX_PIXELS, crop_margins=OCR_CROP_MARGINS):
+        if mode not in OCR_IMAGE_MODES: raise ValueError(f"알 수 없는 이미지 모드: {mode} (선택: {', '.join(OCR_IMAGE_MODES)})")
+        image_format = image_format.upper()
+        if image_format not in OCR_IMAGE_FORMATS: raise ValueError(f"알 수 없는 이미지 형식: {image_format} (선택: {', '.join(OCR_IMAGE_FORMATS)})")
+        self.mode = mode
+        self.image_format = image_format
+        self.quality = quality
+        self.max_pixels = max_pixels
+        self.crop_margins = crop_margins
+        self.report = []
+        self._lock = threading.Lock()
+
+    def settings_key(self):
+        """캐시 키에 섞을 설정 문자열 (설정이 바뀌면 OCR 결과도 새로 받도록)."""
+        return f"{self.mode}/{self.image_format}/{self.quality}/{self.max_pixels}/{int(self.crop_margins)}"
+
+    def _crop(self, image):
+        gray = image.convert("L")
+        ink = ImageOps.invert(gray).point(lambda v: 255 if v > _CROP_INK_THRESHOLD else 0)
+        bbox = ink.getbbox()
+        if bbox is None: return image
+        left, top, right, bottom = bbox
+        return image.crop((max(0, left - _CROP_PADDING), max(0, top - _CROP_PADDING),
+                           min(image.width, right + _CROP_PADDING), min(image.height, bottom + _CROP_PADDING)))
+
+    def process(self, image, page_no=None):
+        t0 = time.perf_counter()
+        original_size = image.size
+        raw_bytes = image.width * image.height * len(image.getbands())
+        if self.crop_margins: image = self._crop(image)
+        if self.mode == "gray": image = image.convert("L")
+        elif self.mode == "binary": image = image.convert("L").point(lambda v: 255 if v > _BINARY_THRESHOLD else 0)
+        elif image.mode not in ("RGB", "L"): image = image.convert("RGB")
+        pixels = image.width * image.height
+        if self.max_pixels and pixels > self.max_pixels:
+            scale = math.sqrt(self.max_pixels / pixels)
+            image = image.resize((max(1, int(image.width * scale)), max(1, int(image.height * scale))), Image.LANCZOS)
+        if self.mode == "binary" and self.image_format == "PNG": image = image.convert("1")
+        buffer = io.BytesIO()
+        if self.image_format == "PNG": image.save(buffer, format="PNG", optimize=True)
+        else: image.save(buffer, format=self.image_format, quality=self.quality)
+        data = buffer.getvalue()
+        with self._lock:
+            self.report.append({"page": page_no, "original_size": original_size, "final_size": image.size,
+                                "raw_bytes": raw_bytes, "upload_bytes": len(data), "seconds": time.perf_counter() - t0})
+        return {"mime_type": _MIME_TYPES[self.image_format], "data": data}
+
+    def summary(self):
+        """전체 페이지의 원본 픽셀 바이트 대비 업로드 바이트, 절감률, 페이지당 평균 처리 시간."""
+        with self._lock: rows = list(self.report)
+        raw = sum(r["raw_bytes"] for r in rows)
+        upload = sum(r["upload_bytes"] for r in rows)
+        return {
+            "pages": len(rows), "raw_bytes": raw, "upload_bytes": upload, "saved_bytes": raw - upload,
+            "saved_ratio": (1 - upload / raw) if raw else 0.0,
+            "seconds_per_page": sum(r["seconds"] for r in rows) / len(rows) if rows else 0.0,
+        }
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# ==========================================
+# [LLM 결과 캐시] SQLite 기반, 내용 주소 지정
+# ==========================================
+class ReviewCache:
+    """
+    (모델 이름, 프롬프트 템플릿, 입력 텍스트/페이지 이미지 바이트)의 해시를 키로 응답 텍스트를 디스크에 저장.
+    max_bytes를 넘으면 오래 사용하지 않은 항목부터, max_age_days가 지난 항목은 무조건 삭제합니다.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024, max_age_days=30):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "review_cache.sqlite3")
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+        self.evict()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+            conn.commit()
+        finally: conn.close()
+
+    @staticmethod
+    def make_key(model_name, prompt_template, payload):
+        h = hashlib.sha256()
+        for part in (model_name, prompt_template, payload):
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            h.update(len(data).to_bytes(8, "big"))
+            h.update(data)
+        return h.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.max_age:
+                conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            else: row = None
+        with self._lock:
+            if row: self.hits += 1
+            else: self.misses += 1
+        return row[0] if row else None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                         (key, value, len(value.encode("utf-8")), now, now))
+        self.evict()
+
+    def evict(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.max_age,))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes: return
+            for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                total -= size
+                if total <= self.max_bytes: break
+
+    def clear(self):
+        with self._connect() as conn: conn.execute("DELETE FROM entries")
+        with self._lock: self.hits = 0; self.misses = 0
+
+    def stats(self):
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,249 @@
+import contextvars
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# 취소 여부(cancelled())를 다시 확인하는 간격: 취소 뒤 이 시간 안에 대기 중인 호출이 모두 끝남
+_CANCEL_POLL_SECONDS = 0.2
+
+
+class CallCancelled(Exception):
+    """취소된 작업의 호출이 자리(동시 실행 한도, RPM)를 기다리지 않고 바로 끝남."""
+
+
+def _sleep(seconds, cancelled=None):
+    """seconds 동안 쉬되, cancelled()가 참이 되면 CallCancelled로 바로 깨어남."""
+    if cancelled is None:
+        time.sleep(seconds)
+        return
+    deadline = time.monotonic() + seconds
+    while True:
+        if cancelled(): raise CallCancelled("작업이 취소되었습니다.")
+        left = deadline - time.monotonic()
+        if left <= 0: return
+        time.sleep(min(left, _CANCEL_POLL_SECONDS))
+
+# ==========================================
+# [요청 속도 제한] 토큰 버킷
+# ==========================================
+class TokenBucket:
+    """분당 요청 수(RPM) 기준 토큰 버킷. rpm이 0 이하이면 제한하지 않습니다."""
+
+    def __init__(self, rpm, burst=1):
+        self.rpm = rpm
+        self.rate = rpm / 60.0 if rpm and rpm > 0 else 0.0
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, cancelled=None):
+        if cancelled is not None and cancelled(): raise CallCancelled("작업이 취소되었습니다.")
+        if not self.rate: return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            _sleep(wait, cancelled)
+
+    def call(self, fn):
+        self.acquire()
+        return fn()
+
+
+# ==========================================
+# [재시도/백오프] 429 대응 - 서버 재시도 힌트, 지터, AIMD 동시성, 서킷 브레이커
+# ==========================================
+_RETRY_HINT_PATTERNS = [
+    re.compile(r'retry[_ ]delay\s*\{\s*seconds:\s*(\d+(?:\.\d+)?)', re.I),
+    re.compile(r'retry(?:ing)? (?:in|after) (\d+(?:\.\d+)?)\s*(?:s\b|sec|초)', re.I),
+    re.compile(r'retry-after:\s*(\d+(?:\.\d+)?)', re.I),
+]
+_RATE_LIMIT_PATTERN = re.compile(r'\b429\b|resource[_ ]?exhausted|quota|rate limit', re.I)
+_TRANSIENT_PATTERN = re.compile(r'\b(?:500|502|503|504)\b|unavailable|deadline[_ ]exceeded|timed? ?out|connection (?:reset|aborted)', re.I)
+
+
+class CircuitOpenError(RuntimeError):
+    """할당량 초과가 계속되어 서킷 브레이커가 작업을 중단함."""
+
+
+def is_rate_limited(exc):
+    return type(exc).__name__ in ("ResourceExhausted", "TooManyRequests") or bool(_RATE_LIMIT_PATTERN.search(str(exc)))
+
+
+def is_transient(exc):
+    return isinstance(exc, (TimeoutError, ConnectionError)) or type(exc).__name__ in ("ServiceUnavailable", "DeadlineExceeded", "InternalServerError") \
+        or bool(_TRANSIENT_PATTERN.search(str(exc)))
+
+
+def retry_after(exc):
+    """예외에 담긴 서버 재시도 힌트(초). Retry-After 헤더, retry_delay, 'retry in Ns' 메시지 순으로 찾고 없으면 None."""
+    value = getattr(exc, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+        if headers is not None:
+            try: value = headers.get("Retry-After")
+            except AttributeError: value = None
+    if value is not None:
+        try: return max(0.0, float(value))
+        except (TypeError, ValueError): pass
+    text = str(exc)
+    for pattern in _RETRY_HINT_PATTERNS:
+        m = pattern.search(text)
+        if m: return float(m.group(1))
+    return None
+
+
+class BackoffController:
+    """
+    작업 전체가 공유하는 API 호출 제어기. TokenBucket 자리에 그대로 넘길 수 있습니다 (call(fn)).
+    - 429/할당량 오류: 서버 힌트(없으면 지수 백오프)에 지터를 더해 기다린 뒤 재시도하고, 동시 실행 한도를 절반으로 줄임
+    - 성공할 때마다 한도를 조금씩(1/한도) 늘려 max_concurrency까지 회복 (AIMD)
+    - 할당량 오류가 breaker_threshold번 연속되면 서킷을 열어 모든 호출을 쿨다운 동안 멈춤.
+      쿨다운 뒤에는 한 번에 하나씩만 시도하며, 다시 실패하면 쿨다운을 두 배로 늘려 재개방.
+      max_opens번 연속으로 열리면 CircuitOpenError로 남은 호출을 즉시 실패시킵니다.
+    - 5xx/시간 초과 같은 일시적 오류는 재시도만 하고 한도는 건드리지 않습니다.
+    - cancelled()가 참이 되면 자리·RPM·재시도를 기다리던 호출과 이후 호출은 CallCancelled로 바로 끝납니다.
+    """
+
+    def __init__(self, limiter=None, max_concurrency=4, min_concurrency=1, max_attempts=5, base_delay=2.0, max_delay=60.0,
+                 breaker_threshold=5, breaker_cooldown=30.0, max_opens=4, cancelled=None):
+        self.limiter = limiter
+        self.cancelled = cancelled
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker_threshold = max(1, breaker_threshold)
+        self.breaker_cooldown = breaker_cooldown
+        self.max_opens = max_opens
+        self.limit = float(self.max_concurrency)
+        self._in_flight = 0
+        self._consecutive = 0
+        self._opens_in_row = 0
+        self._open_until = 0.0
+        self._last_decrease = 0.0
+        self._tripped = False
+        self._cond = threading.Condition()
+        self.counters = {"calls": 0, "retries": 0, "rate_limited": 0, "transient": 0, "breaker_opens": 0, "paused_seconds": 0.0}
+
+    def stats(self):
+        with self._cond:
+            return dict(self.counters, limit=self.limit, open=self._open_until > time.monotonic(), tripped=self._tripped)
+
+    def _enter(self):
+        poll = _CANCEL_POLL_SECONDS if self.cancelled is not None else None
+        with self._cond:
+            while True:
+                if self.cancelled is not None and self.cancelled(): raise CallCancelled("작업이 취소되었습니다.")
+                if self._tripped: raise CircuitOpenError("API 할당량 초과가 계속되어 작업을 중단했습니다.")
+                now = time.monotonic()
+                if self._open_until > now:
+                    self._cond.wait(min(self._open_until - now, poll or float("inf")))
+                    self.counters["paused_seconds"] += time.monotonic() - now
+                    continue
+                if self._in_flight < int(self.limit):
+                    self._in_flight += 1
+                    return
+                self._cond.wait(poll)
+
+    def _leave(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _on_success(self):
+        with self._cond:
+            self._consecutive = 0
+            self._opens_in_row = 0
+            self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _on_rate_limited(self, hint):
+        with self._cond:
+            now = time.monotonic()
+            self.counters["rate_limited"] += 1
+            self._consecutive += 1
+            # 동시에 실패한 요청들 때문에 한도가 한 번에 여러 번 깎이지 않도록 base_delay 간격으로만 감소
+            if now - self._last_decrease >= self.base_delay:
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._last_decrease = now
+            if self._consecutive >= self.breaker_threshold and self._open_until <= now:
+                self._opens_in_row += 1
+                self.counters["breaker_opens"] += 1
+                if self.max_opens and self._opens_in_row > self.max_opens: self._tripped = True
+                cooldown = min(self.breaker_cooldown * 2 ** (self._opens_in_row - 1), self.max_delay * 10)
+                self._open_until = now + max(cooldown, hint or 0.0)
+                self.limit = float(self.min_concurrency)
+            self._cond.notify_all()
+
+    def _delay(self, attempt, hint):
+        if hint is not None: return hint + random.uniform(0, max(1.0, hint * 0.2))
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def call(self, fn):
+        """fn()을 한도 안에서 실행하고 재시도 가능한 오류면 기다렸다가 다시 시도. 마지막 예외는 그대로 전달."""
+        for attempt in range(self.max_attempts):
+            self._enter()
+            try:
+                if self.limiter: self.limiter.acquire(self.cancelled)
+                with self._cond: self.counters["calls"] += 1
+                result = fn()
+            except Exception as e:
+                rate_limited = is_rate_limited(e)
+                if not rate_limited and not is_transient(e): raise
+                hint = retry_after(e)
+                if rate_limited: self._on_rate_limited(hint)
+                else:
+                    with self._cond: self.counters["transient"] += 1
+                if attempt == self.max_attempts - 1: raise
+            else:
+                self._on_success()
+                return result
+            finally: self._leave()
+            with self._cond: self.counters["retries"] += 1
+            _sleep(self._delay(attempt, hint), self.cancelled)
+
+
+# ==========================================
+# [동시 실행기] 입력 순서 유지
+# ==========================================
+def run_ordered(task, items, max_workers=4, on_error=None, on_result=None):
+    """
+    items 각각에 task(item)을 최대 max_workers개씩 동시에 실행하고, 결과를 입력 순서대로 반환.
+    - on_error(item, exc): 예외 발생 시 해당 항목의 결과를 만들어 반환 (없으면 예외를 그대로 전달)
+    - on_result(done, total, index, result): 완료될 때마다 호출 (호출한 스레드에서 실행되므로 UI 갱신 가능)
+    task는 호출한 쪽의 contextvars(작업별 계측기 등)를 이어받아 실행됩니다.
+    """
+    items = list(items)
+    total = len(items)
+    results = [None] * total
+    if not total: return results
+
+    def _run(item):
+        try: return task(item)
+        except Exception as e:
+            if on_error is None: raise
+            return on_error(item, e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total))) as pool:
+        futures = {pool.submit(contextvars.copy_context().run, _run, item): i for i, item in enumerate(items)}
+        done = 0
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i] = future.result()
+            done += 1
+            if on_result: on_result(done, total, i, results[i])
+    return results
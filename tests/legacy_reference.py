@@ -0,0 +1,215 @@
+"""
+개선 전(최초 커밋) 구현을 그대로 옮겨 둔 기준 구현. 새 파서·규칙 엔진이 같은 결과를 내는지 비교하는 데만 씁니다.
+"""
+import re
+
+# ==========================================
+# [공통 유틸리티]
+# ==========================================
+_JONGSUNG_LIST = ["", "ㄱ", "ㄲ", "ㄳ", "ㄴ", "ㄵ", "ㄶ", "ㄷ", "ㄹ", "ㄺ", "ㄻ", "ㄼ", "ㄽ", "ㄾ", "ㄿ", "ㅀ", "ㅁ", "ㅂ", "ㅄ", "ㅅ", "ㅆ", "ㅇ", "ㅈ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ"]
+_LATIN_LAST_JONG = {"A": "", "B": "", "C": "", "D": "", "E": "", "F": "", "G": "", "H": "", "I": "", "J": "", "K": "", "L": "ㄹ", "M": "ㅁ", "N": "ㄴ", "O": "", "P": "", "Q": "", "R": "ㄹ", "S": "", "T": "", "U": "", "V": "", "W": "", "X": "", "Y": "", "Z": ""}
+_DIGIT_LAST_JONG = {"0": "ㅇ", "1": "ㄹ", "2": "", "3": "ㅁ", "4": "", "5": "", "6": "ㄱ", "7": "ㄹ", "8": "ㄹ", "9": ""}
+_MATH_JOSA_PATTERN = re.compile(r'(?P<math>\${1,2}[^$]+?\${1,2})(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
+_NUM_JOSA_PATTERN = re.compile(r'(?P<num>\d[\d,]*(?:\.\d+)?)(?P<ws>\s*)(?P<josa>으로|로|은|는|이|가|을|를|과|와)(?=[\s\.,;:\)\]\}\!?]|$)')
+
+def _hangul_last_jong(text):
+    if not text: return ""
+    s = re.sub(r'[\s\.,;:!\?\)\]\}]+$', '', text.strip())
+    for ch in reversed(s):
+        code = ord(ch)
+        if 0xAC00 <= code <= 0xD7A3: return _JONGSUNG_LIST[(code - 0xAC00) % 28]
+    return ""
+def _number_last_jong(num_raw):
+    if not num_raw: return ""
+    s = num_raw.strip().replace(",", "").replace(" ", "").lstrip("+")
+    if s.startswith("-"): s = s[1:]
+    if "." in s: return _DIGIT_LAST_JONG.get(s.split(".")[1][-1], "") if s.split(".")[1] else ""
+    digits = re.sub(r"\D", "", s).lstrip("0") or "0"
+    if digits == "0": return "ㅇ"
+    return _DIGIT_LAST_JONG.get(digits[-1])
+def _latin_last_jong(text):
+    s = text.strip()
+    if not s: return ""
+    for ch in reversed(s):
+        if ch.isalpha(): return _LATIN_LAST_JONG.get(ch.upper(), "")
+    return ""
+def _expected_josa(josa, last_jong):
+    has = (last_jong != "")
+    if josa in ("은", "는"): return "은" if has else "는"
+    if josa in ("이", "가"): return "이" if has else "가"
+    if josa in ("을", "를"): return "을" if has else "를"
+    if josa in ("과", "와"): return "과" if has else "와"
+    if josa in ("으로", "로"): return "로" if (not has or last_jong == "ㄹ") else "으로"
+    return josa
+def _last_jong_from_math(math): return "" 
+def get_line_number(full_text, index): return full_text.count('\n', 0, index) + 1
+
+def rule_check_josa(section_text):
+    errors = []
+    for m in _MATH_JOSA_PATTERN.finditer(section_text):
+        math = m.group("math")
+        ws = m.group("ws") or ""
+        josa = m.group("josa")
+        last_jong = _last_jong_from_math(math) 
+        math_content = math.strip("$")
+        last_char = math_content[-1] if math_content else ""
+        if re.match(r'\d', last_char): derived_jong = _number_last_jong(last_char)
+        elif re.match(r'[A-Za-z]', last_char): derived_jong = _latin_last_jong(last_char)
+        else: derived_jong = "" 
+        exp = _expected_josa(josa, derived_jong)
+        original = f"{math}{ws}{josa}"
+        corrected = f"{math}{exp}"
+        line_num = get_line_number(section_text, m.start())
+        if josa != exp and derived_jong != "":
+            errors.append({"location": f"{line_num}행", "original": original, "corrected": corrected, "reason": "조사 오류(수식)", "severity": "medium"})
+    for m in _NUM_JOSA_PATTERN.finditer(section_text):
+        num = m.group("num")
+        ws = m.group("ws") or ""
+        josa = m.group("josa")
+        if m.start() > 0 and section_text[m.start() - 1] == "$": continue
+        last_jong = _number_last_jong(num)
+        exp = _expected_josa(josa, last_jong)
+        original = f"{num}{ws}{josa}"
+        corrected = f"{num}{exp}"
+        line_num = get_line_number(section_text, m.start())
+        if josa != exp or ws:
+            errors.append({"location": f"{line_num}행", "original": original, "corrected": corrected, "reason": "조사 오류(숫자)", "severity": "medium"})
+    return errors
+
+# [메인 페이지용 구형 파서 - 유지]
+def parse_tex_content(tex_content):
+    pattern = r'\\begin\{document\}([\s\S]*?)\\end\{document\}'
+    match = re.search(pattern, tex_content)
+    body = match.group(1).strip() if match else tex_content
+    body = re.sub(r'\\maketitle', '', body)
+    body = re.sub(r'\\newpage', '', body)
+    body = re.sub(r'\\clearpage', '', body)
+    start_pattern = re.compile(r'\\section\*?\{')
+    matches = list(start_pattern.finditer(body))
+    if not matches: return [body]
+    chunks = []
+    for i in range(len(matches)):
+        start_idx = matches[i].start()
+        end_idx = matches[i+1].start() if i + 1 < len(matches) else len(body)
+        chunks.append(body[start_idx:end_idx])
+    final_items = []
+    current_item_text = ""
+    explanation_keywords = ["해법", "해설", "풀이", "정답", "Solution", "성질", "개념", "정리", "분석", "접근", "Note", "Tip", "Guide", "공식"]
+    ignore_keywords = ["Day", "일차"] 
+    for chunk in chunks:
+        brace_open_index = chunk.find('{')
+        title_content = ""
+        if brace_open_index != -1:
+            brace_count = 1
+            for k, char in enumerate(chunk[brace_open_index+1:], 1):
+                if char == '{': brace_count += 1
+                elif char == '}': brace_count -= 1
+                if brace_count == 0:
+                    title_content = chunk[brace_open_index+1 : brace_open_index+k]
+                    break
+        is_ignore = any(kw in title_content for kw in ignore_keywords)
+        is_explicit_explanation = any(kw in title_content for kw in explanation_keywords)
+        has_korean_text = bool(re.search(r'[가-힣]', title_content))
+        is_explanation = is_explicit_explanation or (has_korean_text and not is_ignore)
+        if is_ignore:
+            if current_item_text.strip(): final_items.append(current_item_text.strip())
+            current_item_text = ""
+            continue
+        if is_explanation:
+            if current_item_text: current_item_text += "\n" + chunk
+            else:
+                if final_items: final_items[-1] += "\n" + chunk
+                else: current_item_text = chunk
+        else:
+            if current_item_text.strip(): final_items.append(current_item_text.strip())
+            current_item_text = chunk
+    if current_item_text.strip(): final_items.append(current_item_text.strip())
+    return final_items
+
+# ==========================================
+# [NEW] 개발용 파서 (문항 번호 기준 엄격 분리)
+# ==========================================
+def parse_tex_content_dev(tex_content):
+    """
+    [개발용] TeX 내용을 줄 단위로 읽어 (문항 + 모든 해설) 세트로 분리.
+    오직 '문항 번호'가 나올 때만 세트를 끊습니다.
+    """
+    # 1. 문서 본문 추출
+    pattern = r'\\begin\{document\}([\s\S]*?)\\end\{document\}'
+    match = re.search(pattern, tex_content)
+    body = match.group(1).strip() if match else tex_content
+
+    # 2. 불필요한 LaTeX 명령어 제거
+    body = re.sub(r'\\maketitle', '', body)
+    body = re.sub(r'\\newpage', '', body)
+    body = re.sub(r'\\clearpage', '', body)
+    
+    # 3. 줄 단위로 처리
+    lines = [line.strip() for line in body.split('\n') if line.strip()]
+    
+    items = []
+    current_item_lines = []
+    current_item_label = "서문/공통" 
+    
+    # [정규식 정의]
+    # 1. 순수 숫자 (예: "28", "29.")
+    regex_pure_num = re.compile(r'^\d+(\.\s*)?$')
+    # 2. 섹션 내의 숫자 (예: \section*{28}, \section*{110 \\ 29})
+    # 주의: \section*{해법} 같은 건 잡히면 안 됨. 오직 숫자, 공백, 줄바꿈(\\)만 허용
+    regex_section_num = re.compile(r'^\\section\*?\{\s*(\d+(\s*\\\\)?\s*)+\}$')
+    
+    ignore_keywords = ["Day", "일차"] 
+
+    for line in lines:
+        is_ignore = any(kw in line for kw in ignore_keywords)
+        if is_ignore: continue
+
+        # --- 문항 시작 판별 로직 ---
+        is_question_start = False
+        new_label = ""
+
+        if regex_pure_num.match(line):
+            is_question_start = True
+            new_label = line.replace('.', '').strip()
+            
+        elif regex_section_num.match(line):
+            # 섹션 내부 텍스트 추출
+            inner_text = re.sub(r'\\section\*?\{', '', line).rstrip('}')
+            # 텍스트가 정말 숫자로만(또는 \\ 포함) 되어 있는지 확인
+            # (이미 regex_section_num이 거르긴 했지만 안전장치)
+            if re.fullmatch(r'[\d\s\\]+', inner_text):
+                is_question_start = True
+                # "110 \\ 29" 같은 경우 마지막 숫자 "29"를 라벨로 사용
+                new_label = inner_text.split(r'\\')[-1].strip()
+
+        # --- 분기 처리 ---
+        if is_question_start:
+            # 기존에 모으던 내용이 있으면 저장 (이전 문항 세트 완료)
+            if current_item_lines:
+                items.append({
+                    "label": f"{current_item_label}번 문항",
+                    "content": "\n".join(current_item_lines)
+                })
+                current_item_lines = []
+            
+            # 새 문항 시작
+            current_item_label = new_label
+            current_item_lines.append(line)
+        else:
+            # 문항 번호가 아니면 (해설, 개념, 지문 등) 무조건 현재 세트에 추가
+            current_item_lines.append(line)
+
+    # 마지막 문항 저장
+    if current_item_lines:
+        items.append({
+            "label": f"문항 {current_item_label}",
+            "content": "\n".join(current_item_lines)
+        })
+
+    # 후처리: 내용이 너무 짧은 항목 제거 (쓰레기 데이터)
+    valid_items = []
+    for item in items:
+        if len(item['content']) > 5:
+            valid_items.append(item)
+            
+    return valid_items
@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+import api_quota
+from api_quota import QuotaModel, SharedQuota
+from review_executor import CallCancelled
+
+
+def test_rpm_limit_per_key(tmp_path):
+    quota = SharedQuota(str(tmp_path), rpm=3, tpm=0)
+    assert all(quota._try_acquire("k", "s1")[0] is not None for _ in range(3))
+    row_id, wait = quota._try_acquire("k", "s1")
+    assert row_id is None and wait > 0
+    assert quota._try_acquire("other", "s1")[0] is not None
+
+
+def test_waiting_session_gets_its_share(tmp_path, monkeypatch):
+    monkeypatch.setattr(api_quota, "_WINDOW_SECONDS", 0.3)
+    quota = SharedQuota(str(tmp_path), rpm=4, tpm=0)
+    assert all(quota._try_acquire("k", "a")[0] is not None for _ in range(4))
+    assert quota._try_acquire("k", "b")[0] is None       # b는 한도가 찬 동안 기다리는 중
+    time.sleep(0.35)
+    assert quota._try_acquire("k", "a")[0] is not None
+    assert quota._try_acquire("k", "a")[0] is not None
+    assert quota._try_acquire("k", "a")[0] is None       # 몫(4 ÷ 2) 초과, b가 기다림
+    assert quota._try_acquire("k", "b")[0] is not None
+
+
+def test_pause_blocks_every_session(tmp_path):
+    quota = SharedQuota(str(tmp_path), rpm=10, tpm=0)
+    quota.pause("k", 0.5)
+    row_id, wait = quota._try_acquire("k", "other")
+    assert row_id is None and 0 < wait <= 0.5
+    assert quota.utilization("k")["paused"] > 0
+
+
+class _StreamRateLimited(Exception):
+    pass
+
+
+class _ThrottledStreamModel:
+    model_name = "fake"
+
+    def generate_content(self, contents, stream=False):
+        def _chunks():
+            yield "["
+            raise _StreamRateLimited("429 Resource has been exhausted. Please retry in 2s.")
+        return _chunks()
+
+
+def test_streamed_429_pauses_quota(tmp_path):
+    quota = SharedQuota(str(tmp_path), rpm=10, tpm=0)
+    model = QuotaModel(_ThrottledStreamModel(), quota, "k", "s")
+    with pytest.raises(_StreamRateLimited): list(model.generate_content("x", stream=True))
+    assert 1 < quota.utilization("k")["paused"] <= 2
+
+
+class _EchoModel:
+    model_name = "fake"
+
+    def generate_content(self, contents, stream=False):
+        return contents
+
+
+def test_cancel_wakes_a_session_waiting_for_quota(tmp_path):
+    quota = SharedQuota(str(tmp_path), rpm=1, tpm=0)
+    quota.acquire("k", "s")
+    cancel_at = time.monotonic() + 0.3
+    model = QuotaModel(_EchoModel(), quota, "k", "s").with_cancelled(lambda: time.monotonic() > cancel_at)
+    t0 = time.monotonic()
+    with pytest.raises(CallCancelled): model.with_system_instruction("지시").generate_content("x")
+    assert time.monotonic() - t0 < 1.5      # 창(60초)이 비기를 기다리지 않음
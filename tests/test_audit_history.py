@@ -0,0 +1,52 @@
+from audit_core import audit_tex_files_incremental
+from audit_history import CHANGE_ADDED, CHANGE_CHANGED, CHANGE_MOVED, CHANGE_UNCHANGED, AuditHistory, plan_incremental
+from model_backend import StubBackend
+
+
+def _item(label, content):
+    return {"label": label, "content": content}
+
+
+def _previous(tmp_path, items, results):
+    history = AuditHistory(str(tmp_path))
+    history.save("book.zip", items, results)
+    return history.load("book.zip")
+
+
+def test_plan_matches_by_label_and_fingerprint(tmp_path):
+    old = [_item("1번 문항", "첫 문항"), _item("2번 문항", "둘째 문항"), _item("3번 문항", "셋째 문항"), _item("4번 문항", "지워질 문항")]
+    previous = _previous(tmp_path, old, [{"section": k + 1, "findings": [{"original": str(k)}]} for k in range(4)])
+    new = [_item("1번 문항", "첫   문항\n"),            # 공백만 다름
+           _item("5번 문항", "셋째 문항"),              # 번호만 바뀜
+           _item("2번 문항", "고친 둘째 문항"),
+           _item("6번 문항", "새 문항")]
+    carried, changes, removed = plan_incremental(new, previous)
+    assert changes == {0: CHANGE_UNCHANGED, 1: CHANGE_MOVED, 2: CHANGE_CHANGED, 3: CHANGE_ADDED}
+    assert carried == {0: {"section": 1, "findings": [{"original": "0"}], "label": "1번 문항"},
+                       1: {"section": 2, "findings": [{"original": "2"}], "label": "5번 문항"}}
+    assert removed == ["4번 문항"]          # 3번은 5번으로 옮겨 감
+
+
+def test_plan_does_not_reuse_api_errors_or_one_result_twice(tmp_path):
+    old = ["같은 본문", "오류 난 본문"]
+    previous = _previous(tmp_path, old, [{"section": 1, "findings": []}, {"section": 2, "api_error": "429"}])
+    carried, changes, removed = plan_incremental(["같은 본문", "같은 본문", "오류 난 본문"], previous)
+    assert set(carried) == {0}
+    assert changes == {0: CHANGE_UNCHANGED, 1: CHANGE_CHANGED, 2: CHANGE_ADDED}
+    assert removed == []
+
+
+def test_plan_without_history():
+    assert plan_incremental(["a", "b"], None) == ({}, {0: CHANGE_ADDED, 1: CHANGE_ADDED}, [])
+
+
+def test_incremental_audit_only_sends_changed_items(tmp_path):
+    history = AuditHistory(str(tmp_path))
+    items = [_item(f"{k}번 문항", f"문항 {k} 본문입니다.") for k in range(1, 6)]
+    history.save("book.zip", items, [{"section": k + 1, "findings": []} for k in range(5)])
+    items[2] = _item("3번 문항", "고친 본문입니다.")
+    stub = StubBackend()
+    results, removed = audit_tex_files_incremental(stub, [{"filename": "book.zip", "items": items}], history, max_rpm=0, pack_tokens=0)
+    assert stub.calls == 1 and removed == {"book.zip": []}
+    assert [r.get("carried_over", False) for r in results["book.zip"]] == [True, True, False, True, True]
+    assert results["book.zip"][2]["change"] == CHANGE_CHANGED
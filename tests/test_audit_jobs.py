@@ -0,0 +1,111 @@
+import threading
+import time
+
+from audit_jobs import JOB_ACTIVE_STATES, JOB_CANCELLED, JOB_DONE, JobQueue, JobStore
+from review_executor import run_ordered
+
+
+def _wait_finished(store, job_ids, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        jobs = [store.get(job_id) for job_id in job_ids]
+        if all(job["status"] not in JOB_ACTIVE_STATES for job in jobs): return jobs
+        time.sleep(0.02)
+    raise AssertionError("작업이 끝나지 않았습니다.")
+
+
+class _CountingModel:
+    """동시에 처리 중인 요청 수의 최댓값과 작업별 요청 수를 기록하는 모델."""
+
+    model_name = "fake"
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(self.delay)
+        with self._lock: self.in_flight -= 1
+        return "ok"
+
+
+def test_owners_take_turns(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_running=1, capacity=2)
+    started, gate = [], threading.Event()
+
+    def run(name):
+        def _run(ctx):
+            started.append(name)
+            if name == "a1": gate.wait(5)
+        return _run
+
+    first = queue.submit("tex", "alice", "a1", [], run("a1"), 1)
+    while not started: time.sleep(0.01)
+    later = [queue.submit("tex", owner, name, [], run(name), 1) for owner, name in (("alice", "a2"), ("alice", "a3"), ("bob", "b1"))]
+    assert [queue.queue_position(job_id) for job_id in later] == [2, 3, 1]
+    gate.set()
+    _wait_finished(store, [first] + later)
+    assert started == ["a1", "b1", "a2", "a3"]
+
+
+def test_running_jobs_share_capacity(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_running=3, capacity=4)
+    model = _CountingModel()
+    calls = {}
+
+    def run(ctx):
+        guarded = ctx.guard(model)
+        assert ctx.max_workers == 4
+        calls[ctx.job_id] = len(run_ordered(lambda k: guarded.generate_content(str(k)), range(20), max_workers=ctx.max_workers))
+
+    job_ids = [queue.submit("tex", f"user{k}", f"job{k}", [], run, 16) for k in range(3)]
+    jobs = _wait_finished(store, job_ids)
+    assert [job["status"] for job in jobs] == [JOB_DONE] * 3
+    assert all(calls[job_id] == 20 for job_id in job_ids)
+    assert model.peak <= 4
+    assert queue._slots.in_use() == 0
+
+
+def test_cancel_stops_waiting_job(tmp_path):
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_running=1, capacity=1)
+    model = _CountingModel(delay=0.05)
+    sent = []
+
+    def run(ctx):
+        guarded = ctx.guard(model)
+        for k in range(200):
+            guarded.generate_content(str(k))
+            sent.append(k)
+
+    job_id = queue.submit("tex", "alice", "long", [], run, 1)
+    while len(sent) < 2: time.sleep(0.01)
+    t0 = time.time()
+    queue.cancel(job_id)
+    (job,) = _wait_finished(store, [job_id])
+    assert job["status"] == JOB_CANCELLED
+    assert time.time() - t0 < 2 and len(sent) < 200
+
+
+def test_jobs_get_separate_metrics(tmp_path):
+    from audit_metrics import METRICS
+    store = JobStore(str(tmp_path))
+    queue = JobQueue(store, max_running=2, capacity=2)
+    seen = {}
+
+    def run(n):
+        def _run(ctx):
+            for _ in range(n): METRICS.count("items")
+            seen[ctx.job_id] = ctx.metrics.summary()["counters"]["items"]
+        return _run
+
+    job_ids = [queue.submit("tex", "alice", "x", [], run(3), 1), queue.submit("tex", "bob", "y", [], run(5), 1)]
+    _wait_finished(store, job_ids)
+    assert [seen[job_id] for job_id in job_ids] == [3, 5]
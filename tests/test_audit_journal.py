@@ -0,0 +1,48 @@
+from audit_journal import AuditJournal, content_hash
+
+
+def _files():
+    return [{"filename": "a.zip", "hash": content_hash(b"a"), "items": ["1", "2", "3"]},
+            {"filename": "b.zip", "hash": content_hash(b"b"), "items": ["1"]}]
+
+
+def test_resume_carries_recorded_results(tmp_path):
+    files = _files()
+    hashes = [f["hash"] for f in files]
+    journal = AuditJournal(str(tmp_path), "tex", hashes)
+    journal.append(files[0]["hash"], 0, {"section": 1, "findings": []})
+    journal.append(files[0]["hash"], 2, {"section": 3, "api_error": "429"})
+    journal.append(files[1]["hash"], 0, {"section": 1, "findings": [{"original": "x"}]})
+    journal.append(files[1]["hash"], 0, {"section": 1, "findings": []})     # 이미 기록된 문항은 무시
+
+    resumed = AuditJournal(str(tmp_path), "tex", hashes)
+    assert len(resumed) == 2
+    assert resumed.carried(files) == {0: {0: {"section": 1, "findings": []}}, 1: {0: {"section": 1, "findings": [{"original": "x"}]}}}
+
+
+def test_other_upload_gets_its_own_journal(tmp_path):
+    files = _files()
+    AuditJournal(str(tmp_path), "tex", [files[0]["hash"]]).append(files[0]["hash"], 0, {"section": 1, "findings": []})
+    assert len(AuditJournal(str(tmp_path), "tex", [files[0]["hash"], files[1]["hash"]])) == 0
+    assert len(AuditJournal(str(tmp_path), "pdf", [files[0]["hash"]])) == 0
+
+
+def test_torn_tail_is_skipped_and_not_glued(tmp_path):
+    files = _files()
+    hashes = [f["hash"] for f in files]
+    journal = AuditJournal(str(tmp_path), "tex", hashes)
+    journal.append(files[0]["hash"], 0, {"section": 1, "findings": []})
+    with open(journal.path, "a", encoding="utf-8") as f: f.write('{"file": "' + files[0]["hash"] + '", "item": 1, "res')
+
+    resumed = AuditJournal(str(tmp_path), "tex", hashes)
+    assert set(resumed.carried(files)[0]) == {0}
+    resumed.append(files[0]["hash"], 1, {"section": 2, "findings": []})
+    assert set(AuditJournal(str(tmp_path), "tex", hashes).carried(files)[0]) == {0, 1}
+
+
+def test_clear(tmp_path):
+    files = _files()
+    journal = AuditJournal(str(tmp_path), "tex", [files[0]["hash"]])
+    journal.append(files[0]["hash"], 0, {"section": 1, "findings": []})
+    journal.clear()
+    assert len(journal) == 0 and journal.carried(files) == {}
@@ -0,0 +1,46 @@
+import json
+import random
+
+from json_stream import JsonArrayStream, parse_json_array
+
+SAMPLE = '```json\n[{"original": "가 [x]", "corrected": "이 {y}", "reason": "따옴표 \\" 와 역슬래시 \\\\"},\n {"original": "a", "nested": {"k": [1, 2, {"z": "]"}]}}, {"bad": }, {"original": "끝"}]\n```'
+
+
+def _feed_in_chunks(text, rng):
+    parser, items, pos = JsonArrayStream(), [], 0
+    while pos < len(text):
+        size = rng.randint(1, 7)
+        items.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    return items, parser
+
+
+def test_chunked_stream_matches_whole_parse():
+    """어떻게 잘라 넣어도 한 번에 파싱한 결과와 같음."""
+    expected, whole = parse_json_array(SAMPLE)
+    assert [item.get("original") for item in expected] == ["가 [x]", "a", "끝"]
+    assert whole.done and whole.invalid == 1
+    rng = random.Random(0)
+    for _ in range(200):
+        items, parser = _feed_in_chunks(SAMPLE, rng)
+        assert items == expected
+        assert (parser.started, parser.done, parser.invalid) == (True, True, 1)
+
+
+def test_matches_json_loads_for_valid_array():
+    rng = random.Random(1)
+    data = [{"original": f"문장 {k}", "corrected": "\\n\"" * k, "line": k, "tags": [k, {"a": "}"}]} for k in range(20)]
+    text = json.dumps(data, ensure_ascii=False)
+    items, parser = _feed_in_chunks(text, rng)
+    assert items == data and parser.done
+
+
+def test_truncated_reply_keeps_complete_items():
+    items, parser = parse_json_array('[{"original": "a"}, {"original": "b"}, {"orig')
+    assert items == [{"original": "a"}, {"original": "b"}]
+    assert parser.started and not parser.done
+
+
+def test_reply_without_array():
+    items, parser = parse_json_array("✅ 발견된 오류 없음")
+    assert items == [] and not parser.started
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from audit_core import PROMPT_FOR_TEX, PROMPT_FOR_TEX_PACKED, estimate_tokens, pack_sections, review_tex_pack, split_packed_findings
+from audit_metrics import Metrics, use_metrics
+from model_backend import BackendResponse, StubBackend
+from review_executor import CallCancelled, CircuitOpenError
+
+FINDING = {"original": "가", "corrected": "이", "reason": "조사", "severity": "low"}
+
+
+class _PackedReplyModel:
+    """묶음 요청에는 정해 둔 응답을, 단일 요청에는 빈 배열을 돌려주며 받은 요청을 기록하는 모델."""
+
+    model_name = "fake"
+
+    def __init__(self, packed_reply, packed_error=None):
+        self.packed_reply = packed_reply
+        self.packed_error = packed_error
+        self.requests = []
+
+    def generate_content(self, contents, stream=False):
+        self.requests.append(contents)
+        if self.packed_error is not None and "[[ITEM 1]]" in contents: raise self.packed_error
+        return BackendResponse(self.packed_reply if "[[ITEM 1]]" in contents else "[]", chunk_chars=5 if stream else 0)
+
+
+def test_split_packed_findings_keeps_only_complete_items():
+    entries = [{"item": 1, "findings": [FINDING]}, {"item": "3", "findings": []}, {"item": 9, "findings": []},
+               {"item": 2}, {"findings": []}, {"item": 1, "findings": ["문자열", {"original": "b"}]}]
+    assert split_packed_findings(entries, 3) == {1: [FINDING, {"original": "b"}], 3: []}
+
+
+def test_pack_falls_back_for_skipped_item():
+    model = _PackedReplyModel(json.dumps([{"item": 1, "findings": [FINDING]}, {"item": 3, "findings": []}]))
+    metrics = Metrics()
+    with use_metrics(metrics): results = review_tex_pack(model, [(1, "첫 문항"), (2, "둘째 문항"), (3, "셋째 문항")])
+    assert [r["section"] for r in results] == [1, 2, 3]
+    assert results[0]["findings"] == [FINDING] and results[1]["findings"] == [] and results[2]["findings"] == []
+    singles = [c for c in model.requests if "[[ITEM 1]]" not in c]
+    assert len(singles) == 1 and singles[0].endswith("둘째 문항")
+    assert metrics.summary()["counters"]["pack_fallbacks"] == 1
+
+
+def test_truncated_pack_falls_back_for_unfinished_items():
+    model = _PackedReplyModel('[{"item": 1, "findings": []}, {"item": 2, "findings": [{"orig')
+    results = review_tex_pack(model, [(1, "첫 문항"), (2, "둘째 문항")])
+    assert all("api_error" not in r for r in results)
+    assert len([c for c in model.requests if "[[ITEM 1]]" not in c]) == 1
+
+
+def test_stub_pack_needs_no_fallback():
+    stub = StubBackend()
+    metrics = Metrics()
+    with use_metrics(metrics): results = review_tex_pack(stub, [(k, f"문항 {k} 본문") for k in range(1, 5)])
+    assert [r["findings"] for r in results] == [[]] * 4
+    assert stub.calls == 1 and "pack_fallbacks" not in metrics.summary()["counters"]
+
+
+def test_non_json_pack_reply_falls_back_per_item():
+    model = _PackedReplyModel("✅ 발견된 오류 없음")
+    results = review_tex_pack(model, [(1, "첫 문항"), (2, "둘째 문항")])
+    assert [r["findings"] for r in results] == [[], []]
+    assert len(model.requests) == 3
+
+
+@pytest.mark.parametrize("error", [RuntimeError("429 Resource has been exhausted"), CircuitOpenError("서킷 열림"), ValueError("모델 응답이 비어 있습니다")])
+def test_failed_pack_request_is_not_multiplied(error):
+    """묶음 요청이 실패하면 단일 요청으로 쪼개 다시 보내지 않고 모든 문항을 api_error로 끝냄."""
+    model = _PackedReplyModel("[]", packed_error=error)
+    metrics = Metrics()
+    with use_metrics(metrics): results = review_tex_pack(model, [(1, "값은 3를 만족"), (2, "둘째 문항")])
+    assert len(model.requests) == 1
+    assert [r["api_error"] for r in results] == [str(error)] * 2
+    assert results[0]["rule_errors"] and metrics.summary()["counters"]["pack_failures"] == 1
+
+
+def test_cancelled_pack_request_propagates():
+    model = _PackedReplyModel("[]", packed_error=CallCancelled("작업이 취소되었습니다."))
+    with pytest.raises(CallCancelled): review_tex_pack(model, [(1, "첫 문항"), (2, "둘째 문항")])
+    assert len(model.requests) == 1
+
+
+def test_pack_sections_respects_budget_and_order():
+    texts = ["가" * n for n in (10, 300, 40, 2000, 5, 5)]
+    packs = pack_sections(texts, estimate_tokens(PROMPT_FOR_TEX + PROMPT_FOR_TEX_PACKED) + 400)
+    assert packs == [[0, 1, 2], [3], [4, 5]]             # 한도보다 큰 문항은 단독
+    assert pack_sections(texts, 0) == [[i] for i in range(len(texts))]
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+from PIL import Image, ImageDraw
+
+from page_preprocess import PagePreprocessor
+
+
+def _page(size=(400, 600), box=(100, 200, 300, 260)):
+    image = Image.new("RGB", size, "white")
+    ImageDraw.Draw(image).rectangle(box, fill="black")
+    return image
+
+
+def _decode(part):
+    return Image.open(io.BytesIO(part["data"]))
+
+
+def test_crop_keeps_content_with_padding():
+    part = PagePreprocessor(mode="gray", image_format="PNG", max_pixels=0).process(_page())
+    assert part["mime_type"] == "image/png"
+    image = _decode(part)
+    assert image.size == (201 + 32, 61 + 32)
+    assert image.mode == "L"
+
+
+def test_blank_page_is_not_cropped_away():
+    image = _decode(PagePreprocessor(image_format="PNG", max_pixels=0).process(Image.new("RGB", (50, 40), "white")))
+    assert image.size == (50, 40)
+
+
+@pytest.mark.parametrize("mode, image_format, expected_mode", [("rgb", "JPEG", "RGB"), ("gray", "JPEG", "L"), ("rgb", "WEBP", "RGB"), ("binary", "PNG", "1")])
+def test_modes_and_formats(mode, image_format, expected_mode):
+    part = PagePreprocessor(mode=mode, image_format=image_format, crop_margins=False).process(_page())
+    image = _decode(part)
+    assert image.format == image_format and image.mode == expected_mode
+    assert part["mime_type"] == "image/" + image_format.lower()
+
+
+def test_resolution_is_capped_at_max_pixels():
+    image = _decode(PagePreprocessor(max_pixels=60000, crop_margins=False).process(_page()))
+    assert image.width * image.height <= 60000
+    assert abs(image.width / image.height - 400 / 600) < 0.02
+
+
+def test_invalid_settings_are_rejected():
+    with pytest.raises(ValueError): PagePreprocessor(mode="sepia")
+    with pytest.raises(ValueError): PagePreprocessor(image_format="gif")
+    assert PagePreprocessor(image_format="webp").image_format == "WEBP"
+
+
+def test_settings_key_changes_with_settings():
+    assert PagePreprocessor(quality=85).settings_key() != PagePreprocessor(quality=60).settings_key()
+    assert PagePreprocessor().settings_key() == PagePreprocessor().settings_key()
+
+
+def test_report_and_summary():
+    preprocessor = PagePreprocessor()
+    for page_no in (1, 2): preprocessor.process(_page(), page_no)
+    assert [row["page"] for row in preprocessor.report] == [1, 2]
+    assert preprocessor.report[0]["original_size"] == (400, 600) and preprocessor.report[0]["raw_bytes"] == 400 * 600 * 3
+    summary = preprocessor.summary()
+    assert summary["pages"] == 2 and summary["raw_bytes"] == 2 * 400 * 600 * 3
+    assert summary["saved_bytes"] == summary["raw_bytes"] - summary["upload_bytes"] and 0 < summary["saved_ratio"] < 1
+    assert PagePreprocessor().summary() == {"pages": 0, "raw_bytes": 0, "upload_bytes": 0, "saved_bytes": 0, "saved_ratio": 0.0, "seconds_per_page": 0.0}
@@ -0,0 +1,40 @@
+from PIL import Image
+
+import audit_core
+from audit_core import text_layer_problem
+from audit_metrics import Metrics, use_metrics
+from model_backend import StubBackend
+
+GOOD = "함수 f(x)=x^2+1 의 최솟값을 구하시오. 정답은 1 이며 x=0 일 때 최소가 됩니다. " * 2
+
+
+def test_text_layer_problem_accepts_clean_text():
+    assert text_layer_problem(GOOD) is None
+
+
+def test_text_layer_problem_reasons():
+    assert text_layer_problem("  1쪽 \n ") == "텍스트 없음"
+    assert text_layer_problem(GOOD + "�") == "깨진 글리프"
+    assert text_layer_problem(GOOD + "(cid:12)") == "깨진 글리프"
+    assert text_layer_problem(GOOD + "ㅎㅏㄴ") == "분해된 한글"
+    assert text_layer_problem("∫∑√≤≥±×÷∞≠" * 5 + "x=1") == "기호 비율 과다 (수식 깨짐)"
+
+
+def test_process_pdf_ocrs_only_pages_that_fail_the_check(monkeypatch):
+    texts = [GOOD, "", GOOD + "�", GOOD]
+    monkeypatch.setattr(audit_core, "pdfinfo_from_path", lambda path, poppler_path=None: {"Pages": len(texts)})
+    monkeypatch.setattr(audit_core, "extract_pdf_text_pages", lambda path: texts)
+    rendered = []
+
+    def fake_pages(path, pages=None, total_pages=None, processes=None):
+        rendered.extend(pages)
+        for page_no in pages: yield page_no, total_pages, Image.new("RGB", (8, 8), "white")
+    monkeypatch.setattr(audit_core, "iter_pdf_pages", fake_pages)
+
+    with use_metrics(Metrics()) as metrics:
+        text, error = audit_core.process_pdf(StubBackend(), "book.pdf", use_text_layer=True)
+    assert error is None
+    assert rendered == [2, 3]
+    assert text.count(GOOD.strip()) == 2
+    counters = metrics.summary()["counters"]
+    assert counters["text_layer_pages"] == 2 and counters["ocr_pages"] == 2
@@ -0,0 +1,38 @@
+import random
+
+from audit_core import TexReportStream, generate_report_for_tex
+
+
+def _results():
+    finding = {"location": "1행", "category": "critical", "issue": "오타", "original": "a|b", "corrected": "c", "reason": "줄\n바꿈"}
+    return {
+        "a.zip": [{"section": 1, "rule_errors": [], "findings": [finding]}, {"section": 2, "rule_errors": [], "api_error": "429"}],
+        "empty.zip": [],
+        "b.zip": [{"section": 1, "label": "7번 문항", "rule_errors": [{"location": "2행", "reason": "조사", "original": "3를", "corrected": "3을"}],
+                   "findings": [], "truncated": True, "change": "changed"}],
+    }
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f: return f.read()
+
+
+def test_out_of_order_results_give_the_batch_report(tmp_path):
+    results = _results()
+    removed = {"b.zip": ["9번 문항"]}
+    puts = [(f_idx, j, result) for f_idx, file_results in enumerate(results.values()) for j, result in enumerate(file_results)]
+    random.Random(0).shuffle(puts)
+    stream = TexReportStream([(name, len(file_results)) for name, file_results in results.items()], str(tmp_path / "report.md"), removed)
+    for f_idx, j, result in puts: stream.put(f_idx, j, result)
+    stream.close()
+    assert _read(stream.path) == generate_report_for_tex(results, removed)
+
+
+def test_only_contiguous_prefix_is_written(tmp_path):
+    results = _results()
+    stream = TexReportStream([(name, len(file_results)) for name, file_results in results.items()], str(tmp_path / "report.md"))
+    stream.put(0, 1, results["a.zip"][1])
+    assert _read(stream.path) == generate_report_for_tex({})
+    stream.put(0, 0, results["a.zip"][0])
+    assert _read(stream.path) == generate_report_for_tex({"a.zip": results["a.zip"], "empty.zip": []})
+    stream.close()
@@ -0,0 +1,43 @@
+import time
+
+from review_cache import ReviewCache
+
+
+def test_key_separates_every_part():
+    keys = {ReviewCache.make_key("m", "p", "text"), ReviewCache.make_key("m2", "p", "text"),
+            ReviewCache.make_key("m", "p2", "text"), ReviewCache.make_key("m", "p", "text2"),
+            ReviewCache.make_key("m", "p", b"text"[:3]), ReviewCache.make_key("mp", "", "text")}
+    assert len(keys) == 6
+    assert ReviewCache.make_key("m", "p", "본문") == ReviewCache.make_key("m", "p", "본문".encode("utf-8"))
+
+
+def test_get_put_and_stats(tmp_path):
+    cache = ReviewCache(str(tmp_path))
+    key = ReviewCache.make_key("m", "p", "본문")
+    assert cache.get(key) is None
+    cache.put(key, "[]")
+    assert cache.get(key) == "[]"
+    assert ReviewCache(str(tmp_path)).get(key) == "[]"       # 다른 세션·프로세스도 같은 파일을 읽음
+    assert cache.stats() == {"entries": 1, "bytes": 2, "hits": 1, "misses": 1}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ReviewCache(str(tmp_path), max_bytes=25)
+    for name in "abc":
+        cache.put(name, name * 10)
+        time.sleep(0.01)
+    assert cache.get("a") is None and cache.get("b") == "b" * 10
+    cache.get("b")
+    time.sleep(0.01)
+    cache.put("d", "d" * 10)
+    assert cache.get("c") is None
+    assert cache.get("b") == "b" * 10 and cache.get("d") == "d" * 10
+
+
+def test_expired_entries_are_dropped(tmp_path):
+    cache = ReviewCache(str(tmp_path), max_age_days=1)
+    cache.put("old", "x")
+    with cache._connect() as conn: conn.execute("UPDATE entries SET created = created - 2 * 86400")
+    assert cache.get("old") is None
+    cache.evict()
+    assert cache.stats()["entries"] == 0
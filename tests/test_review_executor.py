@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+
+import pytest
+
+from audit_core import record_backoff_stats
+from audit_metrics import Metrics, use_metrics
+from review_executor import BackoffController, CallCancelled, CircuitOpenError, TokenBucket, retry_after, run_ordered
+
+
+def test_run_ordered_keeps_input_order():
+    rng = random.Random(0)
+    delays = [rng.random() * 0.02 for _ in range(30)]
+    completed = []
+
+    def task(k):
+        time.sleep(delays[k])
+        return k * k
+
+    results = run_ordered(task, range(30), max_workers=8, on_result=lambda done, total, i, result: completed.append((done, total, i, result)))
+    assert results == [k * k for k in range(30)]
+    assert [done for done, _, _, _ in completed] == list(range(1, 31))
+    assert sorted(i for _, _, i, _ in completed) == list(range(30))
+    assert all(result == i * i and total == 30 for _, total, i, result in completed)
+
+
+def test_run_ordered_on_error_fills_failed_slot():
+    def task(k):
+        if k == 2: raise ValueError("boom")
+        return k
+
+    assert run_ordered(task, range(4), max_workers=2, on_error=lambda item, e: f"error {item}: {e}") == [0, 1, "error 2: boom", 3]
+    with pytest.raises(ValueError): run_ordered(task, range(4), max_workers=2)
+
+
+def test_run_ordered_empty():
+    assert run_ordered(lambda k: k, []) == []
+
+
+def test_token_bucket_spaces_requests():
+    bucket = TokenBucket(rpm=600)     # 0.1초에 하나
+    t0 = time.monotonic()
+    for _ in range(4): bucket.acquire()
+    assert time.monotonic() - t0 >= 0.25
+
+
+def test_token_bucket_without_limit():
+    bucket = TokenBucket(rpm=0)
+    t0 = time.monotonic()
+    for _ in range(1000): bucket.acquire()
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_backoff_controller_stops_waiting_when_cancelled():
+    """취소되면 재시도 대기 중에도 CallCancelled로 바로 끝남."""
+    cancel = threading.Event()
+    controller = BackoffController(max_concurrency=1, base_delay=30.0, max_delay=30.0, cancelled=cancel.is_set)
+
+    def throttled():
+        raise RuntimeError("429 Resource has been exhausted. Please retry in 30s.")
+
+    threading.Timer(0.1, cancel.set).start()
+    t0 = time.perf_counter()
+    with pytest.raises(CallCancelled): controller.call(throttled)
+    assert time.perf_counter() - t0 < 5
+
+
+class _Throttled(Exception):
+    pass
+
+
+def test_retry_after_hints():
+    assert retry_after(_Throttled("429 Please retry in 2.5s.")) == 2.5
+    assert retry_after(_Throttled("retry_delay { seconds: 7 }")) == 7
+    error = _Throttled("429")
+    error.retry_after = "3"
+    assert retry_after(error) == 3
+    assert retry_after(_Throttled("429 quota")) is None
+
+
+def test_backoff_retries_and_halves_concurrency():
+    controller = BackoffController(max_concurrency=8, base_delay=30.0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3: raise _Throttled("429 Resource has been exhausted. Please retry in 0.01s.")
+        return "ok"
+
+    assert controller.call(flaky) == "ok"
+    stats = controller.stats()
+    assert stats["retries"] == 2 and stats["rate_limited"] == 2
+    assert 4 <= stats["limit"] < 8                      # base_delay 안에 연달아 온 429로는 한 번만 절반, 성공으로 조금 회복
+
+
+def test_non_retryable_error_is_raised_at_once():
+    controller = BackoffController(base_delay=0.01)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise KeyError("bad")
+
+    with pytest.raises(KeyError): controller.call(broken)
+    assert len(calls) == 1
+
+
+def test_breaker_trips_after_repeated_openings():
+    controller = BackoffController(max_attempts=1, base_delay=0.0, breaker_threshold=2, breaker_cooldown=0.01, max_delay=0.001, max_opens=1)
+
+    def throttled():
+        raise _Throttled("429 Resource has been exhausted")
+
+    for _ in range(3):
+        with pytest.raises(_Throttled): controller.call(throttled)
+    with pytest.raises(CircuitOpenError): controller.call(throttled)
+    stats = controller.stats()
+    assert stats["breaker_opens"] == 2 and stats["tripped"]
+
+
+def test_backoff_stats_reach_job_metrics():
+    controller = BackoffController(max_attempts=2, base_delay=0.01, max_delay=0.01)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1: raise _Throttled("429 retry in 0.01s")
+        return "ok"
+
+    controller.call(flaky)
+    metrics = Metrics()
+    with use_metrics(metrics): record_backoff_stats(controller)
+    counters = metrics.summary()["counters"]
+    assert counters["backoff:calls"] == 2 and counters["backoff:retries"] == 1 and counters["backoff:rate_limited"] == 1
@@ -0,0 +1,55 @@
+import random
+import re
+
+import legacy_reference
+from audit_bench import generate_workbook_tex
+from audit_core import parse_tex_content_dev, rule_check_josa, rule_check_josa_batch
+from audit_metrics import Metrics, use_metrics
+from rule_engine import RuleEngine
+
+_ALPHABET = ["$", "$$", "M", "x", "12", "3.5", "0", "1,000", "으로", "로", "과", "와", "은", "는", "이", "가", "을", "를", " ", ",", ".", "\n", "가나"]
+
+
+def test_overlapping_matches_are_kept():
+    """수식 짝이 어긋난 '$…$'와 겹치는 숫자 조사도 개선 전처럼 잡힘."""
+    text = "$M12으로,3.5과$와 값"
+    assert rule_check_josa(text) == legacy_reference.rule_check_josa(text)
+    assert any(err["original"] == "12으로" for err in rule_check_josa(text))
+
+
+def test_matches_legacy_on_random_text():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(1, 20)))
+        assert rule_check_josa(text) == legacy_reference.rule_check_josa(text), text
+
+
+def test_matches_legacy_on_workbooks():
+    items = [item["content"] for seed in range(3) for item in parse_tex_content_dev(generate_workbook_tex(60, seed=seed, error_rate=0.5))]
+    assert rule_check_josa_batch(items) == [legacy_reference.rule_check_josa(text) for text in items]
+
+
+def test_custom_rules_order_and_metrics():
+    metrics = Metrics()
+    engine = RuleEngine(metrics)
+    engine.register("double_space", r"\S(  +)\S", lambda m: {"original": m.group(0), "corrected": m.group(0)[0] + " " + m.group(0)[-1]})
+    engine.register("unit", re.compile(r"(?P<n>\d+)\s+(?P<u>cm|kg)\b"), lambda m: {"original": m.group(0), "corrected": m.group("n") + m.group("u")}
+                    if m.group("n") != "0" else None)
+
+    results = engine.check_batch(["3  cm 와\n5 kg", "", "0 kg"])
+    assert results[0] == [{"location": "1행", "original": "3  c", "corrected": "3 c"},
+                          {"location": "1행", "original": "3  cm", "corrected": "3cm"},
+                          {"location": "2행", "original": "5 kg", "corrected": "5kg"}]
+    assert results[1:] == [[], []]
+    summary = metrics.summary()
+    assert summary["stages"]["rule_scan"]["calls"] == 3
+    assert summary["stages"]["rule:unit"]["calls"] == 3
+    assert summary["counters"] == {"rule_errors:double_space": 1, "rule_errors:unit": 2}
+
+
+def test_rule_stats_go_to_current_job_metrics():
+    job = Metrics()
+    with use_metrics(job): rule_check_josa_batch(["값은 3를 만족한다.", "$M$를 대입"])
+    summary = job.summary()
+    assert summary["stages"]["rule_scan"]["calls"] == 2
+    assert summary["counters"] == {"rule_errors:josa_math": 1, "rule_errors:josa_number": 1}
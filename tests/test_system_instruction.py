@@ -0,0 +1,21 @@
+from audit_core import PROMPT_FOR_PDF, PROMPT_FOR_TEX, audit_tex_files
+from model_backend import StubBackend
+
+
+def test_static_prompt_is_not_resent():
+    """시스템 지시로 등록한 고정 프롬프트는 문항 요청 본문에 다시 실리지 않음."""
+    stub = StubBackend(chunk_chars=7)
+    files = [{"filename": f"f{n}.zip", "items": [f"파일 {n}의 문항 {k} 본문입니다." for k in range(6)]} for n in range(2)]
+    results = audit_tex_files(stub, files, max_workers=4, max_rpm=0, pack_tokens=0)
+    assert all(len(r) == 6 and all("api_error" not in item for item in r) for r in results.values())
+    assert stub.calls == 12
+    assert stub.prefix_resends == 0
+    assert stub.instructions_registered == 1
+    assert stub.sent_chars < 12 * len(PROMPT_FOR_TEX)
+
+
+def test_prefix_resends_counts_inlined_prompt():
+    stub = StubBackend()
+    stub.with_system_instruction(PROMPT_FOR_PDF)
+    stub.generate_content(PROMPT_FOR_PDF + "\n\n본문")
+    assert stub.prefix_resends == 1
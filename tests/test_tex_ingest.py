@@ -0,0 +1,77 @@
+import io
+import zipfile
+
+import pytest
+
+from tex_ingest import ENCODING_REPLACED, assemble_tex, decode_tex, find_main_tex, ingest_zip
+
+
+@pytest.mark.parametrize("data, text, encoding", [
+    ("함수 $f(x)$".encode("utf-8"), "함수 $f(x)$", "utf-8"),
+    (b"\xef\xbb\xbf" + "문항".encode("utf-8"), "문항", "utf-8-sig"),
+    ("다음 식의 값은?".encode("cp949"), "다음 식의 값은?", "cp949"),
+])
+def test_decode_tex(data, text, encoding):
+    assert decode_tex(data) == (text, encoding)
+
+
+def test_decode_tex_replaces_undecodable_bytes():
+    text, encoding = decode_tex("값".encode("utf-8") + b"\xff\xff")
+    assert encoding == ENCODING_REPLACED
+    assert text.startswith("값") and "\ufffd" in text
+
+
+def _assemble(files, main="main.tex"):
+    return assemble_tex(main, files.__getitem__, set(files))
+
+
+def test_assemble_expands_includes_in_place():
+    files = {
+        "main.tex": "\\documentclass{book}\n\\input{ch/one}\n중간\n\\include{two.tex}\n끝\n",
+        "ch/one.tex": "하나 1\n\\input{sub}\n하나 2\n",
+        "ch/sub.tex": "서브\n",
+        "two.tex": "둘\n",
+    }
+    text, source_map, visited, warnings = _assemble(files)
+    assert text == "\\documentclass{book}\n하나 1\n서브\n\n하나 2\n\n중간\n둘\n\n끝\n"
+    assert visited == ["main.tex", "ch/one.tex", "ch/sub.tex", "two.tex"]
+    assert warnings == []
+    # 포함 명령 뒤에 남은 줄바꿈은 그 명령이 있던 줄로 돌아감
+    expected = [("main.tex", 1), ("ch/one.tex", 1), ("ch/sub.tex", 1), ("ch/one.tex", 2), ("ch/one.tex", 3),
+                ("main.tex", 2), ("main.tex", 3), ("two.tex", 1), ("main.tex", 4), ("main.tex", 5)]
+    assert [source_map.locate_line(line) for line in range(1, len(expected) + 1)] == expected
+    assert source_map.locate(text.index("서브")) == ("ch/sub.tex", 1)
+
+
+def test_assemble_skips_commented_missing_and_cyclic_includes():
+    files = {
+        "main.tex": "% \\input{gone}\n\\input{missing}\n\\input{a}\n",
+        "a.tex": "A\n\\input{main}\n",
+    }
+    text, _, visited, warnings = _assemble(files)
+    assert visited == ["main.tex", "a.tex"]
+    assert "% \\input{gone}" in text and "\\input{main}" in text
+    assert warnings == ["main.tex: 'missing' 파일을 찾을 수 없습니다.", "a.tex: 'main' 순환 포함을 건너뜁니다."]
+
+
+def test_find_main_tex_prefers_shallowest_root():
+    files = {"ch/one.tex": "본문", "sub/book.tex": "\\documentclass{book}", "book.tex": "\\begin{document}"}
+    assert find_main_tex(list(files), files.__getitem__) == "book.tex"
+    assert find_main_tex(["b.tex", "a.tex"], lambda name: "본문") == "b.tex"
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        for name, data in members.items(): z.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def test_ingest_zip_reports_garbled_files_and_errors():
+    ingested, error = ingest_zip(_zip({"main.tex": "\\documentclass{book}\n\\input{ch}\n".encode("cp949"),
+                                       "ch.tex": "문항".encode("utf-8") + b"\xff"}))
+    assert error is None and ingested.main == "main.tex" and ingested.files == ["main.tex", "ch.tex"]
+    assert ingested.warnings == ["ch.tex: UTF-8/CP949 어느 쪽으로도 읽히지 않는 바이트가 있어 �로 바꿨습니다."]
+    assert ingest_zip(_zip({"readme.txt": b"x"})) == (None, "ZIP 파일 내에 .tex 파일이 없습니다.")
+    assert ingest_zip(io.BytesIO(b"not a zip"))[1].startswith("ZIP 처리 오류")
@@ -0,0 +1,50 @@
+import random
+
+import pytest
+
+import legacy_reference
+from audit_bench import generate_workbook_tex
+from audit_core import parse_tex_content, parse_tex_content_dev
+from tex_index import LineIndex, TexIndex
+
+EDGE_CASES = [
+    "",
+    "본문만 있고 섹션이 없는 문서",
+    "\\begin{document}\n\n  \\maketitle\n본문\n\\end{document}",
+    "\\begin{document}\n\\section*{해설}\n문항보다 먼저 나온 해설\n\\section*{1}\n문제\n\\section*{풀이}\n풀이 본문\n\\end{document}",
+    "\\begin{document}\n\\section*{1}\n문제\n\\section*{Day 2}\n\\section*{정답 {\\bf 3}}\n해설\n\\section*{2}\n둘째\n\\newpage\n\\end{document}",
+    "\\begin{document}\n\\section*{110 \\\\ 29}\n문제 본문입니다\n28.\n다음 문항\n\\section*{깨진 {제목\n\\clearpage\n\\end{document}",
+    "머리말\n\\section{1}\n문서 환경 없이 쓴 섹션\n\\section{A}\n영문 제목",
+]
+
+
+def _tex_samples():
+    rng = random.Random(0)
+    samples = list(EDGE_CASES)
+    samples += [generate_workbook_tex(rng.randint(1, 40), seed=k) for k in range(10)]
+    return samples
+
+
+@pytest.mark.parametrize("tex", _tex_samples())
+def test_parse_tex_content_matches_legacy(tex):
+    assert parse_tex_content(tex) == legacy_reference.parse_tex_content(tex)
+
+
+@pytest.mark.parametrize("tex", _tex_samples())
+def test_parse_tex_content_dev_matches_legacy(tex):
+    items = parse_tex_content_dev(tex)
+    assert [{k: v for k, v in item.items() if k != "line"} for item in items] == legacy_reference.parse_tex_content_dev(tex)
+
+
+def test_dev_items_point_at_their_first_line():
+    tex = generate_workbook_tex(30, seed=3)
+    lines = tex.split("\n")
+    for item in parse_tex_content_dev(tex):
+        assert lines[item["line"] - 1].strip() == item["content"].split("\n")[0]
+
+
+def test_line_index_matches_count():
+    text = "첫 줄\n\n셋째 줄\r\n넷째\n"
+    index = LineIndex(text)
+    assert [index.line_of(k) for k in range(len(text) + 1)] == [text.count("\n", 0, k) + 1 for k in range(len(text) + 1)]
+    assert TexIndex(text).line_of(len(text)) == 5
@@ -0,0 +1,78 @@
+import re
+from bisect import bisect_right
+
+# ==========================================
+# [TeX 인덱스] 한 번의 스캔으로 줄/섹션 위치를 기록
+# ==========================================
+_DOCUMENT_PATTERN = re.compile(r'\\begin\{document\}([\s\S]*?)\\end\{document\}')
+_TOKEN_PATTERN = re.compile(r'\n|\\section\*?\{')
+_BRACE_PATTERN = re.compile(r'[{}]')
+# 본문에서 지우는 명령어 (텍스트를 꺼낼 때만 적용)
+_STRIP_PATTERN = re.compile(r'\\maketitle|\\newpage|\\clearpage')
+
+
+class LineIndex:
+    """줄 시작 오프셋 목록. line_of(offset)는 text.count('\n', 0, offset) + 1과 같은 값을 O(log n)에 반환."""
+
+    def __init__(self, text=None, line_starts=None):
+        if line_starts is not None: self.starts = line_starts
+        else: self.starts = [0] + [m.end() for m in re.finditer('\n', text)]
+
+    def line_of(self, offset):
+        return bisect_right(self.starts, offset)
+
+
+class TexIndex:
+    """
+    원문 문자열은 그대로 두고 본문 범위, 줄 시작, \\section 시작 위치만 오프셋으로 기록.
+    실제 텍스트는 화면 표시나 API 전송용으로 꺼낼 때(clean) 잘라냅니다.
+    """
+
+    def __init__(self, tex_content):
+        self.text = tex_content
+        match = _DOCUMENT_PATTERN.search(tex_content)
+        if match:
+            start, end = match.span(1)
+            inner = match.group(1)
+            self.body_start = start + (len(inner) - len(inner.lstrip()))
+            self.body_end = max(self.body_start, end - (len(inner) - len(inner.rstrip())))
+        else:
+            self.body_start, self.body_end = 0, len(tex_content)
+
+        line_starts = [0]
+        self.section_starts = []
+        for tok in _TOKEN_PATTERN.finditer(tex_content):
+            if tok.group() == '\n': line_starts.append(tok.end())
+            elif self.body_start <= tok.start() and tok.end() <= self.body_end: self.section_starts.append(tok.start())
+        self.lines = LineIndex(line_starts=line_starts)
+
+    def line_of(self, offset):
+        return self.lines.line_of(offset)
+
+    def clean(self, start, end):
+        return _STRIP_PATTERN.sub('', self.text[start:end])
+
+    def body_lines(self):
+        """본문 안의 각 줄을 (시작, 끝) 오프셋으로 반환 (줄바꿈 문자 제외)."""
+        starts = self.lines.starts
+        first = max(0, self.lines.line_of(self.body_start) - 1)
+        for k in range(first, len(starts)):
+            start = max(starts[k], self.body_start)
+            if start >= self.body_end and k > first: break
+            end = min(starts[k + 1] - 1 if k + 1 < len(starts) else len(self.text), self.body_end)
+            yield start, end
+
+    def section_spans(self):
+        """각 \\section 시작부터 다음 \\section(또는 본문 끝)까지의 (시작, 끝) 오프셋."""
+        bounds = self.section_starts + [self.body_end]
+        return [(bounds[k], bounds[k + 1]) for k in range(len(self.section_starts))]
+
+    def section_title(self, start, end):
+        """\\section{...}의 중괄호 짝을 맞춰 제목을 반환 (짝이 안 맞으면 빈 문자열)."""
+        brace_open = self.text.find('{', start, end)
+        if brace_open == -1: return ""
+        depth = 1
+        for m in _BRACE_PATTERN.finditer(self.text, brace_open + 1, end):
+            depth += 1 if m.group() == '{' else -1
+            if depth == 0: return self.clean(brace_open + 1, m.start())
+        return ""
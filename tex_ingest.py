@@ -0,0 +1,140 @@
+import codecs
+import posixpath
+import re
+import zipfile
+from bisect import bisect_right
+
+from tex_index import LineIndex
+
+# ==========================================
+# [ZIP 수집] 루트 문서 찾기, \input/\include 펼치기, 인코딩 판별, 원본 위치 매핑
+# ==========================================
+_INCLUDE_PATTERN = re.compile(r'\\(?:input|include|subfile)\s*(?:\{\s*"?([^{}"]+?)"?\s*\}|\s([^\s{}\\%]+))')
+_COMMENT_PATTERN = re.compile(r'(?<!\\)%')
+_ROOT_PATTERN = re.compile(r'\\documentclass|\\begin\{document\}')
+# 어느 인코딩으로도 온전히 읽히지 않을 때 decode_tex가 돌려주는 인코딩 이름 (깨진 바이트는 U+FFFD로 바뀜)
+ENCODING_REPLACED = "utf-8 (replace)"
+_MAX_INCLUDE_DEPTH = 32
+
+
+def decode_tex(data):
+    """
+    파일 전체를 엄격하게 디코딩: UTF-8(BOM이 있으면 utf-8-sig) → CP949 순으로 시도하고,
+    둘 다 실패하면 UTF-8로 읽되 깨진 바이트를 U+FFFD로 바꿔 ENCODING_REPLACED를 돌려줍니다 (호출한 쪽에서 경고).
+    반환값: (텍스트, 인코딩 이름)
+    """
+    for encoding in ("utf-8-sig" if data.startswith(codecs.BOM_UTF8) else "utf-8", "cp949"):
+        try: return data.decode(encoding), encoding
+        except UnicodeDecodeError: continue
+    return data.decode("utf-8", errors="replace"), ENCODING_REPLACED
+
+
+class SourceMap:
+    """합쳐진 문서의 위치(오프셋/줄)를 원래 ZIP 안의 (파일 이름, 줄 번호)로 되돌림."""
+
+    def __init__(self, text, segments, member_texts):
+        # segments: [(합친 문서 시작 오프셋, 파일 이름, 그 파일 안의 시작 오프셋)] (오프셋 순)
+        self.segments = segments
+        self._offsets = [seg[0] for seg in segments]
+        self._lines = LineIndex(text)
+        self._member_lines = {name: LineIndex(member_text) for name, member_text in member_texts.items()}
+
+    def locate(self, offset):
+        k = bisect_right(self._offsets, offset) - 1
+        if k < 0: return None, None
+        start, name, member_offset = self.segments[k]
+        return name, self._member_lines[name].line_of(member_offset + offset - start)
+
+    def locate_line(self, line):
+        """합친 문서의 줄 번호(1부터) → (파일 이름, 줄 번호)."""
+        starts = self._lines.starts
+        return self.locate(starts[min(max(line, 1), len(starts)) - 1])
+
+
+class IngestedTex:
+    def __init__(self, text, main, files, source_map, warnings):
+        self.text = text
+        self.main = main                # 루트 문서 파일 이름
+        self.files = files              # 펼쳐 넣은 파일 이름 목록 (방문 순서)
+        self.source_map = source_map
+        self.warnings = warnings        # 찾지 못한 \input, 순환 포함 등
+
+
+def find_main_tex(tex_names, read):
+    """\\documentclass 또는 \\begin{document}가 있는 .tex 중 가장 얕은 경로(없으면 첫 번째 .tex)."""
+    roots = [name for name in tex_names if _ROOT_PATTERN.search(read(name))]
+    if not roots: return tex_names[0]
+    return min(roots, key=lambda name: (name.count("/"), tex_names.index(name)))
+
+
+def _resolve(target, including, names):
+    base = posixpath.dirname(including)
+    target = target.strip()
+    for candidate in (posixpath.join(base, target), target):
+        candidate = posixpath.normpath(candidate)
+        for name in (candidate, candidate + ".tex"):
+            if name in names: return name
+    return None
+
+
+def _is_commented(text, pos):
+    line_start = text.rfind("\n", 0, pos) + 1
+    return bool(_COMMENT_PATTERN.search(text, line_start, pos))
+
+
+def assemble_tex(main, read, names):
+    """main에서 시작해 \\input/\\include/\\subfile을 제자리에 펼친 문서와 SourceMap, 경고 목록을 만듦."""
+    parts, segments, visited, warnings = [], [], [], []
+    texts = {}
+    length = [0]
+
+    def _emit(name, start, end):
+        if start >= end: return
+        segments.append((length[0], name, start))
+        parts.append(texts[name][start:end])
+        length[0] += end - start
+
+    def _expand(name, stack):
+        if name not in texts: texts[name] = read(name)
+        if name not in visited: visited.append(name)
+        text = texts[name]
+        cursor = 0
+        for m in _INCLUDE_PATTERN.finditer(text):
+            if _is_commented(text, m.start()): continue
+            target = m.group(1) or m.group(2)
+            child = _resolve(target, name, names)
+            if child is None:
+                warnings.append(f"{name}: '{target}' 파일을 찾을 수 없습니다.")
+                continue
+            if child in stack or len(stack) >= _MAX_INCLUDE_DEPTH:
+                warnings.append(f"{name}: '{target}' 순환 포함을 건너뜁니다.")
+                continue
+            _emit(name, cursor, m.start())
+            _expand(child, stack + [child])
+            cursor = m.end()
+        _emit(name, cursor, len(text))
+
+    _expand(main, [main])
+    text = "".join(parts)
+    return text, SourceMap(text, segments, texts), visited, warnings
+
+
+def ingest_zip(zip_file):
+    """ZIP(경로 또는 파일 객체)에서 루트 .tex를 찾아 포함 파일을 펼침. 반환값: (IngestedTex, 오류 메시지)."""
+    try:
+        with zipfile.ZipFile(zip_file) as z:
+            tex_names = [f for f in z.namelist() if f.lower().endswith('.tex')]
+            if not tex_names: return None, "ZIP 파일 내에 .tex 파일이 없습니다."
+            decoded, garbled = {}, []
+
+            def _read(name):
+                if name not in decoded:
+                    decoded[name], encoding = decode_tex(z.read(name))
+                    if encoding == ENCODING_REPLACED: garbled.append(name)
+                return decoded[name]
+
+            main = find_main_tex(tex_names, _read)
+            text, source_map, files, warnings = assemble_tex(main, _read, set(tex_names))
+            warnings = [f"{name}: UTF-8/CP949 어느 쪽으로도 읽히지 않는 바이트가 있어 �로 바꿨습니다." for name in garbled if name in files] + warnings
+            return IngestedTex(text, main, files, source_map, warnings), None
+    except Exception as e: return None, f"ZIP 처리 오류: {str(e)}"